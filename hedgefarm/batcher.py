@@ -0,0 +1,84 @@
+"""Микро-пакетирование одновременных запросов расчета."""
+
+import asyncio
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar, Union
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+@dataclass
+class BatchStats:
+    """Счетчики пакетов."""
+    batches: int = 0
+    items: int = 0
+    largest: int = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        stats = asdict(self)
+        stats["mean_size"] = self.items / self.batches if self.batches else 0.0
+        return stats
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Собирает запросы за короткое окно и считает их одним вызовом handler.
+
+    Первый запрос открывает окно max_wait секунд; пакет считается по
+    истечении окна или сразу, как только набралось max_batch запросов.
+    handler получает список элементов и возвращает список результатов в
+    том же порядке; результат-исключение получает только свой запрос,
+    исключение самого handler - все запросы пакета.
+
+    handler выполняется в event loop, как и обычный расчет эндпоинта:
+    ожидание запроса ограничено max_wait плюс временем расчета пакета.
+    """
+
+    def __init__(self, handler: Callable[[List[T]], Sequence[Union[R, Exception]]],
+                 max_batch: int = 64, max_wait: float = 0.002):
+        self._handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = BatchStats()
+        self._pending: List[Tuple[T, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, item: T) -> R:
+        """Ставит элемент в текущий пакет и ждет его результат."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """Считает накопленный пакет немедленно."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        # Отмененные запросы (клиент отключился) не считаются
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+        self.stats.batches += 1
+        self.stats.items += len(batch)
+        self.stats.largest = max(self.stats.largest, len(batch))
+        try:
+            results = self._handler([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,93 @@
+"""Автомат отключения (circuit breaker) и адаптивный таймаут для запросов к бирже."""
+
+import time
+from typing import Callable, Dict, Optional
+
+import httpx
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Запрос не отправлялся: автомат эндпоинта разомкнут."""
+
+
+class CircuitBreaker:
+    """
+    Автомат одного эндпоинта с таймаутом по наблюдаемой задержке.
+
+    Таймаут считается как RTO в TCP (RFC 6298): srtt + 4 * rttvar по
+    успешным ответам, в пределах [min_timeout, max_timeout]. Каждый
+    таймаут подряд удваивает его, успешный ответ сбрасывает удвоение.
+
+    После failure_threshold ошибок подряд автомат размыкается, и запросы
+    сразу получают CircuitOpenError. Через reset_timeout секунд пропускается
+    один пробный запрос (half_open): успех замыкает автомат, ошибка снова
+    размыкает его.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 5.0,
+                 min_timeout: float = 0.5, max_timeout: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._srtt: Optional[float] = None
+        self._rttvar = 0.0
+        self._backoff = 1.0
+
+    @property
+    def timeout(self) -> float:
+        """Таймаут следующего запроса в секундах."""
+        if self._srtt is None:
+            base = self.max_timeout
+        else:
+            base = max(self._srtt + 4.0 * self._rttvar, self.min_timeout)
+        return min(base * self._backoff, self.max_timeout)
+
+    def allow(self) -> bool:
+        """Можно ли отправить запрос; в half_open пропускается один пробный."""
+        if self.state == OPEN:
+            if self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                return False
+            self._probing = True
+        return True
+
+    def release(self) -> None:
+        """Запрос отменен без результата: пробный запрос можно повторить."""
+        self._probing = False
+
+    def record_success(self, latency: float) -> None:
+        if self._srtt is None:
+            self._srtt, self._rttvar = latency, latency / 2.0
+        else:
+            self._rttvar = 0.75 * self._rttvar + 0.25 * abs(self._srtt - latency)
+            self._srtt = 0.875 * self._srtt + 0.125 * latency
+        self._backoff = 1.0
+        self.failures = 0
+        self._probing = False
+        self.state = CLOSED
+
+    def record_failure(self, timed_out: bool = False) -> None:
+        if timed_out:
+            self._backoff = min(self._backoff * 2.0, self.max_timeout / self.min_timeout)
+        self.failures += 1
+        self._probing = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = OPEN
+            self._opened_at = self._clock()
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"state": self.state, "failures": self.failures, "timeout_s": self.timeout}
@@ -0,0 +1,116 @@
+"""Кэш снапшотов рыночных данных с TTL и объединением запросов."""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable, Dict, Optional
+
+from .models import MarketData
+from .snapshots import MarketSnapshot, SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CacheStats:
+    """Счетчики обращений к кэшу."""
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    refreshes: int = 0
+    errors: int = 0
+    fallbacks: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class SnapshotCache:
+    """
+    TTL-кэш снапшотов перед MOEX ISS.
+
+    - свежий снапшот (возраст < ttl) отдается сразу;
+    - устаревший, но не старше ttl + stale_ttl, отдается сразу, а обновление
+      запускается в фоне (stale-while-revalidate);
+    - одновременные промахи по одному символу объединяются в один запрос
+      к бирже, результат которого получают все ожидающие;
+    - если обновить снапшот не удалось, отдается последний успешный
+      (is_stale сообщает, что он старше ttl + stale_ttl).
+    """
+
+    def __init__(self, fetch: Callable[[str], Awaitable[MarketData]],
+                 ttl: float = 1.0, stale_ttl: float = 10.0,
+                 store: Optional[SnapshotStore] = None):
+        self._fetch = fetch
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.store = store if store is not None else SnapshotStore()
+        self.stats = CacheStats()
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def peek(self, symbol: str) -> Optional[MarketSnapshot]:
+        """Возвращает закэшированный снапшот без обращения к бирже."""
+        return self.store.latest(symbol)
+
+    def is_stale(self, snapshot: MarketSnapshot) -> bool:
+        """Снапшот старше окна stale-while-revalidate: обновления с биржи не проходят."""
+        return snapshot.age >= self.ttl + self.stale_ttl
+
+    def clear(self) -> None:
+        """Сбрасывает кэш и счетчики."""
+        self.store.clear()
+        self.stats = CacheStats()
+
+    async def refresh(self, symbol: str) -> MarketSnapshot:
+        """Принудительно обновляет снапшот, объединяясь с уже идущим запросом."""
+        return await asyncio.shield(self._start_fetch(symbol))
+
+    async def get(self, symbol: str) -> MarketSnapshot:
+        """Возвращает снапшот по символу, при необходимости обновляя его."""
+        entry = self.store.latest(symbol)
+        if entry is not None:
+            age = entry.age
+            if age < self.ttl:
+                self.stats.hits += 1
+                return entry
+            if age < self.ttl + self.stale_ttl:
+                self.stats.stale_hits += 1
+                self._start_fetch(symbol)
+                return entry
+
+        if symbol in self._inflight:
+            self.stats.coalesced += 1
+        else:
+            self.stats.misses += 1
+        try:
+            # shield: отмена одного ожидающего не должна отменять общий запрос
+            return await asyncio.shield(self._start_fetch(symbol))
+        except Exception:
+            if entry is None:
+                raise
+            # Последний успешный снапшот вместо ошибки
+            self.stats.fallbacks += 1
+            return entry
+
+    def _start_fetch(self, symbol: str) -> asyncio.Task:
+        """Запускает запрос к бирже или возвращает уже выполняющийся."""
+        task = self._inflight.get(symbol)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(symbol))
+            self._inflight[symbol] = task
+            task.add_done_callback(lambda t: self._on_done(symbol, t))
+        return task
+
+    def _on_done(self, symbol: str, task: asyncio.Task) -> None:
+        if self._inflight.get(symbol) is task:
+            del self._inflight[symbol]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.errors += 1
+            logger.warning(f"Market data refresh for {symbol} failed: {task.exception()}")
+
+    async def _refresh(self, symbol: str) -> MarketSnapshot:
+        market_data = await self._fetch(symbol)
+        snapshot = self.store.publish(symbol, market_data)
+        self.stats.refreshes += 1
+        return snapshot
@@ -0,0 +1,172 @@
+"""Цепочка опционов в виде параллельных массивов NumPy."""
+
+from typing import Iterable, Iterator, List, Sequence, Union
+
+import numpy as np
+
+from .models import OptionQuote
+
+_FIELDS = ("symbol", "strike", "premium", "bid", "ask", "open_interest", "expiry", "is_call", "implied_vol")
+
+
+class OptionChain(Sequence[OptionQuote]):
+    """
+    Опционы доски, отсортированные по страйку (struct-of-arrays).
+
+    Колонки - массивы одной длины: strike, premium, bid, ask,
+    open_interest, implied_vol (NaN - нет значения), expiry (datetime64[D]),
+    is_call и symbol. Отсортированные страйки служат индексом: ближайший к
+    цене страйк ищется бинарным поиском. Расчеты работают с массивами;
+    OptionQuote строится только при обращении по индексу или итерации,
+    то есть на границе API и для выбранных ног лестницы.
+    """
+
+    def __init__(self, symbol, strike, premium, bid=None, ask=None, open_interest=None,
+                 expiry=None, is_call=None, implied_vol=None, _sorted: bool = False):
+        strike = np.asarray(strike, dtype=float)
+        n = len(strike)
+
+        def column(values, fill, dtype):
+            return np.full(n, fill, dtype=dtype) if values is None else np.asarray(values, dtype=dtype)
+
+        columns = [
+            np.asarray(symbol, dtype=object),
+            strike,
+            np.asarray(premium, dtype=float),
+            column(bid, np.nan, float),
+            column(ask, np.nan, float),
+            column(open_interest, 0.0, float),
+            column(expiry, "NaT", "datetime64[D]"),
+            column(is_call, False, bool),
+            column(implied_vol, np.nan, float),
+        ]
+        if not _sorted:
+            order = np.argsort(strike, kind="stable")
+            columns = [values[order] for values in columns]
+        (self.symbol, self.strike, self.premium, self.bid, self.ask, self.open_interest,
+         self.expiry, self.is_call, self.implied_vol) = columns
+        for values in columns:
+            values.flags.writeable = False
+
+    @classmethod
+    def from_quotes(cls, quotes: Iterable[OptionQuote]) -> "OptionChain":
+        quotes = list(quotes)
+        return cls(
+            symbol=[quote.symbol for quote in quotes],
+            strike=[quote.strike for quote in quotes],
+            premium=[quote.premium for quote in quotes],
+            expiry=[quote.expiry for quote in quotes],
+            is_call=[quote.option_type == "C" for quote in quotes],
+            implied_vol=[np.nan if quote.implied_vol is None else quote.implied_vol for quote in quotes]
+        )
+
+    def __len__(self) -> int:
+        return len(self.strike)
+
+    def __getitem__(self, index):
+        if isinstance(index, (slice, np.ndarray, list)):
+            return self.take(index)
+        return self.quote(int(index))
+
+    def __iter__(self) -> Iterator[OptionQuote]:
+        return (self.quote(i) for i in range(len(self)))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, OptionChain):
+            other = list(other)
+        return isinstance(other, list) and list(self) == other
+
+    def __repr__(self) -> str:
+        return f"OptionChain({len(self)} options)"
+
+    def quote(self, i: int) -> OptionQuote:
+        """Опцион i как объект OptionQuote."""
+        vol = self.implied_vol[i]
+        return OptionQuote(
+            symbol=str(self.symbol[i]),
+            strike=float(self.strike[i]),
+            premium=float(self.premium[i]),
+            option_type="C" if self.is_call[i] else "P",
+            expiry=str(self.expiry[i]),
+            implied_vol=None if np.isnan(vol) else float(vol)
+        )
+
+    def take(self, index) -> "OptionChain":
+        """Подцепочка по срезу, маске или индексам (порядок по страйку сохраняется)."""
+        if not isinstance(index, slice):
+            index = np.asarray(index)
+            if index.dtype != bool:
+                index = np.sort(index)
+        return OptionChain(*(getattr(self, name)[index] for name in _FIELDS), _sorted=True)
+
+    def puts(self) -> "OptionChain":
+        return self.take(~self.is_call)
+
+    def for_expiry(self, expiry) -> "OptionChain":
+        return self.take(self.expiry == np.datetime64(expiry, "D"))
+
+    def same_as(self, other: "OptionChain") -> bool:
+        """Совпадают ли все колонки поэлементно (NaN и NaT равны себе)."""
+        if len(self) != len(other):
+            return False
+        for name in _FIELDS:
+            a, b = getattr(self, name), getattr(other, name)
+            if a.dtype.kind == "M":
+                a, b = a.astype(np.int64), b.astype(np.int64)
+            if not np.array_equal(a, b, equal_nan=a.dtype.kind == "f"):
+                return False
+        return True
+
+    def for_date(self, target) -> "OptionChain":
+        """
+        Серии экспирации, ближайшей к дате target; при равенстве - более ранней.
+
+        Цепочка без дат экспирации возвращается как есть.
+        """
+        expiries = np.unique(self.expiry[~np.isnat(self.expiry)])
+        if len(expiries) <= 1:
+            return self
+        distance = np.abs((expiries - np.datetime64(target, "D")).astype(np.int64))
+        return self.for_expiry(expiries[np.argmin(distance)])
+
+    def years_to_expiry(self, as_of) -> np.ndarray:
+        """Срок до экспирации каждой серии в годах от даты as_of (NaN без даты)."""
+        days = (self.expiry - np.datetime64(as_of, "D")).astype(float)
+        return np.where(np.isnat(self.expiry), np.nan, days) / 365.0
+
+    def with_implied_vols(self, vols) -> "OptionChain":
+        """Копия цепочки с новой колонкой IV (NaN - нет решения)."""
+        columns = [getattr(self, name) for name in _FIELDS]
+        columns[-1] = np.asarray(vols, dtype=float)
+        return OptionChain(*columns, _sorted=True)
+
+    def nearest(self, price: float) -> int:
+        """Индекс страйка, ближайшего к price; при равенстве - меньший страйк."""
+        if not len(self):
+            raise ValueError("No options in chain")
+        i = int(np.searchsorted(self.strike, price))
+        if i == 0:
+            return 0
+        if i == len(self) or price - self.strike[i - 1] <= self.strike[i] - price:
+            # Первый из равных страйков слева, как у min() по списку
+            return int(np.searchsorted(self.strike, self.strike[i - 1]))
+        return i
+
+    def needs_model(self) -> np.ndarray:
+        """Маска опционов без рыночной премии или IV: их премия считается по модели."""
+        return (self.premium <= 0) | np.isnan(self.implied_vol)
+
+
+def as_chain(options: Union[OptionChain, List[OptionQuote], None]) -> OptionChain:
+    """Цепочка как есть или собранная из списка OptionQuote (или их словарей)."""
+    if isinstance(options, OptionChain):
+        return options
+    return OptionChain.from_quotes(OptionQuote.model_validate(option) for option in options or [])
+
+
+def mid_premium(bid: np.ndarray, ask: np.ndarray, last: np.ndarray, settle: np.ndarray) -> np.ndarray:
+    """Премия по доске: последняя сделка, иначе середина спреда, иначе расчетная цена."""
+    mid = np.where((bid > 0) & (ask > 0), 0.5 * (bid + ask), np.nan)
+    premium = np.where(last > 0, last, mid)
+    premium = np.where(np.isnan(premium), settle, premium)
+    return np.where(np.isnan(premium), 0.0, premium)
@@ -0,0 +1,320 @@
+"""Типизированные параметры ценообразования с перезагрузкой по mtime."""
+
+import copy
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+
+from .utils import get_default_config
+
+DEFAULT_CONFIG_PATH = Path(__file__).parent.parent / "config" / "settings.yaml"
+
+
+@dataclass(frozen=True)
+class FeeSchedule:
+    """Комиссии платформы по инструментам (доля от цены)."""
+    futures: float
+    put: float
+    forward: float
+
+
+@dataclass(frozen=True)
+class RiskParams:
+    """Параметры контроля капитала."""
+    capital_reserve: float
+    alpha_capital: float
+    var_alpha: float
+    var_window: float
+    ewma_lambda: float
+    horizon_days: float
+
+
+@dataclass(frozen=True)
+class MarketDataParams:
+    """Параметры получения рыночных данных."""
+    cache_ttl_s: float
+    stale_ttl_s: float
+    poll_interval_s: float
+    max_snapshot_age_s: float
+
+
+@dataclass(frozen=True)
+class LedgerParams:
+    """Хранение книги гарантий."""
+    path: str
+    snapshot_interval_s: float
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "LedgerParams":
+        if not isinstance(cfg["path"], str):
+            raise TypeError(f"ledger.path must be a string, got {cfg['path']!r}")
+        return cls(path=cfg["path"], snapshot_interval_s=float(cfg["snapshot_interval_s"]))
+
+
+@dataclass(frozen=True)
+class HistoryParams:
+    """Локальное хранилище дневных свечей."""
+    path: str
+    lookback_days: int
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "HistoryParams":
+        if not isinstance(cfg["path"], str):
+            raise TypeError(f"history.path must be a string, got {cfg['path']!r}")
+        return cls(path=cfg["path"], lookback_days=int(cfg["lookback_days"]))
+
+
+@dataclass(frozen=True)
+class VolatilityParams:
+    """Оценка реализованной волатильности по дневным свечам."""
+    estimator: str
+    window: int
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "VolatilityParams":
+        estimator = cfg["estimator"]
+        if estimator not in ("close", "ewma", "parkinson", "garman_klass", "yang_zhang"):
+            raise ValueError(f"Unknown volatility.estimator: {estimator!r}")
+        window = int(cfg["window"])
+        if window < 2:
+            raise ValueError(f"volatility.window must be at least 2, got {window}")
+        return cls(estimator=estimator, window=window)
+
+
+@dataclass(frozen=True)
+class BreakerParams:
+    """Автоматы отключения эндпоинтов ISS и адаптивные таймауты."""
+    failure_threshold: int
+    reset_timeout_s: float
+    min_timeout_s: float
+    max_timeout_s: float
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "BreakerParams":
+        failure_threshold = int(cfg["failure_threshold"])
+        if failure_threshold < 1:
+            raise ValueError(f"circuit_breaker.failure_threshold must be at least 1, got {failure_threshold}")
+        min_timeout, max_timeout = float(cfg["min_timeout_s"]), float(cfg["max_timeout_s"])
+        if not 0 < min_timeout <= max_timeout:
+            raise ValueError(f"circuit_breaker timeouts must satisfy 0 < min <= max, "
+                             f"got {min_timeout} and {max_timeout}")
+        return cls(
+            failure_threshold=failure_threshold,
+            reset_timeout_s=float(cfg["reset_timeout_s"]),
+            min_timeout_s=min_timeout,
+            max_timeout_s=max_timeout
+        )
+
+
+@dataclass(frozen=True)
+class SharedSnapshotParams:
+    """Снапшот в разделяемой памяти, который публикует процесс hedgefarm.ingest."""
+    path: str
+    capacity_bytes: int
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "SharedSnapshotParams":
+        if not isinstance(cfg["path"], str):
+            raise TypeError(f"shared_snapshot.path must be a string, got {cfg['path']!r}")
+        capacity = int(cfg["capacity_bytes"])
+        if capacity <= 0:
+            raise ValueError(f"shared_snapshot.capacity_bytes must be positive, got {capacity}")
+        return cls(path=cfg["path"], capacity_bytes=capacity)
+
+
+@dataclass(frozen=True)
+class BatchingParams:
+    """Микро-пакетирование одновременных запросов /price."""
+    enabled: bool
+    max_batch: int
+    max_wait_ms: float
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "BatchingParams":
+        enabled = cfg["enabled"]
+        if not isinstance(enabled, bool):
+            raise TypeError(f"batching.enabled must be a boolean, got {enabled!r}")
+        max_batch = int(cfg["max_batch"])
+        max_wait_ms = float(cfg["max_wait_ms"])
+        if max_batch < 1 or max_wait_ms < 0:
+            raise ValueError(f"batching requires max_batch >= 1 and max_wait_ms >= 0, "
+                             f"got {max_batch} and {max_wait_ms}")
+        return cls(enabled=enabled, max_batch=max_batch, max_wait_ms=max_wait_ms)
+
+
+@dataclass(frozen=True)
+class ResponseCacheParams:
+    """Кэш готовых ответов /price и /price/detailed."""
+    max_entries: int
+    max_bytes: int
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "ResponseCacheParams":
+        max_entries = int(cfg["max_entries"])
+        max_bytes = int(cfg["max_bytes"])
+        if max_entries < 0 or max_bytes < 0:
+            raise ValueError(f"response_cache limits must be non-negative, got {max_entries} and {max_bytes}")
+        return cls(max_entries=max_entries, max_bytes=max_bytes)
+
+
+@dataclass(frozen=True)
+class LadderParams:
+    """Ограничения оптимизатора лестницы PUT."""
+    optimize: bool
+    max_weight: float
+    max_legs: int
+    premium_budget_pct: float
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any]) -> "LadderParams":
+        optimize = cfg["optimize"]
+        if not isinstance(optimize, bool):
+            raise TypeError(f"ladder.optimize must be a boolean, got {optimize!r}")
+        return cls(
+            optimize=optimize,
+            max_weight=float(cfg["max_weight"]),
+            max_legs=int(cfg["max_legs"]),
+            premium_budget_pct=float(cfg["premium_budget_pct"])
+        )
+
+
+@dataclass(frozen=True)
+class PricingParams:
+    """Неизменяемый набор параметров из settings.yaml."""
+    fee_pct: FeeSchedule
+    basis_discount: float
+    forward_delta_pct: float
+    go_pct: float
+    risk: RiskParams
+    market_data: MarketDataParams
+    ladder: LadderParams
+    ledger: LedgerParams
+    history: HistoryParams
+    volatility: VolatilityParams
+    circuit_breaker: BreakerParams
+    shared_snapshot: SharedSnapshotParams
+    batching: BatchingParams
+    response_cache: ResponseCacheParams
+    version: int = 0
+
+    @classmethod
+    def from_dict(cls, cfg: Dict[str, Any], version: int = 0) -> "PricingParams":
+        """Строит параметры из словаря, дополняя его значениями по умолчанию."""
+        cfg = _merge(get_default_config(), cfg or {})
+        return cls(
+            fee_pct=FeeSchedule(**{k: float(v) for k, v in cfg["fee_pct"].items()}),
+            basis_discount=float(cfg["basis_discount"]),
+            forward_delta_pct=float(cfg["forward_delta_pct"]),
+            go_pct=float(cfg["go_pct"]),
+            risk=RiskParams(**{k: float(v) for k, v in cfg["risk"].items()}),
+            market_data=MarketDataParams(**{k: float(v) for k, v in cfg["market_data"].items()}),
+            ladder=LadderParams.from_dict(cfg["ladder"]),
+            ledger=LedgerParams.from_dict(cfg["ledger"]),
+            history=HistoryParams.from_dict(cfg["history"]),
+            volatility=VolatilityParams.from_dict(cfg["volatility"]),
+            circuit_breaker=BreakerParams.from_dict(cfg["circuit_breaker"]),
+            shared_snapshot=SharedSnapshotParams.from_dict(cfg["shared_snapshot"]),
+            batching=BatchingParams.from_dict(cfg["batching"]),
+            response_cache=ResponseCacheParams.from_dict(cfg["response_cache"]),
+            version=version
+        )
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Рекурсивно накладывает override на копию base (только известные ключи)."""
+    result = copy.deepcopy(base)
+    for key, value in override.items():
+        if key not in result:
+            continue
+        if isinstance(result[key], dict) and isinstance(value, dict):
+            result[key] = _merge(result[key], value)
+        else:
+            result[key] = value
+    return result
+
+
+class ConfigLoader:
+    """
+    Держит текущие PricingParams и перечитывает файл только при смене mtime.
+
+    mtime проверяется не чаще раза в check_interval секунд, поэтому на
+    горячем пути нет ни чтения файла, ни разбора YAML. Новый объект
+    параметров подменяется целиком, читатели видят либо старую, либо новую
+    версию. Если файл поврежден (ошибка YAML, неверный тип значения или
+    секции), остаются последние корректные параметры.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CONFIG_PATH, check_interval: float = 1.0):
+        self.path = Path(path)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._params: Optional[PricingParams] = None
+        self._mtime: Optional[float] = None
+        self._checked_at = float("-inf")
+        self._version = 0
+
+    def get(self) -> PricingParams:
+        """Возвращает актуальные параметры."""
+        params = self._params
+        if params is not None and time.monotonic() - self._checked_at < self.check_interval:
+            return params
+        return self._reload_if_changed()
+
+    def _reload_if_changed(self) -> PricingParams:
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+
+            if self._params is not None and mtime == self._mtime:
+                return self._params
+
+            cfg = self._read() if mtime is not None else None
+            params = self._build(cfg) if cfg is not None else None
+            # Запоминаем mtime и при ошибке, чтобы не перечитывать тот же файл на каждом вызове
+            self._mtime = mtime
+            if params is None:
+                if self._params is not None:
+                    return self._params
+                if mtime is None:
+                    print(f"Warning: Configuration file not found: {self.path}, using defaults")
+                params = PricingParams.from_dict({}, version=self._version + 1)
+
+            self._version = params.version
+            self._params = params
+            return self._params
+
+    def _build(self, cfg: Dict[str, Any]) -> Optional[PricingParams]:
+        """Строит параметры; некорректные значения или секции не приводят к исключению."""
+        try:
+            return PricingParams.from_dict(cfg, version=self._version + 1)
+        except (TypeError, ValueError, AttributeError) as e:
+            print(f"Warning: Invalid configuration values in {self.path}: {e}")
+            return None
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cfg = yaml.safe_load(f)
+        except (yaml.YAMLError, OSError) as e:
+            print(f"Warning: Error loading configuration file: {e}")
+            return None
+        if not isinstance(cfg, dict):
+            print("Warning: Empty configuration file")
+            return None
+        return cfg
+
+
+_loader = ConfigLoader()
+
+
+def get_params() -> PricingParams:
+    """Возвращает текущие параметры ценообразования."""
+    return _loader.get()
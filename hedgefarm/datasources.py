@@ -1,11 +1,173 @@
 """Модуль для получения данных с Московской биржи (MOEX)."""
 
+import asyncio
+import time
 import requests
+import httpx
 import numpy as np
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from typing import List, Dict, Any, Optional
-from .models import FuturesQuote, OptionQuote, MarketData
+from urllib.parse import urlsplit
+from . import iss
+from .breaker import CircuitBreaker, CircuitOpenError
+from .chain import OptionChain, mid_premium
+from .config import BreakerParams
+from .models import FuturesContract, FuturesQuote, MarketData
+from .pricing.iv import chain_vols
 from .utils import get_moex_token
+from .volatility import RollingVolatility
+
+
+def _auth_headers() -> Dict[str, str]:
+    """Возвращает заголовок авторизации, если задан токен MOEX."""
+    try:
+        token = get_moex_token()
+        return {"Authorization": f"Bearer {token}"}
+    except ValueError:
+        # Работаем без токена для публичных данных
+        return {}
+
+
+def _build_option_chain(underlying: str, fut_price: float, option_type: str = "P") -> OptionChain:
+    """Строит демо-цепочку опционов вокруг цены фьючерса."""
+    strikes = fut_price * np.array([0.95, 0.97, 1.0, 1.03, 1.05])
+    
+    # Упрощенный расчет премии (в реальности брался бы из стакана)
+    time_value = np.abs(fut_price - strikes) * 0.1 + 50  # базовая премия
+    
+    chain = OptionChain(
+        symbol=[f"{underlying}_{strike:.0f}_{option_type}" for strike in strikes],
+        strike=strikes,
+        premium=time_value,
+        expiry=np.full(len(strikes), np.datetime64(date.today() + timedelta(days=90), "D")),  # квартал для демо
+        is_call=np.full(len(strikes), option_type == "C"),
+        _sorted=True
+    )
+    
+    # Волатильность обращается из премий сразу для всей цепочки;
+    # NaN остается там, где премия вне безарбитражных границ
+    return chain.with_implied_vols(chain_vols(chain, fut_price))
+
+
+def _board_chain(board: OptionChain, underlying: str, fut_price: float,
+                 option_type: str = "P") -> OptionChain:
+    """
+    Опционы типа option_type всех живых экспираций доски с IV от цены фьючерса.
+    
+    IV каждой серии считается по ее собственному сроку до экспирации;
+    экспирацию под срок хеджа выбирает расчет (pricing.curve.term_options).
+    Без живых серий бросает ValueError: снапшот не публикуется, и расчеты
+    идут по последнему успешному снапшоту, а не по демо-цепочке.
+    """
+    chain = board.take(board.is_call == (option_type == "C"))
+    if not len(chain):
+        raise ValueError(f"No live {underlying} {option_type} options on the ISS board")
+    return chain.with_implied_vols(chain_vols(chain, fut_price))
+
+
+def _historical_volatility(estimators: Dict[str, RollingVolatility], symbol: str, days: int) -> float:
+    """Текущая оценка по свечам, пока она не готова - демо-оценка."""
+    estimator = estimators.get(symbol)
+    if estimator is not None and estimator.ready:
+        return estimator.value
+    return _demo_volatility(days)
+
+
+def _demo_volatility(days: int) -> float:
+    """Демо-оценка годовой волатильности."""
+    # В реальной реализации здесь загружалась бы история цен
+    # и рассчитывалась волатильность
+    np.random.seed(42)  # для воспроизводимости в демо
+    daily_returns = np.random.normal(0, 0.02, days)  # 2% дневная волатильность
+    return np.std(daily_returns) * np.sqrt(252)  # годовая волатильность
+
+
+def _last_price(data: Any) -> Optional[float]:
+    """Цена LAST первой строки блока marketdata (None, если блока или цены нет)."""
+    marketdata = iss.tables(data).get("marketdata")
+    return marketdata.get("LAST") if marketdata is not None else None
+
+
+def _parse_candles(candles: iss.ISSTable) -> np.ndarray:
+    """Таблица candles ISS в массив (day, open, high, low, close, volume)."""
+    begin = np.array([value[:10] for value in candles.column("begin")], dtype="datetime64[D]")
+    fields = [candles.column(name) for name in ("open", "high", "low", "close", "volume")]
+    return np.vstack([begin.astype(np.int64).astype(float)] + fields)
+
+
+def _parse_option_board(data: Dict[str, Any], as_of: date) -> OptionChain:
+    """
+    Все живые серии опционной доски из ответа ISS securities + marketdata.
+
+    Колонки собираются массивами без объектов на каждую серию; котировки
+    marketdata сопоставляются с securities по SECID. Премия - последняя
+    сделка, иначе середина спреда, иначе расчетная цена (текущая или
+    прошлой сессии).
+    """
+    blocks = iss.tables(data)
+    securities, marketdata = blocks["securities"], blocks["marketdata"]
+    secids = securities.column("SECID")
+    quotes = {secid: i for i, secid in enumerate(marketdata.column("SECID"))}
+    # Серия без котировки ссылается на дописанный в конец NaN
+    rows = np.array([quotes.get(secid, len(marketdata)) for secid in secids], dtype=np.int64)
+
+    def quoted(name: str) -> np.ndarray:
+        if name not in marketdata:
+            return np.full(len(secids), np.nan)
+        return np.append(marketdata.column(name).astype(float), np.nan)[rows]
+
+    def listed(name: str) -> np.ndarray:
+        if name not in securities:
+            return np.full(len(secids), np.nan)
+        return securities.column(name).astype(float)
+
+    settle = quoted("SETTLEPRICE")
+    settle = np.where(settle > 0, settle, listed("PREVSETTLEPRICE"))
+    open_interest = quoted("OPENPOSITION")
+    open_interest = np.where(np.isnan(open_interest), listed("PREVOPENPOSITION"), open_interest)
+    expiry = np.array([value[:10] for value in securities.column("LASTTRADEDATE")], dtype="datetime64[D]")
+
+    board = OptionChain(
+        symbol=secids,
+        strike=securities.column("STRIKE").astype(float),
+        premium=mid_premium(quoted("BID"), quoted("OFFER"), quoted("LAST"), settle),
+        bid=quoted("BID"),
+        ask=quoted("OFFER"),
+        open_interest=np.nan_to_num(open_interest),
+        expiry=expiry,
+        is_call=securities.column("OPTIONTYPE") == "C"
+    )
+    return board.take(board.expiry >= np.datetime64(as_of, "D"))
+
+
+def _parse_futures_curve(data: Dict[str, Any], asset: str, as_of: date) -> List[FuturesContract]:
+    """
+    Серии актива из ответа ISS securities + marketdata, по возрастанию экспирации.
+
+    Цена серии - LAST, без сделок - расчетная цена текущей или прошлой сессии.
+    Истекшие серии и серии без цены пропускаются.
+    """
+    blocks = iss.tables(data)
+    securities, marketdata = blocks["securities"], blocks["marketdata"]
+    quotes = {secid: i for i, secid in enumerate(marketdata.column("SECID"))}
+    last, settle = marketdata.column("LAST"), marketdata.column("SETTLEPRICE")
+    prev_settle = securities.column("PREVSETTLEPRICE")
+    assets, expiries = securities.column("ASSETCODE"), securities.column("LASTTRADEDATE")
+
+    contracts = []
+    for i, secid in enumerate(securities.column("SECID")):
+        if assets[i] != asset:
+            continue
+        expiry = date.fromisoformat(expiries[i])
+        if expiry < as_of:
+            continue
+        j = quotes.get(secid)
+        candidates = [last[j], settle[j]] if j is not None else []
+        # NaN - пустое значение ISS, как и 0
+        price = next((p for p in candidates + [prev_settle[i]] if p > 0), None)
+        if price is not None:
+            contracts.append(FuturesContract(secid=secid, expiry=expiry, price=float(price)))
+    return sorted(contracts, key=lambda contract: contract.expiry)
 
 
 class MOEXClient:
@@ -16,12 +178,9 @@ class MOEXClient:
     def __init__(self):
         self.session = requests.Session()
         # Добавляем токен для аутентификации если доступен
-        try:
-            token = get_moex_token()
-            self.session.headers.update({"Authorization": f"Bearer {token}"})
-        except ValueError:
-            # Работаем без токена для публичных данных
-            pass
+        self.session.headers.update(_auth_headers())
+        # Оценки волатильности по свечам, которые ведет владелец истории
+        self.volatility: Dict[str, RollingVolatility] = {}
         
     def get_last_price(self, symbol: str) -> float:
         """Получает последнюю цену по символу через MOEX ISS API."""
@@ -38,14 +197,10 @@ class MOEXClient:
                 response.raise_for_status()
                 data = response.json()
                 
-                if "marketdata" in data and data["marketdata"]["data"]:
-                    # Извлекаем последнюю цену из ответа MOEX
-                    marketdata = data["marketdata"]["data"][0]
-                    # Индекс для LAST (последняя цена) обычно 12 в MOEX API
-                    last_price = marketdata[12] if len(marketdata) > 12 and marketdata[12] else None
-                    
-                    if last_price:
-                        return float(last_price)
+                # Последняя цена по имени колонки LAST
+                last_price = _last_price(data)
+                if last_price:
+                    return float(last_price)
                 
                 # Fallback если не удалось получить реальные данные
                 print(f"Warning: Could not fetch real data for {symbol}, using fallback")
@@ -68,12 +223,9 @@ class MOEXClient:
                 response.raise_for_status()
                 data = response.json()
                 
-                if "marketdata" in data and data["marketdata"]["data"]:
-                    marketdata = data["marketdata"]["data"][0]
-                    last_price = marketdata[12] if len(marketdata) > 12 and marketdata[12] else None
-                    
-                    if last_price:
-                        return float(last_price)
+                last_price = _last_price(data)
+                if last_price:
+                    return float(last_price)
                 
                 # Fallback
                 print(f"Warning: Could not fetch real USD/RUB rate, using fallback")
@@ -96,35 +248,15 @@ class MOEXClient:
             updated_at=datetime.utcnow()
         )
     
-    def get_option_chain(self, underlying: str, option_type: str = "P") -> List[OptionQuote]:
+    def get_option_chain(self, underlying: str, option_type: str = "P") -> OptionChain:
         """Получает цепочку опционов."""
         # Упрощенная реализация для демо
         fut_price = self.get_last_price(underlying)
-        strikes = [fut_price * k for k in [0.95, 0.97, 1.0, 1.03, 1.05]]
-        
-        options = []
-        for strike in strikes:
-            # Упрощенный расчет премии (в реальности брался бы из стакана)
-            time_value = abs(fut_price - strike) * 0.1 + 50  # базовая премия
-            
-            options.append(OptionQuote(
-                symbol=f"{underlying}_{strike:.0f}_{option_type}",
-                strike=strike,
-                premium=time_value,
-                option_type=option_type,
-                expiry="2024-06-15",  # фиксированная дата для демо
-                implied_vol=0.25
-            ))
-        
-        return options
+        return _build_option_chain(underlying, fut_price, option_type)
     
     def get_historical_volatility(self, symbol: str, days: int = 10) -> float:
-        """Вычисляет историческую волатильность."""
-        # В реальной реализации здесь загружалась бы история цен
-        # и рассчитывалась волатильность
-        np.random.seed(42)  # для воспроизводимости в демо
-        daily_returns = np.random.normal(0, 0.02, days)  # 2% дневная волатильность
-        return np.std(daily_returns) * np.sqrt(252)  # годовая волатильность
+        """Годовая волатильность из оценки по свечам (демо-оценка без истории)."""
+        return _historical_volatility(self.volatility, symbol, days)
     
     def get_market_data(self, symbol: str = "WHEAT") -> MarketData:
         """Получает полный набор рыночных данных."""
@@ -133,4 +265,281 @@ class MOEXClient:
             put_options=self.get_option_chain(symbol, "P"),
             usd_rate=self.get_last_price("USD000UTSTOM"),
             volatility=self.get_historical_volatility(symbol)
-        )
\ No newline at end of file
+        )
+
+
+class AsyncMOEXClient:
+    """
+    Асинхронный клиент MOEX ISS.
+    
+    Использует общий пул соединений httpx с keep-alive и ограничивает
+    число одновременных запросов к одному хосту. Независимые запросы
+    снапшота (фьючерс, курс, цепочка опционов) выполняются параллельно,
+    поэтому задержка равна самому медленному запросу, а не их сумме.
+    
+    Пул соединений привязан к event loop, в котором клиент впервые
+    использован; рассчитан на работу в одном loop (loop приложения).
+    При вызове из другого loop старый пул закрывается и создается новый.
+    
+    У каждого эндпоинта свой CircuitBreaker: таймаут подстраивается под
+    наблюдаемую задержку (timeout - его верхняя граница), а при серии
+    ошибок запросы к эндпоинту сразу завершаются CircuitOpenError.
+    Цены не подменяются константами: ошибка биржи доходит до вызывающего,
+    и сервис продолжает работать по последнему успешному снапшоту.
+    """
+    
+    BASE_URL = MOEXClient.BASE_URL
+    
+    def __init__(self, max_connections: int = 20, max_keepalive: int = 10,
+                 per_host_limit: int = 8, timeout: float = 10.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None,
+                 failure_threshold: int = 3, reset_timeout: float = 5.0,
+                 min_timeout: float = 0.5):
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=30.0
+        )
+        self._timeout = httpx.Timeout(timeout)
+        self._per_host_limit = per_host_limit
+        self._headers = _auth_headers()
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._breaker_args = dict(failure_threshold=failure_threshold, reset_timeout=reset_timeout,
+                                  min_timeout=min_timeout, max_timeout=timeout)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        # Оценки волатильности по свечам, которые ведет владелец истории
+        self.volatility: Dict[str, RollingVolatility] = {}
+    
+    async def _ensure_client(self) -> httpx.AsyncClient:
+        """Создает пул соединений, привязанный к текущему event loop."""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Соединения и семафоры нельзя переносить между event loop'ами
+            stale_client, stale_loop = self._client, self._loop
+            self._client = httpx.AsyncClient(
+                headers=self._headers,
+                limits=self._limits,
+                timeout=self._timeout,
+                transport=self._transport
+            )
+            self._loop = loop
+            self._host_limits = {}
+            if stale_client is not None:
+                await self._close_stale_client(stale_client, stale_loop)
+        return self._client
+    
+    @staticmethod
+    async def _close_stale_client(client: httpx.AsyncClient,
+                                  loop: Optional[asyncio.AbstractEventLoop]) -> None:
+        """Закрывает пул, созданный в другом event loop."""
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            # Пул закрывается в своем loop, чтобы не трогать его сокеты из текущего
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+        try:
+            await client.aclose()
+        except Exception as e:
+            # Сокеты завершенного loop закроет сборщик мусора
+            print(f"Warning: Could not close stale MOEX connection pool: {e}")
+
+    @classmethod
+    def from_params(cls, params: BreakerParams, **kwargs) -> "AsyncMOEXClient":
+        """Клиент с автоматами и таймаутами из секции circuit_breaker."""
+        return cls(
+            timeout=params.max_timeout_s,
+            failure_threshold=params.failure_threshold,
+            reset_timeout=params.reset_timeout_s,
+            min_timeout=params.min_timeout_s,
+            **kwargs
+        )
+    
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Автомат эндпоинта (URL без параметров запроса)."""
+        breaker = self.breakers.get(url)
+        if breaker is None:
+            breaker = self.breakers[url] = CircuitBreaker(**self._breaker_args)
+        return breaker
+    
+    async def _get_json(self, url: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Выполняет GET-запрос с ограничением параллелизма на хост и автоматом эндпоинта."""
+        breaker = self.breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {url}")
+        try:
+            client = await self._ensure_client()
+            host = urlsplit(url).netloc
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                semaphore = self._host_limits[host] = asyncio.Semaphore(self._per_host_limit)
+            
+            async with semaphore:
+                # Задержка считается без ожидания в очереди семафора
+                started = time.monotonic()
+                response = await client.get(url, params=params, timeout=breaker.timeout)
+        except httpx.TimeoutException:
+            breaker.record_failure(timed_out=True)
+            raise
+        except httpx.TransportError:
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        if response.status_code >= 500 or response.status_code == 429:
+            breaker.record_failure()
+        else:
+            breaker.record_success(time.monotonic() - started)
+        response.raise_for_status()
+        return response.json()
+    
+    async def get_last_price(self, symbol: str) -> float:
+        """
+        Получает последнюю цену по символу через MOEX ISS API.
+        
+        Без цены (ошибка биржи, разомкнутый автомат, пустой LAST) бросает
+        исключение: снапшот не публикуется, и расчеты идут по последнему
+        успешному снапшоту.
+        """
+        if symbol == "WHEAT":
+            url = f"{self.BASE_URL}/engines/futures/markets/forts/securities/{symbol}.json"
+        elif symbol == "USD000UTSTOM" or symbol == "USD/RUB_TOM":
+            url = f"{self.BASE_URL}/engines/currency/markets/selt/securities/USD000UTSTOM.json"
+        else:
+            raise ValueError(f"Unknown symbol: {symbol}")
+        
+        params = {
+            "iss.only": "marketdata",
+            "iss.meta": "off"
+        }
+        
+        data = await self._get_json(url, params)
+        last_price = _last_price(data)
+        if not last_price:
+            raise ValueError(f"No LAST price for {symbol} in ISS response")
+        return float(last_price)
+    
+    async def get_futures_curve(self, asset: str = "WHEAT") -> List[FuturesContract]:
+        """
+        Все листинговые серии актива одним запросом к ISS.
+        
+        Ошибка биржи (в том числе разомкнутый автомат) пробрасывается.
+        """
+        url = f"{self.BASE_URL}/engines/futures/markets/forts/securities.json"
+        params = {
+            "assets": asset,
+            "iss.only": "securities,marketdata",
+            "iss.meta": "off"
+        }
+        data = await self._get_json(url, params)
+        return _parse_futures_curve(data, asset, date.today())
+    
+    async def get_option_board(self, asset: str = "WHEAT") -> OptionChain:
+        """
+        Все серии и экспирации опционов на актив одним запросом к ISS.
+        
+        Ошибка биржи (в том числе разомкнутый автомат) пробрасывается.
+        """
+        url = f"{self.BASE_URL}/engines/futures/markets/options/securities.json"
+        params = {
+            "assets": asset,
+            "iss.only": "securities,marketdata",
+            "iss.meta": "off"
+        }
+        data = await self._get_json(url, params)
+        return _parse_option_board(data, date.today())
+    
+    async def get_option_chain(self, underlying: str, option_type: str = "P",
+                               futures_price: Optional[float] = None) -> OptionChain:
+        """Цепочка всех экспираций с доски; фьючерс не запрашивается повторно, если цена известна."""
+        board_task = asyncio.ensure_future(self.get_option_board(underlying))
+        try:
+            if futures_price is None:
+                futures_price = await self.get_last_price(underlying)
+            return _board_chain(await board_task, underlying, futures_price, option_type)
+        finally:
+            board_task.cancel()
+    
+    def get_historical_volatility(self, symbol: str, days: int = 10) -> float:
+        """Годовая волатильность из оценки по свечам (демо-оценка без истории)."""
+        return _historical_volatility(self.volatility, symbol, days)
+    
+    async def get_candles(self, secid: str, start: date, interval: int = 24,
+                          engine: str = "futures", market: str = "forts") -> np.ndarray:
+        """
+        Свечи с даты start по сегодня в формате history.COLUMNS.
+        
+        ISS отдает свечи страницами; следующая страница определяется курсором
+        ответа, а без курсора - до первой пустой страницы.
+        """
+        url = f"{self.BASE_URL}/engines/{engine}/markets/{market}/securities/{secid}/candles.json"
+        params = {"from": start.isoformat(), "interval": interval, "iss.meta": "off"}
+        pages = []
+        offset: Optional[int] = 0
+        while offset is not None:
+            data = await self._get_json(url, {**params, "start": offset})
+            candles = iss.table(data, "candles")
+            if len(candles):
+                pages.append(_parse_candles(candles))
+            offset = iss.next_start(data, "candles", offset, len(candles))
+        if not pages:
+            return np.empty((6, 0))
+        return np.concatenate(pages, axis=1)
+    
+    async def get_market_data(self, symbol: str = "WHEAT") -> MarketData:
+        """
+        Получает полный набор рыночных данных параллельными запросами.
+        
+        Кривая и опционная доска запрашиваются целиком одновременно; IV
+        цепочки считается от ближней серии той же кривой. Если живых серий
+        на кривой нет, цена берется по одиночному контракту.
+        
+        Любая ошибка биржи пробрасывается: неполный снапшот не публикуется,
+        и кэш отдает последний успешный с флагом stale.
+        """
+        curve_task = asyncio.ensure_future(self.get_futures_curve(symbol))
+        board_task = asyncio.ensure_future(self.get_option_board(symbol))
+        
+        async def front_price() -> float:
+            curve = await curve_task
+            return curve[0].price if curve else await self.get_last_price(symbol)
+        
+        futures_task = asyncio.ensure_future(front_price())
+        
+        async def option_chain() -> OptionChain:
+            # Цепочка ждет уже запущенные запросы доски и фьючерса, а не делает свои
+            board = await board_task
+            return _board_chain(board, symbol, await futures_task, "P")
+        
+        try:
+            fut_price, put_options, usd_rate = await asyncio.gather(
+                futures_task,
+                option_chain(),
+                self.get_last_price("USD000UTSTOM")
+            )
+        finally:
+            futures_task.cancel()
+            curve_task.cancel()
+            board_task.cancel()
+        
+        return MarketData(
+            futures_quote=FuturesQuote(
+                symbol=symbol,
+                price=fut_price,
+                volume=1000,
+                updated_at=datetime.utcnow()
+            ),
+            put_options=put_options,
+            usd_rate=usd_rate,
+            volatility=self.get_historical_volatility(symbol),
+            futures_curve=curve_task.result()
+        )
+    
+    async def aclose(self) -> None:
+        """Закрывает пул соединений."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
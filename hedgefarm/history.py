@@ -0,0 +1,156 @@
+"""Локальное колоночное хранилище дневных свечей MOEX с инкрементальной синхронизацией."""
+
+import logging
+import os
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import httpx
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Строки файла - колонки; дата хранится как число дней от 1970-01-01
+COLUMNS = ("day", "open", "high", "low", "close", "volume")
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_ordinals(days: np.ndarray) -> np.ndarray:
+    """Дни от 1970-01-01 в date.toordinal() (формат RiskEngine)."""
+    return np.asarray(days).astype(np.int64) + _EPOCH_ORDINAL
+
+
+class CandleHistory:
+    """
+    Свечи одного инструмента: массив (len(COLUMNS), n) float64.
+
+    Каждая колонка - непрерывная строка массива, поэтому close, day и
+    остальные свойства - представления без копирования (в том числе поверх
+    memmap файла).
+    """
+
+    def __init__(self, data: np.ndarray):
+        if data.ndim != 2 or data.shape[0] != len(COLUMNS):
+            raise ValueError(f"Expected array of shape ({len(COLUMNS)}, n), got {data.shape}")
+        self.data = data
+
+    @classmethod
+    def empty(cls) -> "CandleHistory":
+        return cls(np.empty((len(COLUMNS), 0)))
+
+    def __len__(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def day(self) -> np.ndarray:
+        return self.data[0]
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.data[1]
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.data[2]
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.data[3]
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.data[4]
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.data[5]
+
+    @property
+    def dates(self) -> np.ndarray:
+        """Даты свечей как datetime64[D] (копия)."""
+        return self.data[0].astype("datetime64[D]")
+
+    @property
+    def last_date(self) -> Optional[date]:
+        if not len(self):
+            return None
+        return date.fromordinal(int(self.data[0, -1]) + _EPOCH_ORDINAL)
+
+
+class HistoryStore:
+    """
+    Каталог файлов <secid>.npy с дневными свечами.
+
+    Файлы читаются через np.load(mmap_mode="r"): теплый старт не разбирает
+    данные, а отображает их в память за миллисекунды. Синхронизация
+    запрашивает у ISS только хвост начиная с последнего сохраненного дня
+    (он мог быть неполным) и атомарно переписывает файл.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._views: Dict[str, Tuple[float, CandleHistory]] = {}
+
+    def path(self, secid: str) -> Path:
+        return self.root / f"{secid}.npy"
+
+    def load(self, secid: str) -> CandleHistory:
+        """История инструмента; пустая, если файла нет или он поврежден."""
+        path = self.path(secid)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            return CandleHistory.empty()
+        cached = self._views.get(secid)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            history = CandleHistory(np.load(path, mmap_mode="r"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load candle history {path}: {e}")
+            return CandleHistory.empty()
+        self._views[secid] = (mtime, history)
+        return history
+
+    def write(self, secid: str, data: np.ndarray) -> CandleHistory:
+        """Атомарно записывает историю (временный файл + os.replace)."""
+        history = CandleHistory(np.ascontiguousarray(data, dtype=float))
+        path = self.path(secid)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, history.data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._views.pop(secid, None)
+        return self.load(secid)
+
+    def append(self, secid: str, candles: np.ndarray) -> CandleHistory:
+        """Дописывает свечи; сохраненные дни не раньше первой новой свечи заменяются."""
+        history = self.load(secid)
+        if not candles.shape[1]:
+            return history
+        keep = history.data[:, history.data[0] < candles[0, 0]]
+        return self.write(secid, np.concatenate([keep, candles], axis=1))
+
+    async def sync(self, client, secid: str, lookback_days: int,
+                   today: Optional[date] = None) -> int:
+        """
+        Догружает недостающий хвост истории; возвращает число полученных свечей.
+
+        Без сохраненной истории загружаются последние lookback_days дней.
+        При ошибке ISS сохраненная история остается без изменений.
+        """
+        today = today or date.today()
+        last = self.load(secid).last_date
+        start = last if last is not None else today - timedelta(days=lookback_days)
+        try:
+            candles = await client.get_candles(secid, start)
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            logger.warning(f"Candle sync for {secid} failed: {e}")
+            return 0
+        self.append(secid, candles)
+        return candles.shape[1]
@@ -0,0 +1,91 @@
+"""
+Процесс загрузки рыночных данных для нескольких воркеров API.
+
+Опрашивает ISS и публикует снапшоты в сегменты разделяемой памяти
+(shared_snapshot.path), из которых их читают воркеры uvicorn/gunicorn.
+Нагрузка на биржу не зависит от числа воркеров, и все воркеры считают
+по одной версии снапшота.
+
+Запуск: python -m hedgefarm.ingest
+"""
+
+import asyncio
+import logging
+import signal
+from typing import Iterable, Optional
+
+from .cache import SnapshotCache
+from .config import PricingParams, get_params
+from .datasources import AsyncMOEXClient
+from .history import HistoryStore
+from .shared import SnapshotSegment, segment_path
+from .snapshots import MarketDataPoller, MarketSnapshot, SnapshotStore
+from .utils import project_path
+from .volatility import RollingVolatility
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SECID = "WHEAT"
+
+
+async def run(symbols: Iterable[str] = ("WHEAT",), params: Optional[PricingParams] = None,
+              stop: Optional[asyncio.Event] = None) -> None:
+    """Опрашивает ISS и публикует снапшоты, пока не установлен stop."""
+    params = params or get_params()
+    if not params.shared_snapshot.path:
+        raise ValueError("shared_snapshot.path is not configured")
+    root = project_path(params.shared_snapshot.path)
+    segments = {symbol: SnapshotSegment.create(segment_path(root, symbol), params.shared_snapshot.capacity_bytes)
+                for symbol in symbols}
+    # Версии продолжаются после перезапуска: кэши воркеров ключуются версией
+    store = SnapshotStore(version=max(segment.version() for segment in segments.values()))
+
+
+    client = AsyncMOEXClient.from_params(params.circuit_breaker)
+    history = HistoryStore(project_path(params.history.path))
+    try:
+        await history.sync(client, HISTORY_SECID, params.history.lookback_days)
+    except Exception as e:
+        logger.warning(f"History sync failed: {e}")
+    candles = history.load(HISTORY_SECID)
+    if len(candles):
+        client.volatility[HISTORY_SECID] = RollingVolatility.from_history(
+            candles, params.volatility.window, params.volatility.estimator)
+
+    cache = SnapshotCache(client.get_market_data, ttl=params.market_data.cache_ttl_s,
+                          stale_ttl=params.market_data.stale_ttl_s, store=store)
+    async def refresh(symbol: str) -> MarketSnapshot:
+        snapshot = await cache.refresh(symbol)
+        # Сегмент перезаписывается и без новой версии: время публикации
+        # сообщает воркерам, что данные подтверждены свежим опросом
+        segments[symbol].publish(snapshot.version, snapshot.market_data)
+        return snapshot
+
+    poller = MarketDataPoller(refresh, symbols=symbols, interval=params.market_data.poll_interval_s)
+    stop = stop or asyncio.Event()
+    poller.start()
+    logger.info(f"Publishing {', '.join(segments)} snapshots to {root}")
+    try:
+        await stop.wait()
+    finally:
+        await poller.stop()
+        await client.aclose()
+        for segment in segments.values():
+            segment.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+
+    async def serve() -> None:
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        await run(stop=stop)
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Разбор таблиц ответов MOEX ISS по именам колонок."""
+
+import threading
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class _Schema:
+    """Индексы и типы колонок одного заголовка columns."""
+
+    def __init__(self, columns: Tuple[str, ...]):
+        self.columns = columns
+        self.index = {name: i for i, name in enumerate(columns)}
+        # Колонки, которые однажды не разобрались как числа, дальше идут как object
+        self.numeric = [True] * len(columns)
+
+
+_schemas: Dict[Tuple[str, ...], _Schema] = {}
+_schemas_lock = threading.Lock()
+
+
+def schema(columns: Sequence[str]) -> _Schema:
+    """Схема заголовка; разбирается один раз и переиспользуется для всех ответов."""
+    key = tuple(columns)
+    cached = _schemas.get(key)
+    if cached is None:
+        with _schemas_lock:
+            cached = _schemas.setdefault(key, _Schema(key))
+    return cached
+
+
+class ISSTable:
+    """
+    Таблица ISS: колонки по имени, данные - столбцы NumPy.
+
+    Колонка превращается в массив при первом обращении: значения достаются
+    из строк через itemgetter без транспонирования всей таблицы, поэтому
+    стоимость пропорциональна числу нужных колонок, а не ширине ответа.
+    Числовые колонки становятся float64 (null - NaN), остальные - массивами
+    object. Порядок колонок в ответе значения не имеет.
+    """
+
+    def __init__(self, columns: Sequence[str], rows: List[list]):
+        self.schema = schema(columns)
+        self._rows = rows
+        self._decoded: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.schema.index
+
+    @property
+    def columns(self) -> Tuple[str, ...]:
+        return self.schema.columns
+
+    def column(self, name: str) -> np.ndarray:
+        """Колонка по имени; KeyError, если ее нет в ответе."""
+        decoded = self._decoded.get(name)
+        if decoded is None:
+            decoded = self._decoded[name] = self._decode(self.schema.index[name])
+        return decoded
+
+    def get(self, name: str, row: int = 0, default: Any = None) -> Any:
+        """Значение колонки в строке без разбора всей таблицы."""
+        i = self.schema.index.get(name)
+        if i is None or row >= len(self._rows):
+            return default
+        value = self._rows[row][i]
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """Все колонки словарем имя -> массив."""
+        return {name: self.column(name) for name in self.columns}
+
+    def to_records(self) -> np.ndarray:
+        """Структурированный массив NumPy (строки ответа как записи)."""
+        columns = self.to_dict()
+        dtype = [(name, array.dtype) for name, array in columns.items()]
+        records = np.empty(len(self), dtype=dtype)
+        for name, array in columns.items():
+            records[name] = array
+        return records
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """Строки как словари имя -> значение."""
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in self._rows]
+
+    def _decode(self, i: int) -> np.ndarray:
+        values = list(map(itemgetter(i), self._rows))
+        if self.schema.numeric[i]:
+            try:
+                return np.array(values, dtype=float)
+            except (TypeError, ValueError):
+                self.schema.numeric[i] = False
+        return np.array(values, dtype=object)
+
+
+def tables(data: Any) -> Dict[str, ISSTable]:
+    """
+    Таблицы ответа ISS по именам блоков.
+
+    Поддерживаются компактный формат ({"block": {"columns", "data"}}) и
+    iss.json=extended (список, где блоки - списки словарей-строк).
+    """
+    if isinstance(data, list):
+        return _extended_tables(data)
+    return {name: ISSTable(block["columns"], block["data"])
+            for name, block in data.items()
+            if isinstance(block, dict) and "columns" in block and "data" in block}
+
+
+def _extended_tables(data: List[Any]) -> Dict[str, ISSTable]:
+    result = {}
+    for part in data:
+        if not isinstance(part, dict):
+            continue
+        for name, rows in part.items():
+            if not isinstance(rows, list):
+                continue
+            columns = list(rows[0]) if rows else []
+            result[name] = ISSTable(columns, [[row.get(column) for column in columns] for row in rows])
+    return result
+
+
+def table(data: Any, name: str) -> ISSTable:
+    """Одна таблица ответа; KeyError, если блока нет."""
+    return tables(data)[name]
+
+
+def next_start(data: Any, block: str, start: int, received: int) -> Optional[int]:
+    """
+    Позиция следующей страницы или None, если страниц больше нет.
+
+    Если в ответе есть курсор <block>.cursor (INDEX, TOTAL, PAGESIZE),
+    используется он; иначе чтение продолжается до пустой страницы.
+    """
+    cursor = tables(data).get(f"{block}.cursor") if received else None
+    if cursor is not None and len(cursor):
+        index = int(cursor.get("INDEX", default=start))
+        total = int(cursor.get("TOTAL", default=0))
+        page = int(cursor.get("PAGESIZE", default=received))
+        following = index + page
+        return following if following < total else None
+    return start + received if received else None
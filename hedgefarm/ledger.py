@@ -0,0 +1,173 @@
+"""Книга выданных гарантий и резервирование капитала под них."""
+
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LedgerEntry:
+    """Выданная гарантия: экспозиция к цене фьючерса в рублях."""
+    quote_id: str
+    volume_t: float
+    price_per_ton: float
+    term_months: int
+    strike: float
+    created_at: datetime
+    expires_at: datetime
+
+    @property
+    def exposure(self) -> float:
+        return self.volume_t * self.price_per_ton
+
+
+@dataclass(frozen=True)
+class Reservation:
+    """Результат резервирования: принята ли гарантия и капитал до/после."""
+    accepted: bool
+    marginal_capital: float
+    book_capital: float
+    capital_reserve: float
+
+
+class CapitalLedger:
+    """
+    Книга гарантий с текущими агрегатами экспозиции.
+
+    Все гарантии выданы на одну культуру, поэтому риск книги определяется
+    чистой экспозицией к цене фьючерса: капитал = |net| * capital_factor.
+    Агрегаты обновляются при каждой операции, так что предельный капитал
+    новой гарантии считается за O(1) без обхода книги. Проверка и запись
+    выполняются под одной блокировкой, поэтому параллельные запросы не
+    могут вместе превысить резерв.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, LedgerEntry] = {}
+        self._net_exposure = 0.0
+        self._gross_exposure = 0.0
+        self._revision = 0
+        self._saved_revision = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, quote_id: str) -> bool:
+        return quote_id in self._entries
+
+    @property
+    def net_exposure(self) -> float:
+        return self._net_exposure
+
+    @property
+    def gross_exposure(self) -> float:
+        return self._gross_exposure
+
+    def entries(self) -> List[LedgerEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def book_capital(self, capital_factor: float) -> float:
+        """Капитал под текущую книгу."""
+        return abs(self._net_exposure) * capital_factor
+
+    def marginal_capital(self, exposure: float, capital_factor: float) -> float:
+        """Прирост капитала книги от новой экспозиции, O(1)."""
+        net = self._net_exposure
+        return (abs(net + exposure) - abs(net)) * capital_factor
+
+    def reserve(self, entry: LedgerEntry, capital_factor: float, capital_reserve: float) -> Reservation:
+        """Атомарно проверяет резерв и записывает гарантию, если капитала хватает."""
+        with self._lock:
+            if entry.quote_id in self._entries:
+                raise ValueError(f"Quote {entry.quote_id} is already in the ledger")
+            current = abs(self._net_exposure) * capital_factor
+            after = abs(self._net_exposure + entry.exposure) * capital_factor
+            # Сокращающая риск гарантия принимается, даже если книга уже выше резерва
+            accepted = after <= capital_reserve or after <= current
+            if accepted:
+                self._entries[entry.quote_id] = entry
+                self._apply(entry, 1.0)
+            return Reservation(accepted, after - current, after if accepted else current, capital_reserve)
+
+    def release(self, quote_id: str) -> bool:
+        """Снимает гарантию и освобождает ее капитал."""
+        with self._lock:
+            entry = self._entries.pop(quote_id, None)
+            if entry is None:
+                return False
+            self._apply(entry, -1.0)
+            return True
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """Снимает гарантии с истекшим сроком; возвращает их число."""
+        now = now or datetime.utcnow()
+        with self._lock:
+            expired = [entry for entry in self._entries.values() if entry.expires_at <= now]
+            for entry in expired:
+                del self._entries[entry.quote_id]
+                self._apply(entry, -1.0)
+            return len(expired)
+
+    def _apply(self, entry: LedgerEntry, sign: float) -> None:
+        self._net_exposure += sign * entry.exposure
+        self._gross_exposure += sign * abs(entry.exposure)
+        if not self._entries:
+            # Пустая книга обнуляет накопленную ошибку округления
+            self._net_exposure = self._gross_exposure = 0.0
+        self._revision += 1
+
+    def save(self, path: Path) -> bool:
+        """
+        Атомарно записывает книгу на диск (временный файл + os.replace).
+
+        Возвращает False, если с прошлой записи книга не менялась.
+        """
+        with self._lock:
+            if self._revision == self._saved_revision and Path(path).exists():
+                return False
+            revision = self._revision
+            rows = [asdict(entry) for entry in self._entries.values()]
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"saved_at": datetime.utcnow().isoformat(), "entries": rows}, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._saved_revision = revision
+        return True
+
+    def load(self, path: Path) -> int:
+        """Восстанавливает книгу из снапшота; возвращает число гарантий."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            entries = []
+            for row in data["entries"]:
+                row["created_at"] = datetime.fromisoformat(row["created_at"])
+                row["expires_at"] = datetime.fromisoformat(row["expires_at"])
+                entries.append(LedgerEntry(**row))
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Could not load ledger snapshot {path}: {e}")
+            return 0
+
+        with self._lock:
+            self._entries = {entry.quote_id: entry for entry in entries}
+            self._net_exposure = sum(entry.exposure for entry in entries)
+            self._gross_exposure = sum(abs(entry.exposure) for entry in entries)
+            self._revision += 1
+            self._saved_revision = self._revision
+        return len(entries)
@@ -1,8 +1,8 @@
 """Pydantic модели для hedgefarm-pricer API."""
 
-from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
-from datetime import datetime
+from pydantic import BaseModel, Field, field_serializer, field_validator
+from typing import Any, List, Optional, Literal
+from datetime import date, datetime
 
 
 class QuoteRequest(BaseModel):
@@ -22,6 +22,17 @@ class QuoteOut(BaseModel):
     floor_forward_rubkg: float = Field(description="Цена пола при форвардном хедже, руб/кг")
     recommended: Literal["futures", "put", "put_ladder", "forward"] = Field(description="Рекомендуемый инструмент")
     calculated_at: datetime = Field(default_factory=datetime.utcnow, description="Время расчета")
+    stale: bool = Field(default=False, description="Расчет по последнему успешному снапшоту: данные биржи не обновляются")
+
+
+class IssuedQuote(BaseModel):
+    """Выданная гарантия с зарезервированным под нее капиталом."""
+    quote_id: str = Field(description="Идентификатор гарантии")
+    quote: QuoteOut = Field(description="Котировка")
+    expires_at: datetime = Field(description="Окончание срока гарантии")
+    marginal_capital: float = Field(description="Прирост капитала книги, руб")
+    book_capital: float = Field(description="Капитал книги после выдачи, руб")
+    capital_reserve: float = Field(description="Резерв капитала, руб")
 
 
 class FuturesQuote(BaseModel):
@@ -32,6 +43,13 @@ class FuturesQuote(BaseModel):
     updated_at: datetime
 
 
+class FuturesContract(BaseModel):
+    """Листинговая серия фьючерса."""
+    secid: str
+    expiry: date = Field(description="Последний день торгов")
+    price: float = Field(description="Цена в руб/тонна")
+
+
 class OptionQuote(BaseModel):
     """Котировка опциона."""
     symbol: str
@@ -43,11 +61,28 @@ class OptionQuote(BaseModel):
 
 
 class MarketData(BaseModel):
-    """Рыночные данные для расчета."""
+    """
+    Рыночные данные для расчета.
+
+    put_options хранится как OptionChain (массивы по страйку); список
+    OptionQuote при создании преобразуется в цепочку.
+    """
     futures_quote: FuturesQuote
-    put_options: List[OptionQuote]
+    put_options: Any = Field(description="PUT опционы (OptionChain)")
     usd_rate: float = Field(description="Курс USD/RUB")
     volatility: float = Field(description="Историческая волатильность")
+    futures_curve: List[FuturesContract] = Field(default_factory=list,
+                                                 description="Серии фьючерса по возрастанию экспирации")
+
+    @field_validator("put_options", mode="before")
+    @classmethod
+    def _to_chain(cls, value):
+        from .chain import as_chain
+        return as_chain(value)
+
+    @field_serializer("put_options")
+    def _serialize_chain(self, chain) -> List[dict]:
+        return [quote.model_dump() for quote in chain]
 
 
 class RiskMetrics(BaseModel):
@@ -1,24 +1,27 @@
 """Агрегатор для выбора оптимального инструмента хеджирования."""
 
-from typing import Dict, List
-from ..models import MarketData, QuoteOut
-from ..utils import load_cfg, rub_per_kg
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from ..config import PricingParams, get_params
+from ..models import MarketData, OptionQuote, QuoteOut, QuoteRequest
+from ..utils import rub_per_kg
 from . import futures, options
+from .curve import term_futures_price, term_options
 
 
-def calculate_forward_price(futures_price: float, term_months: int) -> float:
+def calculate_forward_price(futures_price: float, term_months: int,
+                            params: Optional[PricingParams] = None) -> float:
     """
     Рассчитывает минимальную гарантированную цену при форвардном хедже.
     
     Формула: MGP = P_fut * (1 - δ) - Fee - Basis
     где δ - дисконт за отсутствие маржи
     """
-    cfg = load_cfg()
+    params = params or get_params()
     
     # Параметры из конфигурации
-    fee_pct = cfg["fee_pct"]["forward"]
-    basis_discount = cfg["basis_discount"]
-    forward_delta_pct = cfg["forward_delta_pct"]
+    fee_pct = params.fee_pct.forward
+    basis_discount = params.basis_discount
+    forward_delta_pct = params.forward_delta_pct
     
     # Дисконт за отсутствие маржи
     discounted_price = futures_price * (1 - forward_delta_pct)
@@ -51,7 +54,8 @@ def apply_risk_surcharge(mgp: float, risk_surcharge: float) -> float:
     return mgp * (1 - risk_surcharge)
 
 
-def calculate_all_prices(market_data: MarketData, volume: int, term_months: int, use_ladder: bool = True) -> QuoteOut:
+def calculate_all_prices(market_data: MarketData, volume: int, term_months: int, use_ladder: bool = True,
+                         params: Optional[PricingParams] = None) -> QuoteOut:
     """
     Рассчитывает все варианты хеджирования и возвращает результат.
     
@@ -60,30 +64,38 @@ def calculate_all_prices(market_data: MarketData, volume: int, term_months: int,
         volume: Объем в тоннах
         term_months: Срок в месяцах
         use_ladder: Использовать ли лестничное хеджирование для опционов
+        params: Параметры ценообразования (по умолчанию текущие из settings.yaml)
     
     Returns:
         Результат расчета со всеми вариантами
     """
+    params = params or get_params()
     futures_price = market_data.futures_quote.price
+    # Фьючерс и форвард - по серии кривой под срок хеджа
+    contract_price = term_futures_price(market_data, term_months)
+    # Опционы - экспирации, ближайшей к сроку хеджа
+    put_options = term_options(market_data, term_months)
     
     # Расчет MGP для каждого инструмента
-    mgp_futures = futures.floor_price(futures_price, term_months, volume)
+    mgp_futures = futures.floor_price(contract_price, term_months, volume, params=params)
     mgp_put = options.floor_price(
-        market_data.put_options, 
+        put_options, 
         futures_price, 
         term_months, 
-        market_data.volatility
+        market_data.volatility,
+        params=params
     )
     
     # Расчет лестничного хеджирования
     mgp_put_ladder = options.ladder_floor_price(
-        market_data.put_options, 
+        put_options, 
         futures_price, 
         term_months, 
-        market_data.volatility
-    ) if use_ladder and len(market_data.put_options) >= 2 else mgp_put
+        market_data.volatility,
+        params=params
+    ) if use_ladder and len(put_options) >= 2 else mgp_put
     
-    mgp_forward = calculate_forward_price(futures_price, term_months)
+    mgp_forward = calculate_forward_price(contract_price, term_months, params=params)
     
     # Выбор рекомендуемой стратегии (включая лестничное хеджирование)
     recommended = select_best_strategy(mgp_futures, mgp_put, mgp_put_ladder, mgp_forward)
@@ -102,25 +114,58 @@ def calculate_all_prices(market_data: MarketData, volume: int, term_months: int,
     return result
 
 
-def get_detailed_comparison(market_data: MarketData, volume: int, term_months: int) -> Dict:
-    """Возвращает детальное сравнение всех стратегий хеджирования."""
+def calculate_all_prices_batch(market_data: MarketData, requests: Iterable[QuoteRequest],
+                               use_ladder: bool = True,
+                               params: Optional[PricingParams] = None) -> Iterator[QuoteOut]:
+    """
+    Пакетный вариант calculate_all_prices.
+    
+    Все запросы считаются по одним рыночным данным и одним параметрам.
+    MGP не зависит от объема, поэтому полный расчет выполняется один раз
+    на срок, а остальные строки получают копию с нужным объемом. Результаты
+    отдаются лениво, так что память не растет с размером пакета.
+    """
+    params = params or get_params()
+    by_term: Dict[int, QuoteOut] = {}
+    
+    for request in requests:
+        base = by_term.get(request.term_months)
+        if base is None:
+            base = calculate_all_prices(market_data, request.volume, request.term_months, use_ladder, params=params)
+            by_term[request.term_months] = base
+        yield base.model_copy(update={"volume_t": request.volume})
+
+
+def get_detailed_comparison(market_data: MarketData, volume: int, term_months: int,
+                            params: Optional[PricingParams] = None,
+                            ladder: Optional[List[Tuple[OptionQuote, float]]] = None) -> Dict:
+    """
+    Возвращает детальное сравнение всех стратегий хеджирования.
+    
+    ladder - готовая лестница под срок (например, из LadderCache); без нее
+    лестница выбирается один раз внутри get_put_metrics.
+    """
+    params = params or get_params()
     futures_price = market_data.futures_quote.price
+    contract_price = term_futures_price(market_data, term_months)
     
     # Получаем детальные метрики по каждому инструменту
-    futures_metrics = futures.get_futures_metrics(futures_price, term_months, volume)
+    futures_metrics = futures.get_futures_metrics(contract_price, term_months, volume, params=params)
     put_metrics = options.get_put_metrics(
-        market_data.put_options, 
+        term_options(market_data, term_months), 
         futures_price, 
         term_months, 
         market_data.volatility, 
-        volume
+        volume,
+        params=params,
+        ladder=ladder
     )
     
     # Метрики форварда
-    forward_mgp = calculate_forward_price(futures_price, term_months)
+    forward_mgp = calculate_forward_price(contract_price, term_months, params=params)
     forward_metrics = {
         "mgp_rub_kg": forward_mgp,
-        "discount_applied": load_cfg()["forward_delta_pct"],
+        "discount_applied": params.forward_delta_pct,
         "no_margin_required": True,
         "instrument": "forward"
     }
@@ -136,6 +181,7 @@ def get_detailed_comparison(market_data: MarketData, volume: int, term_months: i
         },
         "market_context": {
             "futures_price": futures_price,
+            "contract_price": contract_price,
             "volatility": market_data.volatility,
             "usd_rate": market_data.usd_rate
         }
@@ -0,0 +1,101 @@
+"""Векторизованные модели Блэка-Шоулза и Блэка-76 над массивами NumPy."""
+
+from typing import NamedTuple
+
+import numpy as np
+from scipy.special import ndtr
+
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+
+class OptionValues(NamedTuple):
+    """
+    Премии и греки опционов (массивы формы broadcast-результата входов).
+
+    vega - на единицу волатильности, theta - за год, rho - на единицу ставки.
+    """
+    premium: np.ndarray
+    delta: np.ndarray
+    gamma: np.ndarray
+    vega: np.ndarray
+    theta: np.ndarray
+    rho: np.ndarray
+
+
+def _norm_pdf(x: np.ndarray) -> np.ndarray:
+    return np.exp(-0.5 * x * x) * _INV_SQRT_2PI
+
+
+def _black(forward, strike, T, r, sigma, option_type: str, spot_greeks: bool) -> OptionValues:
+    """
+    Общее ядро: цена через форвард и дисконт-фактор.
+
+    spot_greeks=True дает греки по споту (Блэк-Шоулз), иначе по форварду (Блэк-76).
+    """
+    if option_type not in ("P", "C"):
+        raise ValueError(f"Unknown option type: {option_type}")
+
+    F, K, T, r, sigma = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                              for x in (forward, strike, T, r, sigma)))
+    df = np.exp(-r * T)
+    sqrt_t = np.sqrt(np.maximum(T, 0.0))
+    vol_sqrt_t = sigma * sqrt_t
+    # Для истекших опционов и нулевой волатильности остается внутренняя стоимость
+    live = vol_sqrt_t > 0
+    safe_vst = np.where(live, vol_sqrt_t, 1.0)
+    safe_sqrt_t = np.where(live, sqrt_t, 1.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        d1 = (np.log(F / K) + 0.5 * vol_sqrt_t * vol_sqrt_t) / safe_vst
+    d2 = d1 - vol_sqrt_t
+    pdf_d1 = np.where(live, _norm_pdf(d1), 0.0)
+
+    if option_type == "P":
+        n_d1 = np.where(live, ndtr(-d1), (K > F).astype(float))
+        n_d2 = np.where(live, ndtr(-d2), (K > F).astype(float))
+        premium = df * (K * n_d2 - F * n_d1)
+        delta_f = -n_d1
+        rho_bs = -K * T * df * n_d2
+    else:
+        n_d1 = np.where(live, ndtr(d1), (F > K).astype(float))
+        n_d2 = np.where(live, ndtr(d2), (F > K).astype(float))
+        premium = df * (F * n_d1 - K * n_d2)
+        delta_f = n_d1
+        rho_bs = K * T * df * n_d2
+
+    premium = np.maximum(premium, 0.0)
+    time_decay = -df * F * pdf_d1 * sigma / (2.0 * safe_sqrt_t)
+    vega = df * F * pdf_d1 * sqrt_t
+
+    if spot_greeks:
+        # Спот S = F * df, дивидендов нет
+        S = F * df
+        delta = delta_f
+        gamma = pdf_d1 / (S * safe_vst)
+        sign = 1.0 if option_type == "C" else -1.0
+        theta = time_decay - sign * r * K * df * n_d2
+        rho = rho_bs
+    else:
+        delta = df * delta_f
+        gamma = df * pdf_d1 / (F * safe_vst)
+        theta = time_decay + r * premium
+        rho = -T * premium
+
+    return OptionValues(premium, delta, gamma, vega, theta, rho)
+
+
+def black_scholes(S, K, T, r, sigma, option_type: str = "P") -> OptionValues:
+    """
+    Модель Блэка-Шоулза для массивов страйков, сроков и волатильностей.
+
+    Все аргументы транслируются по правилам broadcasting NumPy, например
+    K[:, None] и T[None, :] дают сетку страйк x срок за один вызов.
+    """
+    S = np.asarray(S, dtype=float)
+    forward = S * np.exp(np.asarray(r, dtype=float) * np.asarray(T, dtype=float))
+    return _black(forward, K, T, r, sigma, option_type, spot_greeks=True)
+
+
+def black76(F, K, T, r, sigma, option_type: str = "P") -> OptionValues:
+    """Модель Блэка-76 для опционов на фьючерсы; греки по цене фьючерса."""
+    return _black(F, K, T, r, sigma, option_type, spot_greeks=False)
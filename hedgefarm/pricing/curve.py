@@ -0,0 +1,83 @@
+"""Кривая фьючерсов и серия опционов под срок хеджа."""
+
+from bisect import bisect_left
+from datetime import date, timedelta
+from typing import List, Optional
+
+import numpy as np
+
+from ..chain import OptionChain, as_chain
+from ..models import FuturesContract, MarketData
+
+# Срок в месяцах переводится в дни так же, как в расчете финансирования ГО
+DAYS_PER_MONTH = 30
+
+
+class FuturesCurve:
+    """
+    Листинговые серии, отсортированные по экспирации.
+
+    Срок хеджа ищется бинарным поиском по дням до экспирации. Между
+    соседними сериями цена интерполируется с постоянной ставкой carry
+    (ln F линейно по времени), до первой и после последней серии берется
+    цена крайнего контракта.
+    """
+
+    def __init__(self, days: np.ndarray, prices: np.ndarray):
+        # np.unique сортирует дни и оставляет по одной серии на дату экспирации
+        self.days, first = np.unique(np.asarray(days, dtype=float), return_index=True)
+        self.prices = np.asarray(prices, dtype=float)[first]
+        self._log_prices = np.log(self.prices)
+        self._day_list = self.days.tolist()
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    @classmethod
+    def from_contracts(cls, contracts: List[FuturesContract], as_of: date) -> "FuturesCurve":
+        days = [(contract.expiry - as_of).days for contract in contracts]
+        return cls(np.array(days, dtype=float), np.array([contract.price for contract in contracts]))
+
+    def price(self, term_months):
+        """Цена фьючерса под срок (число или массив сроков в месяцах)."""
+        target = np.asarray(term_months, dtype=float) * DAYS_PER_MONTH
+        if len(self.days) == 1:
+            return float(self.prices[0]) if target.ndim == 0 else np.full(target.shape, self.prices[0])
+        last = len(self.days) - 1
+        if target.ndim == 0:
+            right = min(max(bisect_left(self._day_list, float(target)), 1), last)
+            return float(self._interpolate(right, float(target)))
+        # np.searchsorted - тот же бинарный поиск для массива сроков
+        return self._interpolate(np.clip(np.searchsorted(self.days, target), 1, last), target)
+
+    def _interpolate(self, right, day):
+        left = right - 1
+        d0, d1 = self.days[left], self.days[right]
+        weight = np.clip((day - d0) / (d1 - d0), 0.0, 1.0)
+        return np.exp(self._log_prices[left] + weight * (self._log_prices[right] - self._log_prices[left]))
+
+
+def term_futures_price(market_data: MarketData, term_months, as_of: Optional[date] = None):
+    """
+    Цена контракта под срок хеджа; без кривой - цена котировки фьючерса.
+
+    Датой отсчета служит время котировки, поэтому кривая и цепочка опционов
+    одного снапшота дают согласованные цены.
+    """
+    if not market_data.futures_curve:
+        price = market_data.futures_quote.price
+        return price if np.ndim(term_months) == 0 else np.full(np.shape(term_months), price)
+    as_of = as_of or market_data.futures_quote.updated_at.date()
+    return FuturesCurve.from_contracts(market_data.futures_curve, as_of).price(term_months)
+
+
+def term_options(market_data: MarketData, term_months: int, as_of: Optional[date] = None) -> OptionChain:
+    """
+    PUT цепочки снапшота с экспирацией, ближайшей к сроку хеджа.
+
+    В снапшоте лежат все живые экспирации доски; срок отсчитывается от
+    времени котировки, как в term_futures_price.
+    """
+    as_of = as_of or market_data.futures_quote.updated_at.date()
+    target = as_of + timedelta(days=int(term_months) * DAYS_PER_MONTH)
+    return as_chain(market_data.put_options).for_date(target)
@@ -1,7 +1,9 @@
 """Расчет минимальной гарантированной цены при хедже фьючерсом."""
 
 import math
-from ..utils import load_cfg, rub_per_kg, days_to_expiration
+from typing import Optional
+from ..config import PricingParams, get_params
+from ..utils import rub_per_kg, days_to_expiration
 
 
 def calculate_financing_cost(price: float, leverage: float, go_rate: float, days: int) -> float:
@@ -11,18 +13,21 @@ def calculate_financing_cost(price: float, leverage: float, go_rate: float, days
     return go_amount * financing_rate * days / 365
 
 
-def floor_price(futures_price: float, term_months: int, volume: int = 1000) -> float:
+def floor_price(futures_price: float, term_months: int, volume: int = 1000,
+                params: Optional[PricingParams] = None) -> float:
     """
     Рассчитывает минимальную гарантированную цену при хедже фьючерсом.
     
     Формула: MGP = (P_fut - комиссии - базис - финансирование) / 1000
+    
+    term_months может быть массивом NumPy: тогда результат - массив MGP по срокам.
     """
-    cfg = load_cfg()
+    params = params or get_params()
     
     # Параметры из конфигурации
-    fee_pct = cfg["fee_pct"]["futures"]
-    basis_discount = cfg["basis_discount"]
-    go_pct = cfg["go_pct"]
+    fee_pct = params.fee_pct.futures
+    basis_discount = params.basis_discount
+    go_pct = params.go_pct
     
     # Расчет дней до экспирации (приблизительно)
     days = term_months * 30
@@ -46,26 +51,27 @@ def floor_price(futures_price: float, term_months: int, volume: int = 1000) -> f
     return rub_per_kg(floor_price_ton)
 
 
-def calculate_margin_requirement(price: float, volume: int) -> float:
+def calculate_margin_requirement(price: float, volume: int,
+                                 params: Optional[PricingParams] = None) -> float:
     """Рассчитывает требования по марже."""
-    cfg = load_cfg()
-    go_pct = cfg["go_pct"]
+    go_pct = (params or get_params()).go_pct
     
     total_value = price * volume
     return total_value * go_pct
 
 
-def get_futures_metrics(futures_price: float, term_months: int, volume: int) -> dict:
+def get_futures_metrics(futures_price: float, term_months: int, volume: int,
+                        params: Optional[PricingParams] = None) -> dict:
     """Возвращает детальные метрики по фьючерсному хеджу."""
-    cfg = load_cfg()
+    params = params or get_params()
     
-    mgp = floor_price(futures_price, term_months, volume)
-    margin = calculate_margin_requirement(futures_price, volume)
+    mgp = floor_price(futures_price, term_months, volume, params=params)
+    margin = calculate_margin_requirement(futures_price, volume, params=params)
     
     return {
         "mgp_rub_kg": mgp,
         "margin_required": margin,
-        "leverage": 1 / cfg["go_pct"],
+        "leverage": 1 / params.go_pct,
         "hedging_efficiency": mgp / rub_per_kg(futures_price),
         "instrument": "futures"
     }
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""Греки по всей цепочке опционов, по лестнице и по книге выданных гарантий."""
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from ..chain import as_chain
+from ..models import OptionQuote
+from .black import OptionValues, black_scholes
+from .iv import IVSurface
+
+GREEKS = ("delta", "gamma", "vega", "theta", "rho")
+
+# Волатильность задается числом или поверхностью IV
+Volatility = Union[float, IVSurface]
+
+_YEAR_S = 365.0 * 24 * 3600
+
+
+def _sigma(volatility: Volatility, strikes, T) -> np.ndarray:
+    if isinstance(volatility, IVSurface):
+        return volatility.vol(strikes, T)
+    return np.asarray(volatility, dtype=float)
+
+
+def _values(S: float, strikes: np.ndarray, T, r: float, sigma, is_call: np.ndarray) -> OptionValues:
+    """Греки для смешанного набора PUT/CALL одним проходом по каждому типу."""
+    puts = black_scholes(S, strikes, T, r, sigma, "P")
+    if not is_call.any():
+        return puts
+    calls = black_scholes(S, strikes, T, r, sigma, "C")
+    return OptionValues(*(np.where(is_call, c, p) for c, p in zip(calls, puts)))
+
+
+def chain_greeks(options: List[OptionQuote], futures_price: float, term_months,
+                 volatility: Volatility = 0.25, r: float = 0.15) -> OptionValues:
+    """
+    Премии и греки для каждого опциона цепочки одним векторным вызовом.
+
+    Для опционов с рыночной IV используется она, для остальных - volatility.
+    Массивы идут в порядке цепочки (по страйку) и имеют форму (len(options),)
+    или (len(options), *shape(term_months)).
+    """
+    chain = as_chain(options)
+    T = np.asarray(term_months, dtype=float) / 12.0
+    expand = (slice(None),) + (None,) * T.ndim
+    strikes = chain.strike[expand]
+    is_call = chain.is_call[expand]
+    market_vol = chain.implied_vol[expand]
+    sigma = np.where(np.isnan(market_vol), _sigma(volatility, strikes, T), market_vol)
+    return _values(futures_price, strikes, T, r, sigma, is_call)
+
+
+def ladder_greeks(ladder: List[Tuple[OptionQuote, float]], futures_price: float, term_months: int,
+                  volatility: Volatility = 0.25, r: float = 0.15) -> Dict[str, float]:
+    """Греки взвешенной лестницы (на тонну) из create_ladder_strikes."""
+    values = chain_greeks([option for option, _ in ladder], futures_price, term_months, volatility, r)
+    weights = np.array([weight for _, weight in ladder])
+    return {name: float(np.dot(weights, getattr(values, name))) for name in ("premium",) + GREEKS}
+
+
+def greeks_to_dict(values: OptionValues) -> Dict[str, list]:
+    """Сериализует массивы OptionValues в списки."""
+    return {name: np.asarray(value).tolist() for name, value in zip(values._fields, values)}
+
+
+@dataclass(frozen=True)
+class BookPosition:
+    """
+    Позиция книги в тоннах.
+
+    quantity_t положительна для купленных опционов; выданная фермеру
+    гарантия-пол - это проданный PUT, то есть отрицательное количество.
+    """
+    position_id: str
+    strike: float
+    maturity: datetime
+    quantity_t: float
+    option_type: str = "P"
+
+
+class GreeksBook:
+    """
+    Книга позиций в виде параллельных массивов NumPy.
+
+    Пересчет греков после тика - один вызов ядра по всем позициям и
+    свертка с количествами, без цикла Python по позициям.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._ids: List[Optional[str]] = []
+        self._index: Dict[str, int] = {}
+        self._strike = np.empty(capacity)
+        self._maturity = np.empty(capacity)
+        self._quantity = np.empty(capacity)
+        self._is_call = np.empty(capacity, dtype=bool)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, position_id: str) -> bool:
+        return position_id in self._index
+
+    def position_ids(self) -> List[str]:
+        return list(self._ids)
+
+    def _grow(self) -> None:
+        capacity = max(2 * len(self._strike), 1)
+        for name in ("_strike", "_maturity", "_quantity", "_is_call"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def add(self, position: BookPosition) -> None:
+        """Добавляет позицию; повторный id заменяет существующую."""
+        if position.position_id in self._index:
+            self.remove(position.position_id)
+        if self._size == len(self._strike):
+            self._grow()
+        i = self._size
+        self._strike[i] = position.strike
+        self._maturity[i] = position.maturity.timestamp()
+        self._quantity[i] = position.quantity_t
+        self._is_call[i] = position.option_type == "C"
+        self._ids.append(position.position_id)
+        self._index[position.position_id] = i
+        self._size += 1
+
+    def remove(self, position_id: str) -> bool:
+        """Удаляет позицию за O(1): на ее место переносится последняя."""
+        i = self._index.pop(position_id, None)
+        if i is None:
+            return False
+        last = self._size - 1
+        if i != last:
+            for array in (self._strike, self._maturity, self._quantity, self._is_call):
+                array[i] = array[last]
+            moved = self._ids[last]
+            self._ids[i] = moved
+            self._index[moved] = i
+        self._ids.pop()
+        self._size = last
+        return True
+
+    def greeks(self, futures_price: float, volatility: Volatility = 0.25,
+               as_of: Optional[datetime] = None, r: float = 0.15) -> Dict[str, float]:
+        """Суммарные premium, delta, gamma, vega, theta и rho книги в рублях."""
+        totals = {name: 0.0 for name in ("premium",) + GREEKS}
+        totals["positions"] = self._size
+        if not self._size:
+            return totals
+
+        now = (as_of or datetime.utcnow()).timestamp()
+        n = self._size
+        strikes = self._strike[:n]
+        T = np.maximum(self._maturity[:n] - now, 0.0) / _YEAR_S
+        sigma = _sigma(volatility, strikes, T)
+        values = _values(futures_price, strikes, T, r, sigma, self._is_call[:n])
+        quantity = self._quantity[:n]
+        for name in ("premium",) + GREEKS:
+            totals[name] = float(np.dot(quantity, getattr(values, name)))
+        return totals
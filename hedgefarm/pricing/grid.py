@@ -0,0 +1,182 @@
+"""Предрасчитанная сетка MGP по срокам и объемам для калькулятора."""
+
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from ..config import PricingParams, get_params
+from ..models import MarketData, QuoteOut
+from . import futures, options
+from .aggregator import calculate_forward_price
+from .curve import term_futures_price, term_options
+from .ladder import LadderCache
+
+# Сроки и объемы, которые запрашивает лендинг калькулятора
+GRID_TERMS = tuple(range(1, 13))
+GRID_VOLUMES = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Порядок совпадает с select_best_strategy: при равенстве выигрывает первый
+STRATEGIES = ("futures", "put", "put_ladder", "forward")
+
+
+@dataclass(frozen=True)
+class PricingGrid:
+    """
+    Таблица MGP срок x объем, посчитанная по одному снапшоту.
+
+    Массивы имеют форму (len(terms), len(volumes)); recommended хранит
+    индекс стратегии из STRATEGIES.
+    """
+    snapshot_version: int
+    params_version: int
+    terms: np.ndarray
+    volumes: np.ndarray
+    floor_futures: np.ndarray
+    floor_put: np.ndarray
+    floor_put_ladder: np.ndarray
+    floor_forward: np.ndarray
+    recommended: np.ndarray
+    built_at: datetime
+
+    def __post_init__(self):
+        # Индексы для поиска ячейки за O(1)
+        object.__setattr__(self, "_term_index", {int(t): i for i, t in enumerate(self.terms)})
+        object.__setattr__(self, "_volume_index", {int(v): j for j, v in enumerate(self.volumes)})
+
+    def lookup(self, volume: int, term_months: int) -> Optional[QuoteOut]:
+        """Возвращает котировку из сетки или None для точки вне сетки."""
+        i = self._term_index.get(term_months)
+        j = self._volume_index.get(volume)
+        if i is None or j is None:
+            return None
+
+        recommended = STRATEGIES[self.recommended[i, j]]
+        floor_put = self.floor_put_ladder[i, j] if recommended == "put_ladder" else self.floor_put[i, j]
+        return QuoteOut(
+            culture="wheat",
+            volume_t=volume,
+            term_m=term_months,
+            floor_futures_rubkg=float(self.floor_futures[i, j]),
+            floor_put_rubkg=float(floor_put),
+            floor_forward_rubkg=float(self.floor_forward[i, j]),
+            recommended=recommended
+        )
+
+    def to_dict(self) -> Dict:
+        """Сериализует сетку для фронтенда."""
+        floor_put = np.where(self.recommended == STRATEGIES.index("put_ladder"),
+                             self.floor_put_ladder, self.floor_put)
+        return {
+            "snapshot_version": self.snapshot_version,
+            "params_version": self.params_version,
+            "built_at": self.built_at.isoformat(),
+            "terms": self.terms.tolist(),
+            "volumes": self.volumes.tolist(),
+            "floor_futures_rubkg": self.floor_futures.tolist(),
+            "floor_put_rubkg": floor_put.tolist(),
+            "floor_forward_rubkg": self.floor_forward.tolist(),
+            "recommended": [[STRATEGIES[k] for k in row] for row in self.recommended]
+        }
+
+
+def build_grid(market_data: MarketData, snapshot_version: int,
+               terms: Sequence[int] = GRID_TERMS, volumes: Sequence[int] = GRID_VOLUMES,
+               use_ladder: bool = True, params: Optional[PricingParams] = None,
+               ladders: Optional[LadderCache] = None) -> PricingGrid:
+    """
+    Считает всю сетку векторными проходами по срокам.
+
+    Результат совпадает с calculate_all_prices в каждой ячейке. MGP от
+    объема не зависит, поэтому строки по срокам транслируются на ось объемов.
+    Сроки группируются по экспирации опционов под срок, опционные
+    стратегии считаются одним проходом на группу. Лестницы по срокам
+    берутся из ladders, если кэш передан.
+    """
+    params = params or get_params()
+    terms = np.asarray(terms, dtype=int)
+    volumes = np.asarray(volumes, dtype=int)
+    futures_price = market_data.futures_quote.price
+    contract_prices = term_futures_price(market_data, terms)
+
+    mgp_futures = futures.floor_price(contract_prices, terms, params=params)
+    mgp_put = np.empty(terms.shape)
+    mgp_put_ladder = np.empty(terms.shape)
+    ladder_for_term = None
+    if ladders is not None:
+        ladder_for_term = lambda term: ladders.get(snapshot_version, market_data, term, params)
+
+    chains = [term_options(market_data, term) for term in terms]
+    expiries = np.array([chain.expiry[0] if len(chain) else np.datetime64("NaT") for chain in chains],
+                        dtype="datetime64[D]")
+    for expiry in np.unique(expiries):
+        group = np.flatnonzero((expiries == expiry) | (np.isnat(expiries) & np.isnat(expiry)))
+        put_options = chains[group[0]]
+        mgp_put[group] = options.floor_price_by_term(put_options, futures_price, terms[group],
+                                                     market_data.volatility, params=params)
+        if use_ladder and len(put_options) >= 2:
+            mgp_put_ladder[group] = options.ladder_floor_price_by_term(put_options, futures_price, terms[group],
+                                                                       market_data.volatility, params=params,
+                                                                       ladder_for_term=ladder_for_term)
+        else:
+            mgp_put_ladder[group] = mgp_put[group]
+    mgp_forward = np.broadcast_to(calculate_forward_price(contract_prices, terms, params=params), terms.shape)
+
+    shape = (len(terms), len(volumes))
+    by_strategy = [np.broadcast_to(np.asarray(mgp, dtype=float)[:, None], shape)
+                   for mgp in (mgp_futures, mgp_put, mgp_put_ladder, mgp_forward)]
+    recommended = np.argmax(np.stack(by_strategy), axis=0)
+
+    return PricingGrid(
+        snapshot_version=snapshot_version,
+        params_version=params.version,
+        terms=terms,
+        volumes=volumes,
+        floor_futures=by_strategy[0],
+        floor_put=by_strategy[1],
+        floor_put_ladder=by_strategy[2],
+        floor_forward=by_strategy[3],
+        recommended=recommended,
+        built_at=datetime.utcnow()
+    )
+
+
+class GridCache:
+    """
+    Держит последнюю сетку и перестраивает ее при смене версии снапшота или параметров.
+
+    get может вызываться из пула потоков: одновременные вызовы для одной
+    версии строят сетку один раз.
+    """
+
+    def __init__(self, terms: Sequence[int] = GRID_TERMS, volumes: Sequence[int] = GRID_VOLUMES,
+                 ladders: Optional[LadderCache] = None):
+        self.terms = terms
+        self.volumes = volumes
+        self.ladders = ladders
+        self.rebuilds = 0
+        self._grid: Optional[PricingGrid] = None
+        self._lock = threading.Lock()
+
+    def peek(self, snapshot_version: int, params: Optional[PricingParams] = None) -> Optional[PricingGrid]:
+        """Готовая сетка для версии снапшота или None, если она еще не построена (без расчета)."""
+        params = params or get_params()
+        grid = self._grid
+        if grid is None or grid.snapshot_version != snapshot_version or grid.params_version != params.version:
+            return None
+        return grid
+
+    def get(self, market_data: MarketData, snapshot_version: int,
+            params: Optional[PricingParams] = None) -> PricingGrid:
+        """Возвращает сетку для данной версии снапшота."""
+        params = params or get_params()
+        with self._lock:
+            grid = self.peek(snapshot_version, params)
+            if grid is None:
+                grid = build_grid(market_data, snapshot_version, self.terms, self.volumes,
+                                  params=params, ladders=self.ladders)
+                self._grid = grid
+                self.rebuilds += 1
+        return grid
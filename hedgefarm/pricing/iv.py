@@ -0,0 +1,212 @@
+"""Векторизованный расчет подразумеваемой волатильности и поверхность IV."""
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from ..chain import OptionChain, as_chain
+from ..models import OptionQuote
+from .black import black76, black_scholes
+
+# Границы поиска волатильности
+VOL_MIN = 1e-4
+VOL_MAX = 5.0
+
+_MODELS = {"black_scholes": black_scholes, "black76": black76}
+
+
+class IVResult(NamedTuple):
+    """Результат обращения премий: vol равна NaN там, где решения нет."""
+    vol: np.ndarray
+    converged: np.ndarray
+    iterations: int
+
+
+def implied_vol(premium, S, K, T, r, option_type: str = "P", model: str = "black_scholes",
+                tol: float = 1e-8, max_iter: int = 100) -> IVResult:
+    """
+    Обращает премии в волатильность для всей цепочки за один проход.
+
+    Итерации Ньютона по веге идут одновременно для всех опционов. Для
+    каждого опциона держится интервал [lo, hi], содержащий корень; если
+    шаг Ньютона выходит за интервал или вега вырождена, делается шаг
+    бисекции. Премии вне безарбитражных границ модели дают NaN.
+    """
+    pricer = _MODELS[model]
+    premium, S, K, T, r = np.broadcast_arrays(*(np.asarray(x, dtype=float)
+                                                for x in (premium, S, K, T, r)))
+    shape = premium.shape
+    premium, S, K, T, r = (x.ravel() for x in (premium, S, K, T, r))
+
+    lower = pricer(S, K, T, r, VOL_MIN, option_type).premium
+    upper = pricer(S, K, T, r, VOL_MAX, option_type).premium
+    solvable = np.isfinite(premium) & (T > 0) & (premium > lower) & (premium < upper)
+
+    vol = np.full(premium.shape, np.nan)
+    converged = np.zeros(premium.shape, dtype=bool)
+    lo = np.full(premium.shape, VOL_MIN)
+    hi = np.full(premium.shape, VOL_MAX)
+    # Начальное приближение Бреннера-Субраманьяма
+    with np.errstate(divide="ignore", invalid="ignore"):
+        guess = np.sqrt(2.0 * np.pi / T) * premium / S
+    sigma = np.clip(np.nan_to_num(guess, nan=0.3), 0.05, 2.0)
+
+    active = np.flatnonzero(solvable)
+    iterations = 0
+    while active.size and iterations < max_iter:
+        iterations += 1
+        s = sigma[active]
+        values = pricer(S[active], K[active], T[active], r[active], s, option_type)
+        diff = values.premium - premium[active]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = diff / values.vega
+        # Критерий по шагу в волатильности: у дальних страйков вега мала,
+        # и малая ошибка в премии еще не означает точную волатильность
+        done = (diff == 0) | (np.abs(step) <= tol) | (hi[active] - lo[active] <= tol)
+        vol[active[done]] = s[done]
+        converged[active[done]] = True
+
+        # Премия растет с волатильностью: знак ошибки сужает интервал
+        lo[active] = np.where(diff < 0, s, lo[active])
+        hi[active] = np.where(diff > 0, s, hi[active])
+        newton = s - step
+        inside = (values.vega > 1e-12) & (newton > lo[active]) & (newton < hi[active])
+        sigma[active] = np.where(inside, newton, 0.5 * (lo[active] + hi[active]))
+
+        active = active[~done]
+
+    return IVResult(vol.reshape(shape), converged.reshape(shape), iterations)
+
+
+@dataclass(frozen=True)
+class IVSurface:
+    """
+    Поверхность IV страйк x срок.
+
+    vols имеет форму (len(strikes), len(terms)), сроки в годах. По страйку
+    интерполяция линейная по волатильности, по сроку - линейная по полной
+    дисперсии sigma^2 * T; за краями сетки значения продлеваются константой.
+    """
+    strikes: np.ndarray
+    terms: np.ndarray
+    vols: np.ndarray
+
+    def __post_init__(self):
+        # Полная дисперсия считается один раз на снапшот
+        object.__setattr__(self, "_total_var", self.vols ** 2 * self.terms[None, :])
+        object.__setattr__(self, "_memo", {})
+
+    def vol(self, strike, term):
+        """Волатильность для массивов страйков и сроков (в годах), broadcasting NumPy."""
+        K, T = np.broadcast_arrays(np.asarray(strike, dtype=float), np.asarray(term, dtype=float))
+        i, i1, wk = _segments(self.strikes, K)
+        j, j1, wt = _segments(self.terms, T)
+        w = self._total_var
+        by_term_lo = w[i, j] * (1 - wk) + w[i1, j] * wk
+        by_term_hi = w[i, j1] * (1 - wk) + w[i1, j1] * wk
+        total_var = by_term_lo * (1 - wt) + by_term_hi * wt
+        # Время для дисперсии берется с той же (ограниченной) оси, что и узлы
+        t = self.terms[j] * (1 - wt) + self.terms[j1] * wt
+        return np.sqrt(total_var / t)
+
+    def vol_at(self, strike: float, term: float) -> float:
+        """Скалярный запрос с мемоизацией для повторяющихся точек."""
+        key = (strike, term)
+        value = self._memo.get(key)
+        if value is None:
+            value = float(self.vol(strike, term))
+            if len(self._memo) < 65536:
+                self._memo[key] = value
+        return value
+
+    def to_dict(self) -> Dict:
+        return {
+            "strikes": self.strikes.tolist(),
+            "terms": self.terms.tolist(),
+            "vols": self.vols.tolist()
+        }
+
+
+def _segments(nodes: np.ndarray, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Индексы соседних узлов и веса для линейной интерполяции с плоскими краями."""
+    if len(nodes) == 1:
+        zeros = np.zeros(x.shape, dtype=int)
+        return zeros, zeros, np.zeros(x.shape)
+    x = np.clip(x, nodes[0], nodes[-1])
+    i = np.clip(np.searchsorted(nodes, x, side="right") - 1, 0, len(nodes) - 2)
+    return i, i + 1, (x - nodes[i]) / (nodes[i + 1] - nodes[i])
+
+
+def build_surface(strikes, terms, premiums, S: float, r: float = 0.15,
+                  option_type: str = "P", model: str = "black_scholes") -> IVSurface:
+    """
+    Строит поверхность по котировкам (страйк, срок в годах, премия).
+
+    Все премии обращаются одним вызовом implied_vol. Пропуски в узлах
+    сетки (нет котировки или нет решения) заполняются интерполяцией
+    по страйку в пределах своего срока.
+    """
+    strikes = np.asarray(strikes, dtype=float)
+    terms = np.asarray(terms, dtype=float)
+    vols = implied_vol(premiums, S, strikes, terms, r, option_type, model).vol
+
+    grid_strikes = np.unique(strikes)
+    grid_terms = []
+    columns = []
+    for term in np.unique(terms):
+        ok = (terms == term) & np.isfinite(vols)
+        if not ok.any():
+            continue
+        # np.interp требует строго возрастающих узлов: повторы страйка усредняются
+        nodes, inverse = np.unique(strikes[ok], return_inverse=True)
+        node_vols = np.bincount(inverse, weights=vols[ok]) / np.bincount(inverse)
+        columns.append(np.interp(grid_strikes, nodes, node_vols))
+        grid_terms.append(term)
+
+    if not columns:
+        raise ValueError("No option quotes with a solvable implied volatility")
+    return IVSurface(strikes=grid_strikes, terms=np.array(grid_terms), vols=np.column_stack(columns))
+
+
+def _terms(chain: OptionChain, as_of: Optional[date] = None) -> np.ndarray:
+    """Срок до экспирации каждой серии в годах от даты оценки (по умолчанию - сегодня)."""
+    return chain.years_to_expiry(as_of or date.today())
+
+
+def surface_from_chain(options: List[OptionQuote], underlying_price: float, r: float = 0.15,
+                       model: str = "black_scholes", as_of: Optional[date] = None) -> IVSurface:
+    """Поверхность IV по цепочке опционов одного типа."""
+    chain = as_chain(options)
+    if not len(chain):
+        raise ValueError("No options available for IV surface")
+    option_type = "C" if chain.is_call[0] else "P"
+    return build_surface(chain.strike, _terms(chain, as_of), chain.premium,
+                         underlying_price, r, option_type, model)
+
+
+def chain_vols(chain: OptionChain, underlying_price: float, r: float = 0.15,
+               as_of: Optional[date] = None) -> np.ndarray:
+    """
+    IV каждого опциона цепочки массивом (NaN, если решения нет); PUT и CALL в одной цепочке.
+
+    Срок каждой серии - от даты оценки as_of до ее экспирации.
+    """
+    vols = np.full(len(chain), np.nan)
+    if not len(chain):
+        return vols
+    terms = _terms(chain, as_of)
+    for option_type, mask in (("C", chain.is_call), ("P", ~chain.is_call)):
+        if mask.any():
+            vols[mask] = implied_vol(chain.premium[mask], underlying_price, chain.strike[mask],
+                                     terms[mask], r, option_type).vol
+    return vols
+
+
+def chain_implied_vols(options: List[OptionQuote], underlying_price: float,
+                       r: float = 0.15, as_of: Optional[date] = None) -> List[Optional[float]]:
+    """Подразумеваемая волатильность для каждого опциона цепочки (None, если решения нет)."""
+    vols = chain_vols(as_chain(options), underlying_price, r, as_of)
+    return [float(v) if np.isfinite(v) else None for v in vols]
@@ -0,0 +1,147 @@
+"""Оптимизация страйков и весов лестницы PUT под бюджет премии."""
+
+import threading
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+import numpy as np
+from scipy.optimize import Bounds, LinearConstraint, linprog, milp
+
+from ..chain import OptionChain, as_chain
+from ..config import PricingParams, get_params
+from ..models import MarketData, OptionQuote
+from .black import black_scholes
+
+Ladder = List[Tuple[OptionQuote, float]]
+
+
+def _premiums(chain: OptionChain, futures_price: float, T: float, volatility: float) -> np.ndarray:
+    """Рыночные премии, а где их нет - премии по модели (одним вызовом ядра)."""
+    needs_model = chain.needs_model()
+    if not needs_model.any():
+        return chain.premium
+    model = black_scholes(futures_price, chain.strike, T, 0.15, volatility, "P").premium
+    return np.where(needs_model, model, chain.premium)
+
+
+def _solve(floors: np.ndarray, premiums: np.ndarray, budget: float, cap: float) -> Optional[np.ndarray]:
+    """LP: max sum(w * floor) при sum(w) = 1, 0 <= w <= cap, sum(w * premium) <= budget."""
+    k = len(floors)
+    result = linprog(
+        -floors,
+        A_ub=premiums[None, :], b_ub=[budget],
+        A_eq=np.ones((1, k)), b_eq=[1.0],
+        bounds=[(0.0, cap)] * k,
+        method="highs"
+    )
+    return result.x if result.status == 0 else None
+
+
+def _solve_legs(floors: np.ndarray, premiums: np.ndarray, budget: float, cap: float,
+                max_legs: int) -> Optional[np.ndarray]:
+    """
+    MILP: задача _solve по всем страйкам с не более чем max_legs ненулевыми весами.
+
+    Переменные - веса w и индикаторы страйков z: w_i <= cap * z_i, sum(z) <= max_legs.
+    """
+    n = len(floors)
+    eye = np.eye(n)
+    constraints = [
+        LinearConstraint(np.concatenate([np.ones(n), np.zeros(n)])[None, :], 1.0, 1.0),
+        LinearConstraint(np.concatenate([premiums, np.zeros(n)])[None, :], -np.inf, budget),
+        LinearConstraint(np.hstack([eye, -cap * eye]), -np.inf, 0.0),
+        LinearConstraint(np.concatenate([np.zeros(n), np.ones(n)])[None, :], 0.0, max_legs),
+    ]
+    result = milp(
+        np.concatenate([-floors, np.zeros(n)]),
+        constraints=constraints,
+        integrality=np.concatenate([np.zeros(n), np.ones(n)]),
+        bounds=Bounds(np.zeros(2 * n), np.concatenate([np.full(n, cap), np.ones(n)]))
+    )
+    return result.x[:n] if result.status == 0 else None
+
+
+def optimize_ladder(put_options: List[OptionQuote], futures_price: float, term_months: int,
+                    volatility: float = 0.25, params: Optional[PricingParams] = None) -> Optional[Ladder]:
+    """
+    Выбирает страйки и веса лестницы, максимизирующие MGP.
+
+    Ограничения: не более max_legs страйков, доля страйка не выше max_weight,
+    средневзвешенная премия не выше premium_budget_pct от цены фьючерса.
+    Если страйков не больше max_legs, решается LP по всем страйкам, иначе -
+    одна MILP с индикаторами страйков вместо перебора подмножеств.
+    Возвращает None, если ограничения несовместны.
+    """
+    params = params or get_params()
+    limits = params.ladder
+    chain = as_chain(put_options)
+    if not len(chain):
+        raise ValueError("No PUT options available for ladder hedge")
+
+    n = len(chain)
+    k = min(limits.max_legs, n)
+    cap = min(limits.max_weight, 1.0)
+    if k < 1 or k * cap < 1.0 - 1e-12:
+        return None
+
+    strikes = chain.strike
+    premiums = _premiums(chain, futures_price, term_months / 12.0, volatility)
+    # MGP каждого страйка в руб/тонна, как в ladder_floor_price
+    floors = strikes - premiums - params.basis_discount - strikes * params.fee_pct.put
+    budget = limits.premium_budget_pct * futures_price
+
+    if k == n:
+        weights = _solve(floors, premiums, budget, cap)
+    else:
+        weights = _solve_legs(floors, premiums, budget, cap, k)
+    if weights is None:
+        return None
+    legs = [(chain.quote(j), float(w)) for j, w in enumerate(weights) if w > 1e-9]
+    total = sum(w for _, w in legs)
+    return sorted(((option, w / total) for option, w in legs), key=lambda leg: leg[0].strike)
+
+
+class LadderCache:
+    """
+    Мемоизация лестниц по (версия снапшота, версия параметров, срок).
+
+    Оптимизация выполняется один раз на снапшот и срок; последующие
+    запросы /price получают готовую лестницу. Кэш общий для event loop и
+    сборки сетки в пуле потоков, поэтому словарь защищен блокировкой
+    (сама оптимизация выполняется вне ее).
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._ladders: "OrderedDict[Hashable, Ladder]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, snapshot_version: int, market_data: MarketData, term_months: int,
+            params: Optional[PricingParams] = None) -> Ladder:
+        """Возвращает лестницу для снапшота и срока."""
+        from .curve import term_options
+        from .options import select_ladder
+
+        params = params or get_params()
+        key = (snapshot_version, params.version, int(term_months))
+        with self._lock:
+            ladder = self._ladders.get(key)
+            if ladder is not None:
+                self.hits += 1
+                self._ladders.move_to_end(key)
+                return ladder
+            self.misses += 1
+
+        ladder = select_ladder(term_options(market_data, term_months), market_data.futures_quote.price, term_months,
+                               market_data.volatility, params)
+        with self._lock:
+            self._ladders[key] = ladder
+            if len(self._ladders) > self.max_entries:
+                self._ladders.popitem(last=False)
+        return ladder
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ladders.clear()
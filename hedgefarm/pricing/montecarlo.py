@@ -0,0 +1,208 @@
+"""Монте-Карло распределения реализованной цены по стратегиям хеджирования."""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from ..config import PricingParams, get_params
+from ..utils import rub_per_kg
+from .pipeline import PricingResult
+
+# Стратегии распределения; unhedged - продажа по рынку без хеджа
+OUTCOMES = ("futures", "put", "put_ladder", "forward", "unhedged")
+
+DEFAULT_QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Гистограмма нормальных приращений для квантилей: 4096 корзин на [-8, 8]
+Z_EDGES = np.linspace(-8.0, 8.0, 4097)
+
+
+@dataclass(frozen=True)
+class OutcomeModel:
+    """
+    Реализованная цена (руб/тонна) как функция цены фьючерса на экспирации.
+
+    Все стратегии неубывающие по F_T: PUT дает max(F_T, K) за вычетом
+    затрат, фьючерс и форвард фиксируют цену. Поэтому квантиль любой
+    стратегии равен ее значению в квантиле F_T.
+    """
+    futures_price: float
+    volatility: float
+    T: float
+    basis_discount: float
+    put_strike: float
+    put_cost: float
+    ladder_strikes: np.ndarray
+    ladder_weights: np.ndarray
+    ladder_cost: float
+    futures_floor: float
+    forward_floor: float
+
+    @classmethod
+    def from_result(cls, result: PricingResult, params: Optional[PricingParams] = None) -> "OutcomeModel":
+        params = params or get_params()
+        fee = params.fee_pct.put
+        strikes = np.array([strike for strike, _ in result.ladder_strikes])
+        weights = np.array([weight for _, weight in result.ladder_strikes])
+        premiums = np.array(result.ladder_premiums)
+        return cls(
+            futures_price=result.futures_price,
+            volatility=result.volatility,
+            T=result.term_months / 12.0,
+            basis_discount=params.basis_discount,
+            put_strike=result.strike,
+            put_cost=result.premium + result.strike * fee,
+            ladder_strikes=strikes,
+            ladder_weights=weights,
+            ladder_cost=float(weights @ (premiums + strikes * fee)),
+            futures_floor=result.mgp_futures * 1000.0,
+            forward_floor=result.mgp_forward * 1000.0
+        )
+
+    def outcomes(self, terminal: np.ndarray) -> np.ndarray:
+        """Матрица (len(OUTCOMES), len(terminal)) реализованных цен в руб/тонна."""
+        out = np.empty((len(OUTCOMES), terminal.size))
+        out[0] = self.futures_floor
+        out[1] = np.maximum(terminal, self.put_strike) - self.put_cost - self.basis_discount
+        ladder = self.ladder_weights @ np.maximum(terminal[None, :], self.ladder_strikes[:, None])
+        out[2] = ladder - self.ladder_cost - self.basis_discount
+        out[3] = self.forward_floor
+        out[4] = terminal - self.basis_discount
+        return out
+
+
+@dataclass
+class _Accumulator:
+    """Сливаемые суммы по блокам путей: моменты, ковариация с контролем, гистограмма Z."""
+    n: int
+    sums: np.ndarray
+    sums_sq: np.ndarray
+    cross: np.ndarray
+    control_sum: float
+    control_sq: float
+    counts: np.ndarray
+
+    @classmethod
+    def empty(cls) -> "_Accumulator":
+        k = len(OUTCOMES)
+        return cls(0, np.zeros(k), np.zeros(k), np.zeros(k), 0.0, 0.0, np.zeros(len(Z_EDGES) - 1, dtype=np.int64))
+
+    def merge(self, other: "_Accumulator") -> "_Accumulator":
+        return _Accumulator(
+            self.n + other.n,
+            self.sums + other.sums,
+            self.sums_sq + other.sums_sq,
+            self.cross + other.cross,
+            self.control_sum + other.control_sum,
+            self.control_sq + other.control_sq,
+            self.counts + other.counts
+        )
+
+
+def _simulate_block(model: OutcomeModel, n_paths: int, seed, chunk_size: int,
+                    antithetic: bool, drift: float) -> _Accumulator:
+    """Симулирует n_paths путей блоками по chunk_size; память O(chunk_size)."""
+    rng = np.random.default_rng(seed)
+    acc = _Accumulator.empty()
+    bins = len(Z_EDGES) - 1
+    width = Z_EDGES[1] - Z_EDGES[0]
+    vol_sqrt_t, log_drift = _lognormal(model, drift)
+
+    remaining = n_paths
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        if antithetic:
+            half = rng.standard_normal((size + 1) // 2)
+            z = np.concatenate([half, -half])[:size]
+        else:
+            z = rng.standard_normal(size)
+        terminal = np.exp(log_drift + vol_sqrt_t * z)
+        values = model.outcomes(terminal)
+
+        control = terminal - model.futures_price
+        acc.n += size
+        acc.sums += values.sum(axis=1)
+        acc.sums_sq += np.einsum("ij,ij->i", values, values)
+        acc.cross += values @ control
+        acc.control_sum += control.sum()
+        acc.control_sq += control @ control
+
+        idx = np.clip(((z - Z_EDGES[0]) / width).astype(np.int64), 0, bins - 1)
+        acc.counts += np.bincount(idx, minlength=bins)
+        remaining -= size
+    return acc
+
+
+def _lognormal(model: OutcomeModel, drift: float):
+    """Параметры закона ln F_T = log_drift + vol_sqrt_t * Z."""
+    vol_sqrt_t = model.volatility * np.sqrt(model.T)
+    log_drift = np.log(model.futures_price) + (drift - 0.5 * model.volatility ** 2) * model.T
+    return vol_sqrt_t, log_drift
+
+
+def _z_quantiles(counts: np.ndarray, probs: np.ndarray) -> np.ndarray:
+    """Квантили Z по гистограмме с линейной интерполяцией внутри корзины."""
+    cdf = np.concatenate([[0.0], np.cumsum(counts)]) / counts.sum()
+    return np.interp(probs, cdf, Z_EDGES)
+
+
+def simulate_distribution(result: PricingResult, n_paths: int = 100_000,
+                          quantiles: Sequence[float] = DEFAULT_QUANTILES,
+                          chunk_size: int = 65_536, antithetic: bool = True,
+                          control_variate: bool = True, drift: float = 0.0,
+                          seed: Optional[int] = None, workers: int = 1,
+                          params: Optional[PricingParams] = None) -> Dict[str, Dict]:
+    """
+    Распределение реализованной цены (руб/кг) по стратегиям.
+
+    F_T моделируется логнормально (без дрейфа - мартингальная мера
+    фьючерса). Пути считаются блоками фиксированного размера, поэтому
+    память не зависит от n_paths. Антитетические пары снижают дисперсию
+    оценок, контрольная переменная F_T (E[F_T] известно точно) уточняет
+    средние. При workers > 1 блоки распределяются по пулу процессов с
+    независимыми потоками случайных чисел.
+    """
+    model = OutcomeModel.from_result(result, params)
+    streams = np.random.SeedSequence(seed).spawn(max(workers, 1))
+    shares = [n_paths // len(streams) + (i < n_paths % len(streams)) for i in range(len(streams))]
+    args = [(model, share, stream, chunk_size, antithetic, drift) for share, stream in zip(shares, streams)]
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_simulate_block, *zip(*args)))
+    else:
+        parts = [_simulate_block(*args[0])]
+    acc = parts[0]
+    for part in parts[1:]:
+        acc = acc.merge(part)
+
+    n = acc.n
+    mean = acc.sums / n
+    # Дисперсия по независимым путям; для монотонных выплат антитетические
+    # пары ее только уменьшают, так что стандартная ошибка консервативна
+    variance = np.maximum(acc.sums_sq / n - mean ** 2, 0.0)
+    expected_control = model.futures_price * (np.exp(drift * model.T) - 1.0)
+    if control_variate:
+        control_mean = acc.control_sum / n
+        control_var = acc.control_sq / n - control_mean ** 2
+        cov = acc.cross / n - mean * control_mean
+        beta = cov / control_var if control_var > 0 else np.zeros_like(cov)
+        mean = mean - beta * (control_mean - expected_control)
+        variance = np.maximum(variance - beta * cov, 0.0)
+
+    # Квантили стратегий - значения монотонных выплат в квантилях F_T
+    probs = np.asarray(quantiles, dtype=float)
+    vol_sqrt_t, log_drift = _lognormal(model, drift)
+    terminal = np.exp(log_drift + vol_sqrt_t * _z_quantiles(acc.counts, probs))
+    by_quantile = model.outcomes(terminal)
+    report = {}
+    for k, name in enumerate(OUTCOMES):
+        values = by_quantile[k]
+        report[name] = {
+            "mean_rubkg": rub_per_kg(float(mean[k])),
+            "std_error_rubkg": rub_per_kg(float(np.sqrt(variance[k] / n))),
+            "quantiles_rubkg": {f"{p:g}": rub_per_kg(float(v)) for p, v in zip(probs, values)}
+        }
+    return report
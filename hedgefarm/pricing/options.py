@@ -1,11 +1,13 @@
 """Расчет минимальной гарантированной цены при хедже PUT опционами."""
 
-import math
 import numpy as np
-from scipy import stats
-from typing import List, Dict, Tuple
+from typing import Callable, List, Dict, Optional, Tuple
+from ..chain import as_chain
+from ..config import PricingParams, get_params
 from ..models import OptionQuote
-from ..utils import load_cfg, rub_per_kg
+from ..utils import rub_per_kg
+from .black import black_scholes
+from .ladder import optimize_ladder
 
 
 def black_scholes_put(S: float, K: float, T: float, r: float, sigma: float) -> float:
@@ -22,21 +24,18 @@ def black_scholes_put(S: float, K: float, T: float, r: float, sigma: float) -> f
     Returns:
         Цена PUT опциона
     """
-    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
-    d2 = d1 - sigma * math.sqrt(T)
-    
-    put_price = K * math.exp(-r * T) * stats.norm.cdf(-d2) - S * stats.norm.cdf(-d1)
-    return max(put_price, 0)  # цена не может быть отрицательной
+    # Скалярная обертка над векторизованным ядром; цена не бывает отрицательной
+    return float(black_scholes(S, K, T, r, sigma, "P").premium)
 
 
 def select_optimal_strike(futures_price: float, put_options: List[OptionQuote]) -> OptionQuote:
     """Выбирает оптимальный страйк (ближайший к текущей цене)."""
-    if not put_options:
+    chain = as_chain(put_options)
+    if not len(chain):
         raise ValueError("No PUT options available")
     
-    # Ищем страйк ближайший к текущей цене фьючерса
-    best_option = min(put_options, key=lambda opt: abs(opt.strike - futures_price))
-    return best_option
+    # Ищем страйк ближайший к текущей цене фьючерса бинарным поиском по цепочке
+    return chain.quote(chain.nearest(futures_price))
 
 
 def create_ladder_strikes(futures_price: float, put_options: List[OptionQuote]) -> List[Tuple[OptionQuote, float]]:
@@ -50,12 +49,11 @@ def create_ladder_strikes(futures_price: float, put_options: List[OptionQuote])
     Returns:
         Список кортежей (опцион, вес в портфеле)
     """
-    if not put_options:
+    # Цепочка уже отсортирована по страйку
+    sorted_options = as_chain(put_options)
+    if not len(sorted_options):
         raise ValueError("No PUT options available for ladder hedge")
     
-    # Сортируем опционы по страйку
-    sorted_options = sorted(put_options, key=lambda opt: opt.strike)
-    
     # Если опционов меньше 5, используем все доступные
     if len(sorted_options) < 5:
         # Равномерное распределение между доступными опционами
@@ -63,8 +61,7 @@ def create_ladder_strikes(futures_price: float, put_options: List[OptionQuote])
         return [(opt, weight) for opt in sorted_options]
     
     # Выбираем 5 страйков: 2 выше спота, 1 около спота, 2 ниже спота
-    spot_option = min(sorted_options, key=lambda opt: abs(opt.strike - futures_price))
-    spot_idx = sorted_options.index(spot_option)
+    spot_idx = sorted_options.nearest(futures_price)
     
     # Определяем индексы для лестницы
     ladder_indices = []
@@ -109,84 +106,115 @@ def create_ladder_strikes(futures_price: float, put_options: List[OptionQuote])
     ladder = []
     for i, idx in enumerate(ladder_indices):
         if i < len(weights):
-            ladder.append((sorted_options[idx], weights[i]))
+            ladder.append((sorted_options.quote(idx), weights[i]))
     
     return ladder
 
 
-def ladder_floor_price(put_options: List[OptionQuote], futures_price: float, 
-                      term_months: int, volatility: float = 0.25) -> float:
+def select_ladder(put_options: List[OptionQuote], futures_price: float, term_months: int,
+                  volatility: float = 0.25, params: Optional[PricingParams] = None) -> List[Tuple[OptionQuote, float]]:
     """
-    Рассчитывает минимальную гарантированную цену при лестничном хедже PUT опционами.
+    Лестница для расчета MGP: оптимизированная, если это включено в настройках.
+    
+    При несовместных ограничениях оптимизатора используются фиксированные веса.
     """
-    cfg = load_cfg()
+    params = params or get_params()
+    if params.ladder.optimize:
+        ladder = optimize_ladder(put_options, futures_price, term_months, volatility, params)
+        if ladder is not None:
+            return ladder
+    return create_ladder_strikes(futures_price, put_options)
+
+
+def ladder_floor_price_by_term(put_options: List[OptionQuote], futures_price: float,
+                              term_months, volatility: float = 0.25,
+                              params: Optional[PricingParams] = None,
+                              ladder_for_term: Optional[Callable[[int], List[Tuple[OptionQuote, float]]]] = None
+                              ) -> np.ndarray:
+    """
+    MGP лестничного хеджа для массива сроков за один векторный проход.
     
+    Премии по модели считаются матрицей страйк x срок одним вызовом ядра.
+    Оптимизированная лестница зависит от срока, поэтому тогда расчет идет
+    по каждому сроку; ladder_for_term позволяет подставить кэш лестниц.
+    """
+    params = params or get_params()
+    
+    if params.ladder.optimize:
+        if ladder_for_term is None:
+            ladder_for_term = lambda term: select_ladder(put_options, futures_price, term, volatility, params)
+        terms = np.asarray(term_months)
+        result = np.empty(terms.shape)
+        for idx, term in np.ndenumerate(terms):
+            result[idx] = _ladder_floor_price(ladder_for_term(int(term)), futures_price, term, volatility, params)
+        return result
+    
+    # Фиксированная лестница одна для всех сроков
+    return _ladder_floor_price(create_ladder_strikes(futures_price, put_options),
+                               futures_price, term_months, volatility, params)
+
+
+def _ladder_floor_price(ladder: List[Tuple[OptionQuote, float]], futures_price: float,
+                        term_months, volatility: float, params: PricingParams) -> np.ndarray:
+    """MGP заданной лестницы для массива сроков."""
     # Параметры из конфигурации
-    fee_pct = cfg["fee_pct"]["put"]
-    basis_discount = cfg["basis_discount"]
-    
-    # Создаем лестницу страйков
-    ladder = create_ladder_strikes(futures_price, put_options)
+    fee_pct = params.fee_pct.put
+    basis_discount = params.basis_discount
     
-    total_mgp = 0.0
-    T = term_months / 12.0  # время до экспирации в годах
+    T = np.asarray(term_months, dtype=float) / 12.0  # время до экспирации в годах
     r = 0.15  # безрисковая ставка
     
-    for option, weight in ladder:
-        # Если премия из рынка отсутствует, рассчитываем по Black-Scholes
-        if option.premium <= 0 or option.implied_vol is None:
-            premium = black_scholes_put(
-                S=futures_price,
-                K=option.strike,
-                T=T,
-                r=r,
-                sigma=volatility
-            )
-        else:
-            premium = option.premium
-        
-        # Комиссия платформы для этого опциона
-        platform_fee = option.strike * fee_pct
-        
-        # Цена пола в руб/тонна для этого опциона
-        option_floor_price_ton = option.strike - premium - basis_discount - platform_fee
-        
-        # Добавляем взвешенный вклад в общую MGP
-        total_mgp += weight * rub_per_kg(option_floor_price_ton)
+    strikes = np.array([option.strike for option, _ in ladder])
+    weights = np.array([weight for _, weight in ladder])
+    market_premiums = np.array([option.premium for option, _ in ladder])
+    
+    # Премии с лишней осью срока: форма (страйки, *сроки)
+    expand = (slice(None),) + (None,) * T.ndim
     
-    return total_mgp
+    # Если премия из рынка отсутствует, рассчитываем по Black-Scholes (одним вызовом на всю лестницу)
+    needs_model = np.array([option.premium <= 0 or option.implied_vol is None for option, _ in ladder])
+    if needs_model.any():
+        model_premiums = black_scholes(futures_price, strikes[expand], T, r, volatility, "P").premium
+        premiums = np.where(needs_model[expand], model_premiums, market_premiums[expand])
+    else:
+        premiums = np.broadcast_to(market_premiums[expand], strikes.shape + T.shape)
+    
+    # Цена пола в руб/тонна для каждого опциона с учетом комиссии платформы
+    floor_prices_ton = strikes[expand] - premiums - basis_discount - strikes[expand] * fee_pct
+    
+    # Взвешенная MGP по лестнице
+    return rub_per_kg(np.tensordot(weights, floor_prices_ton, axes=1))
 
 
-def floor_price(put_options: List[OptionQuote], futures_price: float, 
-                term_months: int, volatility: float = 0.25) -> float:
+def ladder_floor_price(put_options: List[OptionQuote], futures_price: float, 
+                      term_months: int, volatility: float = 0.25,
+                      params: Optional[PricingParams] = None) -> float:
     """
-    Рассчитывает минимальную гарантированную цену при хедже PUT опционом.
-    
-    Формула: MGP = (Strike - Premium - Basis - Fee) / 1000
+    Рассчитывает минимальную гарантированную цену при лестничном хедже PUT опционами.
     """
-    cfg = load_cfg()
+    return float(ladder_floor_price_by_term(put_options, futures_price, term_months, volatility, params))
+
+
+def floor_price_by_term(put_options: List[OptionQuote], futures_price: float,
+                        term_months, volatility: float = 0.25,
+                        params: Optional[PricingParams] = None) -> np.ndarray:
+    """MGP хеджа одним PUT для массива сроков за один векторный проход."""
+    params = params or get_params()
     
     # Параметры из конфигурации
-    fee_pct = cfg["fee_pct"]["put"]
-    basis_discount = cfg["basis_discount"]
+    fee_pct = params.fee_pct.put
+    basis_discount = params.basis_discount
     
     # Выбираем оптимальный опцион
     optimal_put = select_optimal_strike(futures_price, put_options)
+    T = np.asarray(term_months, dtype=float) / 12.0  # время до экспирации в годах
     
     # Если премия из рынка отсутствует, рассчитываем по Black-Scholes
     if optimal_put.premium <= 0 or optimal_put.implied_vol is None:
-        T = term_months / 12.0  # время до экспирации в годах
         r = 0.15  # безрисковая ставка (ключевая ставка ЦБ)
-        
-        premium = black_scholes_put(
-            S=futures_price,
-            K=optimal_put.strike,
-            T=T,
-            r=r,
-            sigma=volatility
-        )
+        premium = black_scholes(futures_price, optimal_put.strike, T, r, volatility, "P").premium
     else:
-        premium = optimal_put.premium
+        premium = np.full(T.shape, optimal_put.premium)
     
     # Комиссия платформы
     platform_fee = optimal_put.strike * fee_pct
@@ -198,6 +226,17 @@ def floor_price(put_options: List[OptionQuote], futures_price: float,
     return rub_per_kg(floor_price_ton)
 
 
+def floor_price(put_options: List[OptionQuote], futures_price: float, 
+                term_months: int, volatility: float = 0.25,
+                params: Optional[PricingParams] = None) -> float:
+    """
+    Рассчитывает минимальную гарантированную цену при хедже PUT опционом.
+    
+    Формула: MGP = (Strike - Premium - Basis - Fee) / 1000
+    """
+    return float(floor_price_by_term(put_options, futures_price, term_months, volatility, params))
+
+
 def calculate_delta_hedge_cost(put_delta: float, futures_price: float, volume: int) -> float:
     """Рассчитывает стоимость дельта-хеджирования."""
     # Упрощенный расчет стоимости динамического хеджирования
@@ -207,19 +246,27 @@ def calculate_delta_hedge_cost(put_delta: float, futures_price: float, volume: i
 
 
 def get_put_metrics(put_options: List[OptionQuote], futures_price: float, 
-                   term_months: int, volatility: float, volume: int) -> dict:
-    """Возвращает детальные метрики по опционному хеджу."""
-    cfg = load_cfg()
+                   term_months: int, volatility: float, volume: int,
+                   params: Optional[PricingParams] = None,
+                   ladder: Optional[List[Tuple[OptionQuote, float]]] = None) -> dict:
+    """
+    Возвращает детальные метрики по опционному хеджу.
+    
+    MGP лестницы и ее страйки берутся из одной лестницы: переданной
+    вызывающим (например, из LadderCache) или выбранной один раз здесь.
+    """
+    params = params or get_params()
+    if ladder is None:
+        ladder = select_ladder(put_options, futures_price, term_months, volatility, params)
     
     optimal_put = select_optimal_strike(futures_price, put_options)
-    mgp_single = floor_price(put_options, futures_price, term_months, volatility)
-    mgp_ladder = ladder_floor_price(put_options, futures_price, term_months, volatility)
+    mgp_single = floor_price(put_options, futures_price, term_months, volatility, params=params)
+    mgp_ladder = float(_ladder_floor_price(ladder, futures_price, term_months, volatility, params))
     
-    # Расчет дельты для PUT (приблизительно)
+    # Дельта PUT из модели Блэка-Шоулза (всегда отрицательная)
     T = term_months / 12.0
     r = 0.15
-    d1 = (math.log(futures_price / optimal_put.strike) + (r + 0.5 * volatility ** 2) * T) / (volatility * math.sqrt(T))
-    put_delta = stats.norm.cdf(d1) - 1  # дельта PUT всегда отрицательная
+    put_delta = float(black_scholes(futures_price, optimal_put.strike, T, r, volatility, "P").delta)
     
     delta_hedge_cost = calculate_delta_hedge_cost(put_delta, futures_price, volume)
     
@@ -230,6 +277,6 @@ def get_put_metrics(put_options: List[OptionQuote], futures_price: float,
         "premium": optimal_put.premium,
         "delta": put_delta,
         "delta_hedge_cost": delta_hedge_cost,
-        "ladder_strikes": [(opt.strike, weight) for opt, weight in create_ladder_strikes(futures_price, put_options)],
+        "ladder_strikes": [(opt.strike, weight) for opt, weight in ladder],
         "instrument": "put_option"
     }
\ No newline at end of file
@@ -0,0 +1,215 @@
+"""Единый однопроходный расчет всех стратегий для /price и /price/detailed."""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from ..config import PricingParams, get_params
+from ..models import MarketData, OptionQuote, QuoteOut
+from ..utils import rub_per_kg
+from . import futures, options
+from .aggregator import calculate_forward_price, select_best_strategy
+from .black import black_scholes
+from .curve import term_futures_price, term_options
+from .ladder import LadderCache
+
+
+@dataclass(frozen=True)
+class PricingResult:
+    """
+    Все промежуточные величины расчета для (снапшот, объем, срок).
+
+    QuoteOut и детальный анализ строятся из этого объекта без пересчета.
+    """
+    volume: int
+    term_months: int
+    futures_price: float
+    contract_price: float  # цена серии фьючерса под срок (по кривой)
+    volatility: float
+    usd_rate: float
+    # Одиночный PUT
+    strike: float
+    market_premium: float
+    premium: float
+    put_delta: float
+    delta_hedge_cost: float
+    # Лестница PUT: (страйк, вес) и использованные премии
+    ladder_strikes: Tuple[Tuple[float, float], ...]
+    ladder_premiums: Tuple[float, ...]
+    ladder_eligible: bool
+    # Фьючерс
+    margin_required: float
+    financing_cost: float
+    leverage: float
+    # Форвард
+    forward_discount: float
+    # MGP, руб/кг
+    mgp_futures: float
+    mgp_put: float
+    mgp_put_ladder: float
+    mgp_forward: float
+    recommended: str
+
+    def to_quote(self) -> QuoteOut:
+        """Ответ /price."""
+        return QuoteOut(
+            culture="wheat",
+            volume_t=self.volume,
+            term_m=self.term_months,
+            floor_futures_rubkg=self.mgp_futures,
+            floor_put_rubkg=self.mgp_put_ladder if self.recommended == "put_ladder" else self.mgp_put,
+            floor_forward_rubkg=self.mgp_forward,
+            recommended=self.recommended
+        )
+
+    def to_detailed(self) -> Dict:
+        """Ответ /price/detailed (та же структура, что у get_detailed_comparison)."""
+        return {
+            "futures": {
+                "mgp_rub_kg": self.mgp_futures,
+                "margin_required": self.margin_required,
+                "leverage": self.leverage,
+                "hedging_efficiency": self.mgp_futures / rub_per_kg(self.contract_price),
+                "financing_cost": self.financing_cost,
+                "instrument": "futures"
+            },
+            "put_option": {
+                "mgp_rub_kg": self.mgp_put,
+                "mgp_ladder_rub_kg": self.mgp_put_ladder,
+                "strike": self.strike,
+                "premium": self.market_premium,
+                "delta": self.put_delta,
+                "delta_hedge_cost": self.delta_hedge_cost,
+                "ladder_strikes": [list(pair) for pair in self.ladder_strikes],
+                "instrument": "put_option"
+            },
+            "forward": {
+                "mgp_rub_kg": self.mgp_forward,
+                "discount_applied": self.forward_discount,
+                "no_margin_required": True,
+                "instrument": "forward"
+            },
+            "comparison": {
+                "best_single_put": self.mgp_put,
+                "best_ladder_put": self.mgp_put_ladder,
+                "ladder_improvement": self.mgp_put_ladder - self.mgp_put
+            },
+            "market_context": {
+                "futures_price": self.futures_price,
+                "contract_price": self.contract_price,
+                "volatility": self.volatility,
+                "usd_rate": self.usd_rate
+            }
+        }
+
+
+def run_pipeline(market_data: MarketData, volume: int, term_months: int,
+                 use_ladder: bool = True, params: Optional[PricingParams] = None,
+                 ladder: Optional[List[Tuple[OptionQuote, float]]] = None) -> PricingResult:
+    """
+    Считает все стратегии за один проход.
+
+    Оптимальный страйк и лестница выбираются один раз, премии и дельта
+    для всех задействованных страйков берутся из одного вызова ядра.
+    Готовую лестницу (например, из LadderCache) можно передать в ladder.
+    Фьючерс и форвард считаются по серии кривой под срок, опционы - по
+    экспирации, ближайшей к сроку, и цене базового актива цепочки.
+    """
+    params = params or get_params()
+    futures_price = market_data.futures_quote.price
+    contract_price = term_futures_price(market_data, term_months)
+    put_options = term_options(market_data, term_months)
+    volatility = market_data.volatility
+    T = term_months / 12.0
+    r = 0.15  # безрисковая ставка
+
+    optimal_put = options.select_optimal_strike(futures_price, put_options)
+    if ladder is None:
+        ladder = options.select_ladder(put_options, futures_price, term_months, volatility, params)
+
+    # Оптимальный страйк первым, затем лестница
+    quotes = [optimal_put] + [option for option, _ in ladder]
+    strikes = np.array([option.strike for option in quotes])
+    market_premiums = np.array([option.premium for option in quotes])
+    needs_model = np.array([option.premium <= 0 or option.implied_vol is None for option in quotes])
+    model = black_scholes(futures_price, strikes, T, r, volatility, "P")
+    premiums = np.where(needs_model, model.premium, market_premiums)
+
+    floors_ton = strikes - premiums - params.basis_discount - strikes * params.fee_pct.put
+    weights = np.array([weight for _, weight in ladder])
+    mgp_put = rub_per_kg(float(floors_ton[0]))
+    mgp_ladder_raw = rub_per_kg(float(np.dot(weights, floors_ton[1:])))
+    # Лестница участвует в выборе стратегии, только если в ней больше одного страйка
+    ladder_eligible = use_ladder and len(put_options) >= 2
+    mgp_ladder_candidate = mgp_ladder_raw if ladder_eligible else mgp_put
+
+    put_delta = float(model.delta[0])
+    mgp_futures = futures.floor_price(contract_price, term_months, volume, params=params)
+    mgp_forward = calculate_forward_price(contract_price, term_months, params=params)
+
+    return PricingResult(
+        volume=volume,
+        term_months=term_months,
+        futures_price=futures_price,
+        contract_price=contract_price,
+        volatility=volatility,
+        usd_rate=market_data.usd_rate,
+        strike=optimal_put.strike,
+        market_premium=optimal_put.premium,
+        premium=float(premiums[0]),
+        put_delta=put_delta,
+        delta_hedge_cost=options.calculate_delta_hedge_cost(put_delta, futures_price, volume),
+        ladder_strikes=tuple((option.strike, weight) for option, weight in ladder),
+        ladder_premiums=tuple(float(p) for p in premiums[1:]),
+        ladder_eligible=ladder_eligible,
+        margin_required=futures.calculate_margin_requirement(contract_price, volume, params=params),
+        financing_cost=futures.calculate_financing_cost(contract_price, params.go_pct, params.go_pct,
+                                                        term_months * 30),
+        leverage=1 / params.go_pct,
+        forward_discount=params.forward_delta_pct,
+        mgp_futures=mgp_futures,
+        mgp_put=mgp_put,
+        mgp_put_ladder=mgp_ladder_raw,
+        mgp_forward=mgp_forward,
+        recommended=select_best_strategy(mgp_futures, mgp_put, mgp_ladder_candidate, mgp_forward)
+    )
+
+
+class PricingPipeline:
+    """
+    LRU-мемоизация PricingResult по (версия снапшота, версия параметров, объем, срок).
+
+    Новая версия снапшота или конфигурации дает новый ключ, старые записи
+    вытесняются по мере заполнения кэша.
+    """
+
+    def __init__(self, max_entries: int = 4096, ladders: Optional[LadderCache] = None):
+        self.max_entries = max_entries
+        self.ladders = ladders or LadderCache()
+        self.hits = 0
+        self.misses = 0
+        self._results: "OrderedDict[Hashable, PricingResult]" = OrderedDict()
+
+    def get(self, snapshot_version: int, market_data: MarketData, volume: int, term_months: int,
+            params: Optional[PricingParams] = None, use_ladder: bool = True) -> PricingResult:
+        """Возвращает результат из кэша или считает его."""
+        params = params or get_params()
+        key = (snapshot_version, params.version, volume, term_months, use_ladder)
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+
+        self.misses += 1
+        ladder = self.ladders.get(snapshot_version, market_data, term_months, params)
+        result = run_pipeline(market_data, volume, term_months, use_ladder, params, ladder)
+        self._results[key] = result
+        if len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        self._results.clear()
@@ -0,0 +1,85 @@
+"""Кэш готовых тел ответов и ETag по версиям снапшота и конфигурации."""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+def make_etag(snapshot_version: int, config_version: int, stale: bool = False) -> str:
+    """
+    ETag ответа расчета.
+
+    Ответ при фиксированных параметрах запроса определяется версией
+    снапшота и версией конфигурации; флаг stale меняет тело без смены
+    версий, поэтому тоже входит в ETag.
+    """
+    return f'"{snapshot_version}-{config_version}{"-stale" if stale else ""}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Совпадает ли ETag с заголовком If-None-Match (слабое сравнение, RFC 9110)."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag:
+            return True
+    return False
+
+
+class ResponseCache:
+    """
+    LRU сериализованных ответов с ограничением числа записей и суммарного размера.
+
+    Ключ должен включать ETag ответа: новая версия снапшота или
+    конфигурации дает новые ключи, старые записи вытесняются по мере
+    заполнения кэша.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.size_bytes = 0
+        self._bodies: "OrderedDict[Hashable, bytes]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._bodies)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        body = self._bodies.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._bodies.move_to_end(key)
+        return body
+
+    def put(self, key: Hashable, body: bytes) -> None:
+        if len(body) > self.max_bytes or self.max_entries <= 0:
+            return
+        previous = self._bodies.pop(key, None)
+        if previous is not None:
+            self.size_bytes -= len(previous)
+        self._bodies[key] = body
+        self.size_bytes += len(body)
+        while len(self._bodies) > self.max_entries or self.size_bytes > self.max_bytes:
+            _, evicted = self._bodies.popitem(last=False)
+            self.size_bytes -= len(evicted)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._bodies.clear()
+        self.size_bytes = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            "entries": len(self._bodies),
+            "size_bytes": self.size_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
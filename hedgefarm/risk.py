@@ -1,12 +1,260 @@
+"""Исторический и фильтрованный VaR для контроля резерва капитала."""
+
+import math
+import threading
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Dict, Optional, Tuple
 
-"""Very simplified stress-VaR to check capital reserve."""
 import numpy as np
-from .utils import load_cfg
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.signal import lfilter
+from scipy.special import ndtri
+
+from .config import PricingParams, get_params
+from .models import RiskMetrics
+from .sketch import TDigest
+
+TRADING_DAYS = 252
+
+
+def log_returns(prices) -> np.ndarray:
+    """Дневные логарифмические доходности ряда цен."""
+    prices = np.asarray(prices, dtype=float)
+    return np.diff(np.log(prices))
+
+
+def rolling_var(returns, window: int, alpha: float = 0.99) -> np.ndarray:
+    """
+    Исторический VaR (потеря как положительная доля) по скользящему окну.
+
+    Окна строятся без копирования через sliding_window_view; результат
+    имеет длину len(returns) - window + 1, последний элемент - текущее окно.
+    """
+    windows = sliding_window_view(np.asarray(returns, dtype=float), window)
+    return -np.quantile(windows, 1.0 - alpha, axis=-1)
+
+
+def rolling_expected_shortfall(returns, window: int, alpha: float = 0.99) -> np.ndarray:
+    """Expected shortfall: средняя потеря в худших (1 - alpha) наблюдениях окна."""
+    windows = sliding_window_view(np.asarray(returns, dtype=float), window)
+    # Допуск защищает от ошибки округления: (1 - 0.97) * 100 = 3.0000000000000027
+    tail = max(int(math.ceil((1.0 - alpha) * window - 1e-9)), 1)
+    worst = np.partition(windows, tail - 1, axis=-1)[..., :tail]
+    return -worst.mean(axis=-1)
+
+
+def ewma_variance(returns, lam: float = 0.94) -> np.ndarray:
+    """
+    Прогноз дисперсии RiskMetrics: v[t] = lam * v[t-1] + (1 - lam) * r[t]^2.
+
+    v[t] - прогноз на день t + 1 по данным до t включительно. Рекурсия
+    считается линейным фильтром, без цикла Python.
+    """
+    r2 = np.asarray(returns, dtype=float) ** 2
+    seed = r2[:min(len(r2), 30)].mean()
+    variance, _ = lfilter([1.0 - lam], [1.0, -lam], r2, zi=[lam * seed])
+    return variance
+
+
+def filtered_var(returns, window: int, alpha: float = 0.99, lam: float = 0.94) -> np.ndarray:
+    """
+    Фильтрованная историческая симуляция (FHS).
+
+    Доходности нормируются на EWMA-волатильность своего дня, квантиль
+    нормированных доходностей окна масштабируется текущим прогнозом.
+    """
+    returns = np.asarray(returns, dtype=float)
+    variance = ewma_variance(returns, lam)
+    # Доходность дня t нормируется прогнозом, сделанным накануне
+    prior = np.concatenate([[variance[0]], variance[:-1]])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        standardized = np.where(prior > 0, returns / np.sqrt(prior), 0.0)
+    quantiles = np.quantile(sliding_window_view(standardized, window), 1.0 - alpha, axis=-1)
+    return -quantiles * np.sqrt(variance[window - 1:])
+
+
+@dataclass(frozen=True)
+class VaRReport:
+    """Однодневные риск-метрики в долях цены."""
+    alpha: float
+    window: int
+    observations: int
+    historical_var: float
+    filtered_var: float
+    expected_shortfall: float
+    ewma_volatility: float
+    method: str  # "historical" или "parametric", если истории недостаточно
+    sketch_var: float = 0.0  # VaR по всей истории доходностей (t-digest), 0 - мало данных
+
+    @property
+    def var_pct(self) -> float:
+        """Консервативная оценка: максимум исторического, фильтрованного и долгосрочного VaR."""
+        return max(self.historical_var, self.filtered_var, self.sketch_var)
+
+
+def parametric_report(annual_volatility: float, alpha: float, window: int, observations: int = 0) -> VaRReport:
+    """Нормальный VaR по годовой волатильности - пока истории меньше окна."""
+    daily = annual_volatility / math.sqrt(TRADING_DAYS)
+    z = float(ndtri(alpha))
+    es = daily * math.exp(-0.5 * z * z) / math.sqrt(2.0 * math.pi) / (1.0 - alpha)
+    return VaRReport(alpha, window, observations, daily * z, daily * z, es, daily, "parametric")
+
+
+def var_report(prices, window: int, alpha: float = 0.99, lam: float = 0.94,
+               fallback_volatility: Optional[float] = None) -> VaRReport:
+    """Метрики по последнему окну ряда цен."""
+    returns = log_returns(prices) if len(prices) > 1 else np.empty(0)
+    if len(returns) < window:
+        if fallback_volatility is None:
+            raise ValueError(f"Need at least {window + 1} prices, got {len(prices)}")
+        return parametric_report(fallback_volatility, alpha, window, len(returns))
+
+    tail = returns[-(window + TRADING_DAYS):]
+    return VaRReport(
+        alpha=alpha,
+        window=window,
+        observations=len(returns),
+        historical_var=float(rolling_var(tail[-window:], window, alpha)[-1]),
+        filtered_var=float(filtered_var(tail, window, alpha, lam)[-1]),
+        expected_shortfall=float(rolling_expected_shortfall(tail[-window:], window, alpha)[-1]),
+        ewma_volatility=float(np.sqrt(ewma_variance(tail, lam)[-1])),
+        method="historical"
+    )
+
+
+class RiskEngine:
+    """
+    Дневная история цен фьючерса и кэшированный VaR-отчет.
+
+    Цены записываются из каждого снапшота (последняя цена дня заменяет
+    предыдущую), отчет пересчитывается лениво один раз после изменения
+    истории или параметров. Проверка котировки - арифметика над готовым
+    отчетом и не добавляет заметной задержки к /price.
+
+    Кроме окна из max_days цен движок ведет t-digest всех закрытых дневных
+    доходностей: хвостовой квантиль по всей истории доступен в любой момент
+    без хранения и сортировки сырых данных. Доходность дня попадает в
+    дайджест, когда наступает следующий день и цена закрытия фиксируется.
+    Дайджесты воркеров объединяются через digest_state/merge_digest.
+    """
+
+    def __init__(self, max_days: int = 4 * TRADING_DAYS, compression: float = 200.0):
+        self.max_days = max_days
+        self.compression = compression
+        self._lock = threading.Lock()
+        self._days: list = []
+        self._prices: list = []
+        self._digest = TDigest(compression)
+        self._digested_day: Optional[int] = None
+        self._volatility: Optional[float] = None
+        self._report: Optional[VaRReport] = None
+        self._report_key: Optional[Tuple] = None
+        self._revision = 0
+
+    def load_history(self, days, prices) -> None:
+        """Заменяет историю дневными ценами закрытия (даты по возрастанию)."""
+        with self._lock:
+            self._days = [d.toordinal() if isinstance(d, date) else int(d) for d in days][-self.max_days:]
+            self._prices = [float(p) for p in prices][-self.max_days:]
+            # Полная история целиком, до обрезки окна, уходит в дайджест
+            self._digest = TDigest(self.compression)
+            all_prices = np.asarray(prices, dtype=float)
+            if len(all_prices) > 1:
+                self._digest.update_many(log_returns(all_prices))
+            self._digested_day = self._days[-1] if self._days else None
+            self._revision += 1
+
+    def record(self, price: float, day: date, volatility: Optional[float] = None) -> None:
+        """Записывает цену дня; повторная запись за тот же день ее обновляет."""
+        ordinal = day.toordinal()
+        price = float(price)
+        with self._lock:
+            changed = False
+            if self._days and self._days[-1] == ordinal:
+                changed = self._prices[-1] != price
+                self._prices[-1] = price
+            elif not self._days or ordinal > self._days[-1]:
+                self._digest_last_close()
+                self._days.append(ordinal)
+                self._prices.append(price)
+                if len(self._days) > self.max_days:
+                    del self._days[0], self._prices[0]
+                changed = True
+            if volatility is not None and volatility != self._volatility:
+                self._volatility = float(volatility)
+                changed = True
+            # Отчет пересчитывается только при реальном изменении входных данных
+            if changed:
+                self._revision += 1
+
+    def _digest_last_close(self) -> None:
+        """Отправляет в дайджест доходность последнего дня: его цена закрыта."""
+        if len(self._days) < 2 or (self._digested_day is not None and self._days[-1] <= self._digested_day):
+            return
+        self._digest.update(math.log(self._prices[-1] / self._prices[-2]))
+        self._digested_day = self._days[-1]
+
+    def digest_state(self) -> Dict:
+        """Состояние дайджеста доходностей для передачи другому воркеру."""
+        with self._lock:
+            return self._digest.to_dict()
+
+    def merge_digest(self, state: Dict) -> None:
+        """Вливает дайджест доходностей другого воркера."""
+        other = TDigest.from_dict(state)
+        with self._lock:
+            self._digest.merge(other)
+            self._revision += 1
+
+    def report(self, params: Optional[PricingParams] = None) -> VaRReport:
+        """Текущий VaR-отчет (пересчитывается, только если история изменилась)."""
+        params = params or get_params()
+        risk = params.risk
+        window = int(risk.var_window)
+        key = (self._revision, params.version, window)
+        report = self._report
+        if report is not None and self._report_key == key:
+            return report
+        with self._lock:
+            prices = np.array(self._prices)
+            volatility = self._volatility
+            # Долгосрочный квантиль учитывается, когда наблюдений не меньше окна
+            sketch_var = -self._digest.quantile(1.0 - risk.var_alpha) if len(self._digest) >= window else 0.0
+        report = var_report(prices, window, risk.var_alpha, risk.ewma_lambda,
+                            fallback_volatility=volatility if volatility is not None else 0.25)
+        report = replace(report, sketch_var=max(sketch_var, 0.0))
+        self._report, self._report_key = report, key
+        return report
+
+    def capital_factors(self, params: Optional[PricingParams] = None) -> Tuple[float, float]:
+        """
+        VaR и капитал на рубль экспозиции на горизонте horizon_days.
+
+        Капитал берется по большему из VaR и ES (правило корня из времени).
+        """
+        params = params or get_params()
+        report = self.report(params)
+        horizon = math.sqrt(params.risk.horizon_days)
+        var_factor = report.var_pct * horizon
+        return var_factor, max(var_factor, report.expected_shortfall * horizon)
 
-cfg = load_cfg()
-_RESERVE = cfg["risk"]["capital_reserve"]
+    def assess(self, volume: float, price_per_ton: float,
+               params: Optional[PricingParams] = None) -> Tuple[RiskMetrics, bool]:
+        """
+        Капитал под котировку и признак того, что он укладывается в резерв.
 
-def check(price_series):
-    var99 = np.percentile(price_series, 1)
-    required = abs(price_series[-1] - var99) * 1000
-    return required <= _RESERVE
+        capital_required - VaR позиции на горизонте horizon_days (правило
+        корня из времени), risk_surcharge - стоимость капитала в руб/кг.
+        """
+        params = params or get_params()
+        var_factor, capital_factor = self.capital_factors(params)
+        exposure = volume * price_per_ton
+        var_99 = exposure * var_factor
+        capital_required = exposure * capital_factor
+        metrics = RiskMetrics(
+            var_99=var_99,
+            capital_required=capital_required,
+            risk_surcharge=params.risk.alpha_capital * capital_required / (volume * 1000.0)
+        )
+        return metrics, capital_required <= params.risk.capital_reserve
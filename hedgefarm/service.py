@@ -1,29 +1,415 @@
 """FastAPI сервис для расчета минимальной гарантированной цены."""
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from typing import Optional
+from pydantic import ValidationError
+from starlette.background import BackgroundTask
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import functools
+import json
 import logging
 import os
+import time
+import uuid
 
-from .models import QuoteOut, QuoteRequest
-from .datasources import MOEXClient
-from .pricing.aggregator import calculate_all_prices, get_detailed_comparison
-from .risk import check as risk_check
+from .models import IssuedQuote, QuoteOut, QuoteRequest
+from .batcher import MicroBatcher
+from .datasources import AsyncMOEXClient
+from .cache import SnapshotCache
+from .snapshots import MarketDataPoller, MarketSnapshot, SnapshotStore
+from .config import get_params
+from .history import HistoryStore, to_ordinals
+from .ledger import CapitalLedger, LedgerEntry
+from .pricing.curve import term_options
+from .pricing.greeks import BookPosition, GreeksBook, chain_greeks, greeks_to_dict, ladder_greeks
+from .pricing.grid import GridCache, PricingGrid
+from .pricing.ladder import LadderCache
+from .pricing.montecarlo import simulate_distribution
+from .pricing.pipeline import PricingPipeline
+from .responses import ResponseCache, etag_matches, make_etag
+from .risk import RiskEngine
+from .shared import SnapshotSegment, segment_path
+from .stream import QuoteBroadcaster
+from .utils import project_path
+from .volatility import RollingVolatility
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Клиент для получения данных с MOEX (общий пул соединений, автоматы эндпоинтов)
+moex_client = AsyncMOEXClient.from_params(get_params().circuit_breaker)
+
+
+async def _fetch_market_data(symbol: str):
+    """Запрашивает рыночные данные у текущего клиента MOEX."""
+    return await moex_client.get_market_data(symbol)
+
+
+# Хранилище снапшотов, которое наполняет фоновый опрос биржи
+_market_cfg = get_params().market_data
+market_store = SnapshotStore()
+
+# Кэш снапшотов: одновременные запросы разделяют один запрос к бирже
+market_cache = SnapshotCache(
+    _fetch_market_data,
+    ttl=_market_cfg.cache_ttl_s,
+    stale_ttl=_market_cfg.stale_ttl_s,
+    store=market_store
+)
+
+market_poller = MarketDataPoller(
+    market_cache.refresh,
+    symbols=["WHEAT"],
+    interval=_market_cfg.poll_interval_s
+)
+MAX_SNAPSHOT_AGE_S = _market_cfg.max_snapshot_age_s
+
+# Каталог сегментов разделяемой памяти: если задан, ISS опрашивает только
+# процесс hedgefarm.ingest, а воркеры читают его снапшоты
+_shared_cfg = get_params().shared_snapshot
+shared_root: Optional[Path] = project_path(_shared_cfg.path) if _shared_cfg.path else None
+_shared_segments: Dict[str, SnapshotSegment] = {}
+# Время публикации последнего перенесенного снапшота по символам
+_shared_published: Dict[str, float] = {}
+
+
+def _shared_fetched_at(published_at: float) -> float:
+    """Момент получения по time.monotonic(): возраст считается от публикации в процессе загрузки."""
+    return time.monotonic() - max(time.time() - published_at, 0.0)
+
+
+def sync_shared_snapshot(symbol: str) -> None:
+    """
+    Переносит в market_store новую версию снапшота из разделяемой памяти.
+
+    Проверка версии - чтение заголовка сегмента; данные копируются и
+    разбираются только при смене версии. Снапшот публикуется с версией
+    процесса загрузки, поэтому все воркеры считают по одной версии. Если
+    процесс загрузки подтвердил ту же версию новым опросом, у снапшота
+    обновляется только возраст.
+    """
+    segment = _shared_segments.get(symbol)
+    if segment is None:
+        try:
+            segment = _shared_segments[symbol] = SnapshotSegment.open(segment_path(shared_root, symbol))
+        except (OSError, ValueError):
+            # Процесс загрузки еще не создал сегмент
+            return
+    version = segment.version()
+    if not version:
+        return
+    latest = market_store.latest(symbol)
+    if latest is not None and latest.version == version:
+        published_at = segment.published_at()
+        if published_at > _shared_published.get(symbol, 0.0):
+            _shared_published[symbol] = published_at
+            market_store.publish(symbol, latest.market_data, version=version,
+                                 fetched_at=_shared_fetched_at(published_at))
+        return
+    result = segment.read()
+    if result is None:
+        return
+    version, published_at, market_data = result
+    _shared_published[symbol] = published_at
+    market_store.publish(symbol, market_data, version=version, fetched_at=_shared_fetched_at(published_at))
+
+
+# Оптимизированные лестницы по (снапшот, срок), общие для сетки и расчета
+ladder_cache = LadderCache()
+
+# Сетка MGP срок x объем; строится в пуле потоков после публикации снапшота
+pricing_grid = GridCache(ladders=ladder_cache)
+
+
+def get_grid(snapshot: MarketSnapshot) -> PricingGrid:
+    """Возвращает сетку для снапшота (перестраивает при смене версии). Блокирует: вне event loop."""
+    return pricing_grid.get(snapshot.market_data, snapshot.version, get_params())
+
+
+# Мемоизированный расчет: /price и /price/detailed читают один и тот же результат
+pricing_pipeline = PricingPipeline(ladders=ladder_cache)
+
+
+def quote_for(snapshot: MarketSnapshot, volume: int, term_months: int) -> QuoteOut:
+    """Котировка по снапшоту: точка сетки или полный расчет, с флагом устаревания."""
+    # Точки готовой сетки отдаются за O(1); пока сетка версии строится,
+    # котировка считается одним проходом конвейера
+    grid = pricing_grid.peek(snapshot.version, get_params())
+    result = grid.lookup(volume, term_months) if grid is not None else None
+    if result is None:
+        result = pricing_pipeline.get(snapshot.version, snapshot.market_data, volume, term_months).to_quote()
+    if market_cache.is_stale(snapshot):
+        # Котировки сетки общие для запросов: флаг ставится на копии
+        result = result.model_copy(update={"stale": True})
+    return result
+
+
+def quote_batch(items: List[Tuple[MarketSnapshot, int, int]]) -> List[Any]:
+    """
+    Котировки пакета (снапшот, объем, срок) из MicroBatcher.
+    
+    MGP не зависит от объема, поэтому расчет выполняется один раз на
+    (версия снапшота, срок), остальные запросы получают копию со своим
+    объемом. Ошибка расчета возвращается только запросам своего срока.
+    """
+    by_term: Dict[Tuple[int, int], Any] = {}
+    results: List[Any] = []
+    for snapshot, volume, term_months in items:
+        key = (snapshot.version, term_months)
+        base = by_term.get(key)
+        if base is None:
+            try:
+                base = quote_for(snapshot, volume, term_months)
+            except Exception as e:
+                base = e
+            by_term[key] = base
+        if isinstance(base, Exception) or base.volume_t == volume:
+            results.append(base)
+        else:
+            results.append(base.model_copy(update={"volume_t": volume}))
+    return results
+
+
+# Готовые тела ответов /price и /price/detailed по (эндпоинт, параметры, ETag)
+_response_cfg = get_params().response_cache
+response_cache = ResponseCache(max_entries=_response_cfg.max_entries, max_bytes=_response_cfg.max_bytes)
+
+
+async def _cached_json(key: Tuple, snapshot: MarketSnapshot, if_none_match: Optional[str], render) -> Response:
+    """
+    Ответ с ETag по версиям снапшота и конфигурации.
+    
+    При совпадении If-None-Match возвращается 304 без тела; иначе тело
+    берется из response_cache или строится корутиной render (bytes).
+    """
+    etag = make_etag(snapshot.version, get_params().version, market_cache.is_stale(snapshot))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    key = key + (etag,)
+    body = response_cache.get(key)
+    if body is None:
+        body = await render()
+        response_cache.put(key, body)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Пакетирование одновременных /price (включается batching.enabled)
+_batching_cfg = get_params().batching
+price_batcher = MicroBatcher(quote_batch, max_batch=_batching_cfg.max_batch,
+                             max_wait=_batching_cfg.max_wait_ms / 1000.0)
+
+# Подписчики /price/stream: котировка считается раз на (объем, срок) за версию
+quote_stream = QuoteBroadcaster(quote_for)
+STREAM_KEEPALIVE_S = 15.0
+
+
+def _grid_built(snapshot: MarketSnapshot, future: asyncio.Future) -> None:
+    """Рассылает котировки снапшота, когда его сетка построена (в event loop)."""
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        logger.warning(f"Price grid build failed for v{snapshot.version}: {future.exception()}")
+    latest = market_store.latest(snapshot.symbol)
+    if latest is None or latest.version == snapshot.version:
+        quote_stream.publish(snapshot)
+
+
+def schedule_grid(snapshot: MarketSnapshot) -> None:
+    """
+    Строит сетку нового снапшота в пуле потоков, не блокируя публикацию.
+    
+    Подписчики /price/stream получают котировки после сборки сетки;
+    устаревшие к этому моменту версии не рассылаются. Без запущенного
+    event loop сетка строится лениво, по запросу /price/grid.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    future = loop.run_in_executor(None, get_grid, snapshot)
+    future.add_done_callback(lambda done: _grid_built(snapshot, done))
+
+
+market_store.add_listener(schedule_grid)
+
+# Книга выданных гарантий для риск-отчетов по грекам
+quote_book = GreeksBook()
+
+# Дневная история цены фьючерса и VaR для проверки резерва капитала
+risk_engine = RiskEngine()
+
+
+def record_risk_price(snapshot: MarketSnapshot) -> None:
+    """Записывает цену снапшота в дневную историю риск-движка."""
+    market_data = snapshot.market_data
+    risk_engine.record(market_data.futures_quote.price, snapshot.created_at.date(), market_data.volatility)
+
+
+market_store.add_listener(record_risk_price)
+
+
+# Книга гарантий с резервированием капитала; снапшот на диске для восстановления
+capital_ledger = CapitalLedger()
+
+
+def _ledger_path(params=None) -> Path:
+    return project_path((params or get_params()).ledger.path)
+
+
+# Дневные свечи ISS на диске: теплый старт риск-движка без запросов к бирже
+history_store = HistoryStore(project_path(get_params().history.path))
+HISTORY_SECID = "WHEAT"
+
+
+def load_risk_history(params=None) -> int:
+    """
+    Загружает сохраненные свечи в риск-движок и оценку волатильности;
+    возвращает число дней.
+
+    Оценка строится заново по хвосту из window + 1 баров и подменяет
+    демо-волатильность в рыночных данных клиента MOEX.
+    """
+    cfg = (params or get_params()).volatility
+    history = history_store.load(HISTORY_SECID)
+    if len(history):
+        risk_engine.load_history(to_ordinals(history.day), history.close)
+        moex_client.volatility[HISTORY_SECID] = RollingVolatility.from_history(history, cfg.window, cfg.estimator)
+    return len(history)
+
+
+async def _sync_history(lookback_days: int) -> None:
+    """Догружает хвост истории свечей и обновляет риск-движок."""
+    try:
+        if await history_store.sync(moex_client, HISTORY_SECID, lookback_days):
+            load_risk_history()
+    except Exception as e:
+        logger.warning(f"History sync failed: {e}")
+
+
+def pretrade_check(volume: int, price_per_ton: float, params=None) -> Tuple[float, bool]:
+    """
+    Предельный капитал котировки с учетом книги и признак того, что книга
+    останется в пределах risk.capital_reserve. O(1): без обхода книги.
+    """
+    params = params or get_params()
+    _, capital_factor = risk_engine.capital_factors(params)
+    marginal = capital_ledger.marginal_capital(volume * price_per_ton, capital_factor)
+    after = capital_ledger.book_capital(capital_factor) + marginal
+    return marginal, after <= params.risk.capital_reserve or marginal <= 0
+
+
+def check_capital(snapshot: MarketSnapshot, volume: int, params=None) -> None:
+    """Отклоняет котировку, если с ней капитал книги превысит risk.capital_reserve."""
+    marginal, within_reserve = pretrade_check(volume, snapshot.market_data.futures_quote.price, params)
+    if not within_reserve:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Капитал книги с котировкой (+{marginal:.0f} руб) превышает резерв"
+        )
+
+
+def _add_to_book(entry: LedgerEntry) -> None:
+    """Выданная гарантия-пол в книге греков - проданный PUT."""
+    quote_book.add(BookPosition(entry.quote_id, entry.strike, entry.expires_at, -entry.volume_t))
+
+
+async def _ledger_snapshots(interval: float) -> None:
+    """Периодически снимает истекшие гарантии и сохраняет книгу на диск."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            capital_ledger.expire()
+            for quote_id in [position_id for position_id in quote_book.position_ids() if position_id not in capital_ledger]:
+                quote_book.remove(quote_id)
+            await asyncio.get_running_loop().run_in_executor(None, capital_ledger.save, _ledger_path())
+        except Exception as e:
+            logger.warning(f"Ledger snapshot failed: {e}")
+
+
+async def _watch_shared_snapshot(symbol: str, interval: float) -> None:
+    """Переносит новые версии из разделяемой памяти и без входящих запросов (для /price/stream)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            sync_shared_snapshot(symbol)
+        except Exception as e:
+            logger.warning(f"Shared snapshot sync failed: {e}")
+
+
+async def get_snapshot(symbol: str) -> MarketSnapshot:
+    """
+    Возвращает последний опубликованный снапшот.
+    
+    При работающем опросе запрос к бирже на пути обработки не выполняется;
+    кэш используется только до публикации первого снапшота. Пока биржа
+    недоступна, остается последний успешный снапшот; без него - 503.
+    С разделяемой памятью снапшот берется только из нее.
+    """
+    if shared_root is not None:
+        sync_shared_snapshot(symbol)
+        snapshot = market_store.latest(symbol)
+        if snapshot is None:
+            raise HTTPException(status_code=503, detail="Нет снапшота рыночных данных в разделяемой памяти")
+        return snapshot
+    snapshot = market_store.latest(symbol)
+    if snapshot is None:
+        try:
+            snapshot = await market_cache.get(symbol)
+        except Exception as e:
+            logger.warning(f"No market snapshot for {symbol}: {e}")
+            raise HTTPException(status_code=503, detail=f"Нет рыночных данных: {e}")
+    return snapshot
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Управляет ресурсами приложения на старте и остановке."""
+    params = get_params()
+    restored = capital_ledger.load(_ledger_path(params))
+    for entry in capital_ledger.entries():
+        _add_to_book(entry)
+    if restored:
+        logger.info(f"Restored {restored} issued quotes from the ledger snapshot")
+    days = load_risk_history(params)
+    if days:
+        logger.info(f"Loaded {days} days of {HISTORY_SECID} candles from {history_store.root}")
+    tasks = [asyncio.create_task(_ledger_snapshots(params.ledger.snapshot_interval_s))]
+    if shared_root is None:
+        tasks.append(asyncio.create_task(_sync_history(params.history.lookback_days)))
+        market_poller.start()
+    else:
+        # ISS опрашивает и историю догружает процесс hedgefarm.ingest
+        logger.info(f"Reading market snapshots from shared memory in {shared_root}")
+        tasks.append(asyncio.create_task(_watch_shared_snapshot("WHEAT", params.market_data.poll_interval_s)))
+    yield
+    await market_poller.stop()
+    for task in tasks:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    capital_ledger.save(_ledger_path())
+    await moex_client.aclose()
+
+
 # Создание FastAPI приложения
 app = FastAPI(
     title="HedgeFarm Pricer API",
     description="API для расчета минимальной гарантированной цены при хеджировании сельхозпродуктов",
     version="0.1.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Настройка CORS
@@ -40,9 +426,6 @@ static_dir = os.path.join(os.path.dirname(__file__), "static")
 if os.path.exists(static_dir):
     app.mount("/static", StaticFiles(directory=static_dir), name="static")
 
-# Клиент для получения данных с MOEX
-moex_client = MOEXClient()
-
 
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
@@ -64,41 +447,61 @@ async def root():
         "endpoints": {
             "price": "/price - Основной расчет цены",
             "health": "/health - Проверка состояния сервиса",
-            "detailed": "/price/detailed - Детальный анализ"
+            "detailed": "/price/detailed - Детальный анализ",
+            "batch": "/price/batch - Пакетный расчет (JSON-массив или NDJSON)",
+            "grid": "/price/grid - Таблица MGP срок x объем",
+            "stream": "/price/stream - Поток котировок при смене снапшота (SSE)",
+            "greeks": "/price/greeks - Греки цепочки опционов и лестницы",
+            "distribution": "/price/distribution - Распределение реализованной цены (Монте-Карло)",
+            "book_greeks": "/risk/greeks - Греки книги выданных гарантий",
+            "quotes": "/quotes - Выдача гарантии с резервированием капитала",
+            "book": "/risk/book - Экспозиция и капитал книги"
         }
     }
 
 
 @app.get("/health", summary="Проверка здоровья сервиса")
 async def health_check():
-    """Проверка состояния сервиса и подключения к источникам данных."""
-    try:
-        # Проверяем подключение к MOEX
-        test_price = moex_client.get_last_price("WHEAT")
-        
-        return {
-            "status": "healthy",
-            "moex_connection": "ok",
-            "test_wheat_price": test_price,
-            "timestamp": "2024-01-01T00:00:00Z"
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
+    """Проверка состояния сервиса по возрасту последнего снапшота рыночных данных."""
+    if shared_root is not None:
+        sync_shared_snapshot("WHEAT")
+    snapshot = market_store.latest("WHEAT")
+    timestamp = datetime.utcnow().isoformat() + "Z"
+    
+    if snapshot is None or snapshot.age > MAX_SNAPSHOT_AGE_S:
         return JSONResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
-                "error": str(e),
-                "timestamp": "2024-01-01T00:00:00Z"
+                "error": "No market snapshot" if snapshot is None else "Market snapshot is too old",
+                "snapshot_age_s": None if snapshot is None else snapshot.age,
+                "poller_running": market_poller.running,
+                "timestamp": timestamp
             }
         )
+    
+    return {
+        "status": "healthy",
+        "snapshot_version": snapshot.version,
+        "snapshot_age_s": snapshot.age,
+        "poller_running": market_poller.running,
+        "stale": market_cache.is_stale(snapshot),
+        "market_cache": market_cache.stats.as_dict(),
+        "circuit_breakers": {url: breaker.as_dict() for url, breaker in moex_client.breakers.items()},
+        "price_batcher": price_batcher.stats.as_dict(),
+        "response_cache": response_cache.as_dict(),
+        "quote_stream": {"subscribers": quote_stream.subscribers, "groups": quote_stream.groups,
+                         **quote_stream.stats.as_dict()},
+        "timestamp": timestamp
+    }
 
 
 @app.get("/price", response_model=QuoteOut, summary="Расчет минимальной гарантированной цены")
 async def get_price(
     culture: str = Query(default="wheat", description="Культура для хеджирования"),
     volume: int = Query(gt=0, description="Объем в тоннах"),
-    term_months: int = Query(default=6, ge=1, le=12, description="Срок в месяцах")
+    term_months: int = Query(default=6, ge=1, le=12, description="Срок в месяцах"),
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
     Основной эндпоинт для расчета минимальной гарантированной цены.
@@ -108,7 +511,8 @@ async def get_price(
     - PUT опционы  
     - Форвардные контракты
     
-    И рекомендацию по оптимальному инструменту.
+    И рекомендацию по оптимальному инструменту. Ответ несет ETag по
+    версиям снапшота и конфигурации; If-None-Match с ним дает 304.
     """
     try:
         # Валидация входных параметров
@@ -126,13 +530,18 @@ async def get_price(
         
         # Получение рыночных данных
         logger.info(f"Fetching market data for {culture}, volume: {volume}t, term: {term_months}m")
-        market_data = moex_client.get_market_data(culture.upper())
+        snapshot = await get_snapshot(culture.upper())
+        check_capital(snapshot, volume)
         
-        # Расчет цен для всех инструментов
-        result = calculate_all_prices(market_data, volume, term_months)
+        async def render() -> bytes:
+            if get_params().batching.enabled:
+                result = await price_batcher.submit((snapshot, volume, term_months))
+            else:
+                result = quote_for(snapshot, volume, term_months)
+            logger.info(f"Price calculation completed. Recommended: {result.recommended}")
+            return result.model_dump_json().encode("utf-8")
         
-        logger.info(f"Price calculation completed. Recommended: {result.recommended}")
-        return result
+        return await _cached_json(("price", volume, term_months), snapshot, if_none_match, render)
         
     except HTTPException:
         raise
@@ -144,11 +553,54 @@ async def get_price(
         )
 
 
+async def _quote_events(subscription) -> AsyncIterator[bytes]:
+    """События подписчика; при долгом отсутствии тиков - комментарий keepalive."""
+    try:
+        while True:
+            try:
+                yield await asyncio.wait_for(subscription.get(), STREAM_KEEPALIVE_S)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+    finally:
+        quote_stream.unsubscribe(subscription)
+
+
+@app.get("/price/stream", summary="Поток котировок MGP (Server-Sent Events)")
+async def stream_price(
+    culture: str = Query(default="wheat", description="Культура для хеджирования"),
+    volume: int = Query(gt=0, description="Объем в тоннах"),
+    term_months: int = Query(default=6, ge=1, le=12, description="Срок в месяцах")
+):
+    """
+    Поток QuoteOut в формате text/event-stream.
+    
+    Первое событие - котировка текущего снапшота, далее по событию на
+    каждую новую версию снапшота (id события - версия). Котировка
+    считается один раз на (объем, срок) для всех подписчиков; медленный
+    клиент пропускает промежуточные версии и получает последнюю.
+    """
+    if culture.lower() != "wheat":
+        raise HTTPException(
+            status_code=400,
+            detail="В настоящий момент поддерживается только пшеница (wheat)"
+        )
+    snapshot = await get_snapshot(culture.upper())
+    subscription = quote_stream.subscribe(volume, term_months, snapshot)
+    return StreamingResponse(
+        _quote_events(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Генератор может не начаться, если клиент отключился сразу
+        background=BackgroundTask(quote_stream.unsubscribe, subscription)
+    )
+
+
 @app.get("/price/detailed", summary="Детальный анализ стратегий хеджирования")
 async def get_detailed_price(
     culture: str = Query(default="wheat", description="Культура для хеджирования"),
     volume: int = Query(gt=0, description="Объем в тоннах"),
-    term_months: int = Query(default=6, ge=1, le=12, description="Срок в месяцах")
+    term_months: int = Query(default=6, ge=1, le=12, description="Срок в месяцах"),
+    if_none_match: Optional[str] = Header(default=None)
 ):
     """
     Детальный анализ всех стратегий хеджирования с метриками по каждому инструменту.
@@ -167,12 +619,14 @@ async def get_detailed_price(
             )
         
         # Получение рыночных данных
-        market_data = moex_client.get_market_data(culture.upper())
+        snapshot = await get_snapshot(culture.upper())
         
-        # Детальный анализ
-        detailed_result = get_detailed_comparison(market_data, volume, term_months)
+        async def render() -> bytes:
+            # Детальный анализ - представление общего результата расчета
+            result = pricing_pipeline.get(snapshot.version, snapshot.market_data, volume, term_months)
+            return JSONResponse(jsonable_encoder(result.to_detailed())).body
         
-        return detailed_result
+        return await _cached_json(("detailed", volume, term_months), snapshot, if_none_match, render)
         
     except HTTPException:
         raise
@@ -184,6 +638,221 @@ async def get_detailed_price(
         )
 
 
+@app.get("/price/grid", summary="Таблица MGP по срокам и объемам")
+async def get_price_grid(
+    culture: str = Query(default="wheat", description="Культура для хеджирования")
+):
+    """
+    Вся предрасчитанная сетка MGP (сроки 1-12 x типовые объемы) по текущему снапшоту.
+    
+    Позволяет фронтенду отрисовать слайдер без отдельных запросов на каждую точку.
+    """
+    if culture.lower() != "wheat":
+        raise HTTPException(
+            status_code=400,
+            detail="В настоящий момент поддерживается только пшеница (wheat)"
+        )
+    
+    try:
+        snapshot = await get_snapshot(culture.upper())
+        grid = await asyncio.get_running_loop().run_in_executor(None, get_grid, snapshot)
+        return grid.to_dict()
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Price grid error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при расчете сетки: {str(e)}"
+        )
+
+
+@app.get("/price/distribution", summary="Распределение реализованной цены по стратегиям")
+async def get_price_distribution(
+    culture: str = Query(default="wheat", description="Культура для хеджирования"),
+    volume: int = Query(gt=0, description="Объем в тоннах"),
+    term_months: int = Query(default=6, ge=1, le=12, description="Срок в месяцах"),
+    n_paths: int = Query(default=100_000, ge=1_000, le=1_000_000, description="Число путей"),
+    seed: Optional[int] = Query(default=None, description="Seed для воспроизводимости")
+):
+    """
+    Квантили и среднее реализованной цены (руб/кг) для фьючерса, PUT,
+    лестницы, форварда и продажи без хеджа.
+    
+    Симуляция выполняется в пуле потоков, чтобы не блокировать event loop.
+    """
+    if culture.lower() != "wheat":
+        raise HTTPException(
+            status_code=400,
+            detail="В настоящий момент поддерживается только пшеница (wheat)"
+        )
+    
+    try:
+        snapshot = await get_snapshot(culture.upper())
+        params = get_params()
+        result = pricing_pipeline.get(snapshot.version, snapshot.market_data, volume, term_months, params)
+        distribution = await asyncio.get_running_loop().run_in_executor(
+            None, functools.partial(simulate_distribution, result, n_paths, seed=seed, params=params)
+        )
+        return {
+            "snapshot_version": snapshot.version,
+            "volume_t": volume,
+            "term_m": term_months,
+            "n_paths": n_paths,
+            "recommended": result.recommended,
+            "strategies": distribution
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Distribution simulation error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при моделировании распределения: {str(e)}"
+        )
+
+
+@app.get("/price/greeks", summary="Греки цепочки опционов и лестницы")
+async def get_price_greeks(
+    culture: str = Query(default="wheat", description="Культура для хеджирования"),
+    term_months: int = Query(default=6, ge=1, le=12, description="Срок в месяцах")
+):
+    """
+    Премия, delta, gamma, vega, theta и rho для каждого страйка цепочки
+    и для взвешенной лестницы (на тонну).
+    """
+    if culture.lower() != "wheat":
+        raise HTTPException(
+            status_code=400,
+            detail="В настоящий момент поддерживается только пшеница (wheat)"
+        )
+    
+    try:
+        snapshot = await get_snapshot(culture.upper())
+        market_data = snapshot.market_data
+        futures_price = market_data.futures_quote.price
+        put_options = term_options(market_data, term_months)
+        values = chain_greeks(put_options, futures_price, term_months, market_data.volatility)
+        ladder = ladder_cache.get(snapshot.version, market_data, term_months, get_params())
+        return {
+            "snapshot_version": snapshot.version,
+            "term_months": term_months,
+            "strikes": put_options.strike.tolist(),
+            "chain": greeks_to_dict(values),
+            "ladder": ladder_greeks(ladder, futures_price, term_months, market_data.volatility)
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Greeks calculation error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при расчете греков: {str(e)}"
+        )
+
+
+@app.get("/risk/greeks", summary="Греки книги выданных гарантий")
+async def get_book_greeks(
+    culture: str = Query(default="wheat", description="Культура для хеджирования")
+):
+    """Суммарные греки книги по текущему снапшоту (пересчет одним векторным вызовом)."""
+    if culture.lower() != "wheat":
+        raise HTTPException(
+            status_code=400,
+            detail="В настоящий момент поддерживается только пшеница (wheat)"
+        )
+    
+    try:
+        snapshot = await get_snapshot(culture.upper())
+        market_data = snapshot.market_data
+        greeks = quote_book.greeks(market_data.futures_quote.price, market_data.volatility)
+        return {"snapshot_version": snapshot.version, **greeks}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Book greeks error: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Ошибка при расчете греков книги: {str(e)}"
+        )
+
+
+@app.get("/risk/book", summary="Экспозиция и капитал книги гарантий")
+async def get_risk_book():
+    """Агрегаты книги и использование резерва капитала."""
+    params = get_params()
+    report = risk_engine.report(params)
+    _, capital_factor = risk_engine.capital_factors(params)
+    book_capital = capital_ledger.book_capital(capital_factor)
+    return {
+        "quotes": len(capital_ledger),
+        "net_exposure": capital_ledger.net_exposure,
+        "gross_exposure": capital_ledger.gross_exposure,
+        "book_capital": book_capital,
+        "capital_reserve": params.risk.capital_reserve,
+        "utilization": book_capital / params.risk.capital_reserve,
+        "var_method": report.method,
+        "var_pct": report.var_pct,
+        "sketch_var": report.sketch_var
+    }
+
+
+@app.post("/quotes", response_model=IssuedQuote, summary="Выдача гарантии")
+async def issue_quote(request: QuoteRequest):
+    """
+    Выдает гарантию: считает котировку и атомарно резервирует под нее капитал.
+    
+    Если с новой гарантией капитал книги превысит резерв, возвращается 422.
+    """
+    try:
+        snapshot = await get_snapshot(request.culture.upper())
+        params = get_params()
+        market_data = snapshot.market_data
+        result = pricing_pipeline.get(snapshot.version, market_data, request.volume, request.term_months, params)
+        
+        now = datetime.utcnow()
+        entry = LedgerEntry(
+            quote_id=uuid.uuid4().hex,
+            volume_t=request.volume,
+            price_per_ton=market_data.futures_quote.price,
+            term_months=request.term_months,
+            strike=result.strike,
+            created_at=now,
+            expires_at=now + timedelta(days=round(request.term_months * 365 / 12))
+        )
+        _, capital_factor = risk_engine.capital_factors(params)
+        reservation = capital_ledger.reserve(entry, capital_factor, params.risk.capital_reserve)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Quote issue error: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при выдаче гарантии: {str(e)}")
+    
+    if not reservation.accepted:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Капитал книги с гарантией (+{reservation.marginal_capital:.0f} руб) превышает резерв"
+        )
+    _add_to_book(entry)
+    return IssuedQuote(
+        quote_id=entry.quote_id,
+        quote=result.to_quote(),
+        expires_at=entry.expires_at,
+        marginal_capital=reservation.marginal_capital,
+        book_capital=reservation.book_capital,
+        capital_reserve=reservation.capital_reserve
+    )
+
+
+@app.delete("/quotes/{quote_id}", summary="Отмена гарантии")
+async def release_quote(quote_id: str):
+    """Снимает гарантию с книги и освобождает ее капитал."""
+    if not capital_ledger.release(quote_id):
+        raise HTTPException(status_code=404, detail="Гарантия не найдена")
+    quote_book.remove(quote_id)
+    return {"quote_id": quote_id, "released": True}
+
+
 @app.post("/price", response_model=QuoteOut, summary="Расчет цены (POST)")
 async def post_price(request: QuoteRequest):
     """
@@ -193,10 +862,176 @@ async def post_price(request: QuoteRequest):
     return await get_price(
         culture=request.culture,
         volume=request.volume,
-        term_months=request.term_months
+        term_months=request.term_months,
+        if_none_match=None
     )
 
 
+# Размер порции пакетного расчета: строки считаются и отдаются клиенту порциями
+BATCH_CHUNK_SIZE = 1000
+
+
+async def _iter_ndjson(byte_stream: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    """Разбирает поток NDJSON построчно, не накапливая тело запроса."""
+    buffer = b""
+    async for chunk in byte_stream:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+    if buffer.strip():
+        yield buffer
+
+
+async def _read_json_array(request: Request) -> AsyncIterator[Any]:
+    """Читает JSON-массив из тела запроса; ошибка формата возвращается до начала потока."""
+    try:
+        rows = await request.json()
+    except ValueError:
+        rows = None
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Тело запроса должно быть JSON-массивом или NDJSON")
+    
+    async def iterate() -> AsyncIterator[Any]:
+        for row in rows:
+            yield row
+    
+    return iterate()
+
+
+def _batch_error_line(index: int, error: Exception) -> str:
+    return json.dumps({"index": index, "error": str(error)}, ensure_ascii=False)
+
+
+def _render_batch_chunk(snapshot: MarketSnapshot, chunk: List[Tuple[int, Any]], params,
+                        by_term: Optional[Dict[int, QuoteOut]] = None) -> bytes:
+    """
+    Считает порцию строк и сериализует ее в NDJSON с сохранением порядка.
+    
+    Расчет идет через pricing_pipeline (общие с /price лестницы и
+    мемоизация по снапшоту) один раз на срок; by_term переносит готовые
+    котировки между порциями одного пакета. Строки по устаревшему
+    снапшоту помечаются stale, как в quote_for.
+    """
+    market_data = snapshot.market_data
+    by_term = {} if by_term is None else by_term
+    stale = market_cache.is_stale(snapshot)
+    parsed = []
+    for index, raw in chunk:
+        try:
+            if isinstance(raw, (bytes, str)):
+                parsed.append(QuoteRequest.model_validate_json(raw))
+            else:
+                parsed.append(QuoteRequest.model_validate(raw))
+        except ValidationError as e:
+            parsed.append(_batch_error_line(index, e))
+            continue
+        marginal, within_reserve = pretrade_check(parsed[-1].volume, market_data.futures_quote.price, params)
+        if not within_reserve:
+            parsed[-1] = _batch_error_line(index, ValueError(
+                f"Book capital with this quote (+{marginal:.0f} RUB) exceeds the reserve"))
+    
+    lines = []
+    for row in parsed:
+        if isinstance(row, str):
+            lines.append(row)
+            continue
+        # MGP не зависит от объема: строки одного срока получают копию с нужным объемом
+        base = by_term.get(row.term_months)
+        if base is None:
+            base = pricing_pipeline.get(snapshot.version, market_data, row.volume, row.term_months, params).to_quote()
+            if stale:
+                base = base.model_copy(update={"stale": True})
+            by_term[row.term_months] = base
+        lines.append(base.model_copy(update={"volume_t": row.volume}).model_dump_json())
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _render_batch_chunk_safe(snapshot: MarketSnapshot, chunk: List[Tuple[int, Any]], params,
+                             by_term: Optional[Dict[int, QuoteOut]] = None) -> bytes:
+    """
+    Как _render_batch_chunk, но ошибка расчета не обрывает поток.
+    
+    Если порция целиком не посчиталась, строки пересчитываются по одной,
+    и каждая неудачная строка отдается как {"index": ..., "error": ...}.
+    """
+    try:
+        return _render_batch_chunk(snapshot, chunk, params, by_term)
+    except Exception as e:
+        logger.error(f"Batch chunk pricing error: {e}")
+    
+    parts = []
+    for index, raw in chunk:
+        try:
+            parts.append(_render_batch_chunk(snapshot, [(index, raw)], params, by_term))
+        except Exception as e:
+            parts.append((_batch_error_line(index, e) + "\n").encode("utf-8"))
+    return b"".join(parts)
+
+
+class _RequestDrivenStreamingResponse(StreamingResponse):
+    """
+    Потоковый ответ, тело которого формируется по мере чтения тела запроса.
+    
+    Стандартный StreamingResponse параллельно слушает receive() в ожидании
+    отключения клиента и забирает себе сообщения с телом запроса, из-за чего
+    чтение request.stream() в генераторе зависает. Здесь receive принадлежит
+    только генератору; отключение клиента он увидит как ClientDisconnect.
+    """
+    
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+@app.post("/price/batch", summary="Пакетный расчет цен (NDJSON)")
+async def post_price_batch(request: Request):
+    """
+    Пакетный расчет для массива запросов QuoteRequest.
+    
+    Принимает JSON-массив или поток NDJSON (Content-Type: application/x-ndjson).
+    Все строки считаются по одному снапшоту рынка, результаты QuoteOut
+    отдаются потоком NDJSON по мере расчета в исходном порядке. Строки с
+    ошибкой валидации или расчета возвращаются как {"index": ..., "error": ...}.
+    
+    Постоянный расход памяти обеспечивает только NDJSON: тело читается и
+    считается порциями. JSON-массив разбирается целиком до начала расчета,
+    поэтому для пакетов на сотни тысяч строк следует использовать NDJSON.
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        rows = _iter_ndjson(request.stream())
+    else:
+        rows = await _read_json_array(request)
+    
+    try:
+        snapshot = await get_snapshot("WHEAT")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch pricing error: {e}")
+        raise HTTPException(status_code=500, detail=f"Ошибка при расчете цены: {str(e)}")
+    params = get_params()
+    
+    async def body() -> AsyncIterator[bytes]:
+        by_term: Dict[int, QuoteOut] = {}
+        chunk: List[Tuple[int, Any]] = []
+        index = 0
+        async for raw in rows:
+            chunk.append((index, raw))
+            index += 1
+            if len(chunk) >= BATCH_CHUNK_SIZE:
+                yield _render_batch_chunk_safe(snapshot, chunk, params, by_term)
+                chunk = []
+                # Отдаем управление event loop между порциями
+                await asyncio.sleep(0)
+        if chunk:
+            yield _render_batch_chunk_safe(snapshot, chunk, params, by_term)
+    
+    return _RequestDrivenStreamingResponse(body(), media_type="application/x-ndjson")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -14,6 +14,7 @@ setup(
         "scipy>=1.8.0",
         "pandas>=1.3.0",
         "requests>=2.28.0",
+        "httpx>=0.24.0",
         "PyYAML>=6.0.0",
     ],
     python_requires=">=3.8",
@@ -0,0 +1,207 @@
+"""Снапшот рыночных данных в разделяемой памяти (mmap) для нескольких воркеров."""
+
+import json
+import mmap
+import os
+import struct
+import time
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .chain import OptionChain
+from .models import FuturesContract, FuturesQuote, MarketData
+
+MAGIC = b"HFSNAP01"
+
+# magic, seq, version, длина данных, время публикации (time.time())
+_HEADER = struct.Struct("<8sQQQd")
+HEADER_SIZE = 64
+_SEQ_OFFSET = 8
+
+# Колонки цепочки: имя, dtype хранения
+_CHAIN_COLUMNS = (
+    ("strike", "<f8"),
+    ("premium", "<f8"),
+    ("bid", "<f8"),
+    ("ask", "<f8"),
+    ("open_interest", "<f8"),
+    ("implied_vol", "<f8"),
+    ("expiry", "<i8"),
+    ("is_call", "u1"),
+)
+
+_ALIGN = 8
+
+
+def segment_path(root: Path, symbol: str) -> Path:
+    """Файл сегмента символа в каталоге root."""
+    return Path(root) / f"{symbol}.snapshot"
+
+
+def encode_market_data(market_data: MarketData) -> bytes:
+    """
+    Рыночные данные в байты: JSON-заголовок и сырые колонки цепочки.
+
+    Скалярные поля и кривая (единицы серий) идут в JSON, колонки
+    OptionChain - подряд как массивы, выровненные по 8 байт.
+    """
+    chain = market_data.put_options
+    arrays: List[np.ndarray] = [
+        np.ascontiguousarray(chain.expiry.astype(np.int64) if name == "expiry" else getattr(chain, name), dtype=dtype)
+        for name, dtype in _CHAIN_COLUMNS
+    ]
+    meta = {
+        "futures_quote": market_data.futures_quote.model_dump(mode="json"),
+        "usd_rate": market_data.usd_rate,
+        "volatility": market_data.volatility,
+        "futures_curve": [[contract.secid, contract.expiry.isoformat(), contract.price]
+                          for contract in market_data.futures_curve],
+        "symbols": [str(symbol) for symbol in chain.symbol],
+    }
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    parts = [struct.pack("<Q", len(meta_bytes)), meta_bytes]
+    offset = 8 + len(meta_bytes)
+    for array in arrays:
+        pad = -offset % _ALIGN
+        parts.append(b"\0" * pad)
+        parts.append(array.tobytes())
+        offset += pad + array.nbytes
+    return b"".join(parts)
+
+
+def decode_market_data(data: bytes) -> MarketData:
+    """
+    Обратное преобразование encode_market_data.
+
+    Колонки цепочки - np.frombuffer поверх data без копирования и разбора;
+    bytes неизменяемы, поэтому массивы только для чтения.
+    """
+    (meta_len,) = struct.unpack_from("<Q", data, 0)
+    meta = json.loads(data[8:8 + meta_len].decode("utf-8"))
+    n = len(meta["symbols"])
+    offset = 8 + meta_len
+    columns: Dict[str, np.ndarray] = {}
+    for name, dtype in _CHAIN_COLUMNS:
+        offset += -offset % _ALIGN
+        columns[name] = np.frombuffer(data, dtype=dtype, count=n, offset=offset)
+        offset += columns[name].nbytes
+    chain = OptionChain(
+        symbol=meta["symbols"],
+        strike=columns["strike"],
+        premium=columns["premium"],
+        bid=columns["bid"],
+        ask=columns["ask"],
+        open_interest=columns["open_interest"],
+        expiry=columns["expiry"].view("datetime64[D]"),
+        is_call=columns["is_call"].view(bool),
+        implied_vol=columns["implied_vol"],
+        _sorted=True
+    )
+    return MarketData(
+        futures_quote=FuturesQuote.model_validate(meta["futures_quote"]),
+        put_options=chain,
+        usd_rate=meta["usd_rate"],
+        volatility=meta["volatility"],
+        futures_curve=[FuturesContract(secid=secid, expiry=date.fromisoformat(expiry), price=price)
+                       for secid, expiry, price in meta["futures_curve"]]
+    )
+
+
+class SnapshotSegment:
+    """
+    Файл-сегмент одного символа, отображенный в память, под seqlock.
+
+    Писатель один (процесс загрузки данных): он делает seq нечетным,
+    записывает данные, версию и длину, затем делает seq четным. Читатель
+    копирует данные и принимает их, только если seq до и после копии
+    одинаков и четен, иначе повторяет чтение. Проверка новой версии -
+    чтение двух чисел заголовка, без блокировок и системных вызовов.
+
+    Для разделяемой памяти файл следует держать в tmpfs (/dev/shm).
+    """
+
+    def __init__(self, path: Path, capacity: int = 0):
+        self.path = Path(path)
+        writer = capacity > 0
+        if writer:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        else:
+            fd = os.open(self.path, os.O_RDONLY)
+        try:
+            if writer and os.fstat(fd).st_size < HEADER_SIZE + capacity:
+                os.ftruncate(fd, HEADER_SIZE + capacity)
+            size = os.fstat(fd).st_size
+            access = mmap.ACCESS_WRITE if writer else mmap.ACCESS_READ
+            self._mm = mmap.mmap(fd, size, access=access)
+        finally:
+            os.close(fd)
+        self.capacity = size - HEADER_SIZE
+        if writer and self._mm[:8] != MAGIC:
+            _HEADER.pack_into(self._mm, 0, MAGIC, 0, 0, 0, 0.0)
+
+    @classmethod
+    def create(cls, path: Path, capacity: int) -> "SnapshotSegment":
+        """Сегмент для записи (создается или переиспользуется после перезапуска)."""
+        return cls(path, capacity)
+
+    @classmethod
+    def open(cls, path: Path) -> "SnapshotSegment":
+        """Сегмент только для чтения."""
+        return cls(path)
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _seq(self) -> int:
+        return struct.unpack_from("<Q", self._mm, _SEQ_OFFSET)[0]
+
+    def version(self) -> int:
+        """Версия опубликованного снапшота (0 - еще не было, либо идет запись)."""
+        seq = self._seq()
+        if seq & 1:
+            return 0
+        version = struct.unpack_from("<Q", self._mm, _SEQ_OFFSET + 8)[0]
+        return version if self._seq() == seq else 0
+
+    def published_at(self) -> float:
+        """Время последней публикации (time.time()); 0 - еще не было, либо идет запись."""
+        seq = self._seq()
+        if seq & 1:
+            return 0.0
+        published_at = struct.unpack_from("<d", self._mm, _SEQ_OFFSET + 24)[0]
+        return published_at if self._seq() == seq else 0.0
+
+    def publish(self, version: int, market_data: MarketData) -> None:
+        data = encode_market_data(market_data)
+        if len(data) > self.capacity:
+            raise ValueError(f"Snapshot of {len(data)} bytes exceeds segment capacity {self.capacity}")
+        seq = self._seq()
+        struct.pack_into("<Q", self._mm, _SEQ_OFFSET, seq + 1)
+        self._mm[HEADER_SIZE:HEADER_SIZE + len(data)] = data
+        _HEADER.pack_into(self._mm, 0, MAGIC, seq + 1, version, len(data), time.time())
+        struct.pack_into("<Q", self._mm, _SEQ_OFFSET, seq + 2)
+
+    def read(self, retries: int = 100) -> Optional[Tuple[int, float, MarketData]]:
+        """
+        Согласованная копия: (версия, время публикации, рыночные данные).
+
+        None, если снапшот еще не публиковался; RuntimeError, если писатель
+        не дал прочитать согласованную копию за retries попыток.
+        """
+        for _ in range(retries):
+            seq = self._seq()
+            if seq & 1:
+                time.sleep(0)
+                continue
+            magic, _, version, length, published_at = _HEADER.unpack_from(self._mm, 0)
+            data = self._mm[HEADER_SIZE:HEADER_SIZE + length]
+            if self._seq() != seq:
+                continue
+            if magic != MAGIC or not version:
+                return None
+            return version, published_at, decode_market_data(data)
+        raise RuntimeError(f"Could not read a consistent snapshot from {self.path}")
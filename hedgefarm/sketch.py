@@ -0,0 +1,151 @@
+"""Потоковая оценка квантилей (t-digest) с постоянной памятью."""
+
+from typing import Dict, Iterable
+
+import numpy as np
+
+
+class TDigest:
+    """
+    Сливаемый t-digest с буфером.
+
+    Значения копятся в буфере и периодически сжимаются в центроиды по
+    логарифмической масштабной функции: центроиды у хвостов маленькие,
+    поэтому хвостовые квантили точнее центральных. Память O(compression)
+    независимо от числа наблюдений. Дайджесты разных воркеров объединяются через merge или
+    через сериализацию to_dict/from_dict.
+    """
+
+    def __init__(self, compression: float = 200.0, buffer_size: int = 0):
+        self.compression = float(compression)
+        self._buffer_size = buffer_size or int(5 * compression)
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._buffer = np.empty(self._buffer_size)
+        self._buffer_weights = np.empty(self._buffer_size)
+        self._buffered = 0
+        self.count = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def __len__(self) -> int:
+        return int(self.count)
+
+    @property
+    def centroids(self) -> int:
+        self._flush()
+        return len(self._means)
+
+    def update(self, value: float, weight: float = 1.0) -> None:
+        """Добавляет одно наблюдение."""
+        if self._buffered == self._buffer_size:
+            self._flush()
+        self._buffer[self._buffered] = value
+        self._buffer_weights[self._buffered] = weight
+        self._buffered += 1
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def update_many(self, values: Iterable[float]) -> None:
+        """Добавляет массив наблюдений без цикла Python по элементам."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return
+        self.count += values.size
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._compress(np.concatenate([self._pending_means(), values]),
+                       np.concatenate([self._pending_weights(), np.ones(values.size)]))
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Вливает другой дайджест в этот; сумма дайджестов частей эквивалентна дайджесту целого."""
+        other._flush()
+        if other.count:
+            self.count += other.count
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._compress(np.concatenate([self._pending_means(), other._means]),
+                           np.concatenate([self._pending_weights(), other._weights]))
+        return self
+
+    def quantile(self, q):
+        """Квантиль (или массив квантилей) уровня q из [0, 1]."""
+        self._flush()
+        if not self.count:
+            raise ValueError("Empty digest")
+        # Центр центроида - середина его веса на оси накопленного веса
+        centers = np.cumsum(self._weights) - 0.5 * self._weights
+        positions = np.concatenate([[0.0], centers, [self.count]])
+        values = np.concatenate([[self.min], self._means, [self.max]])
+        result = np.interp(np.asarray(q, dtype=float) * self.count, positions, values)
+        return float(result) if np.ndim(result) == 0 else result
+
+    def cdf(self, x):
+        """Доля наблюдений не больше x."""
+        self._flush()
+        if not self.count:
+            raise ValueError("Empty digest")
+        centers = np.cumsum(self._weights) - 0.5 * self._weights
+        positions = np.concatenate([[0.0], centers, [self.count]])
+        values = np.concatenate([[self.min], self._means, [self.max]])
+        result = np.interp(x, values, positions) / self.count
+        return float(result) if np.ndim(result) == 0 else result
+
+    def to_dict(self) -> Dict:
+        """Состояние для передачи между воркерами или записи на диск."""
+        self._flush()
+        return {
+            "compression": self.compression,
+            "count": self.count,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+            "means": self._means.tolist(),
+            "weights": self._weights.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, state: Dict) -> "TDigest":
+        digest = cls(state["compression"])
+        digest._means = np.asarray(state["means"], dtype=float)
+        digest._weights = np.asarray(state["weights"], dtype=float)
+        digest.count = float(state["count"])
+        if digest.count:
+            digest.min, digest.max = float(state["min"]), float(state["max"])
+        return digest
+
+    def _pending_means(self) -> np.ndarray:
+        return np.concatenate([self._means, self._buffer[:self._buffered]])
+
+    def _pending_weights(self) -> np.ndarray:
+        return np.concatenate([self._weights, self._buffer_weights[:self._buffered]])
+
+    def _flush(self) -> None:
+        if self._buffered:
+            self._compress(self._pending_means(), self._pending_weights())
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        """
+        Сжимает точки в центроиды одним векторным проходом.
+
+        Точка попадает в центроид floor(k(q)) по накопленной доле веса в ее
+        середине. Масштаб k2(q) = compression / Z * log(q / (1 - q)) с
+        Z = 4 log(n / compression) + 24 логарифмический, поэтому центроиды
+        у хвостов содержат единицы наблюдений и хвостовые квантили точны в
+        относительном смысле.
+        """
+        self._buffered = 0
+        if not means.size:
+            return
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        mid = (np.cumsum(weights) - 0.5 * weights) / total
+        norm = 4.0 * np.log(max(total / self.compression, 1.0)) + 24.0
+        k = self.compression / norm * np.log(mid / (1.0 - mid))
+        groups = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate([[True], groups[1:] != groups[:-1]]))
+        merged_weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / merged_weights
+        self._weights = merged_weights
@@ -0,0 +1,165 @@
+"""Хранилище снапшотов рыночных данных и фоновый опрос биржи."""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from .models import MarketData
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class MarketSnapshot:
+    """Неизменяемый версионированный снапшот рыночных данных."""
+    version: int
+    symbol: str
+    market_data: MarketData
+    fetched_at: float  # time.monotonic() момента получения
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def age(self) -> float:
+        """Возраст снапшота в секундах."""
+        return time.monotonic() - self.fetched_at
+
+
+def same_market_data(a, b) -> bool:
+    """
+    Одинаковы ли рыночные данные двух опросов.
+
+    Время котировки (futures_quote.updated_at) не учитывается: оно меняется
+    на каждом опросе и само по себе не меняет расчет.
+    """
+    if not isinstance(a, MarketData) or not isinstance(b, MarketData):
+        return a is b
+    return (a.futures_quote.model_dump(exclude={"updated_at"}) == b.futures_quote.model_dump(exclude={"updated_at"})
+            and a.usd_rate == b.usd_rate
+            and a.volatility == b.volatility
+            and a.futures_curve == b.futures_curve
+            and a.put_options.same_as(b.put_options))
+
+
+class SnapshotStore:
+    """
+    Последние опубликованные снапшоты по символам.
+
+    Версия растет только при изменении данных: повторная публикация тех же
+    рыночных данных (или той же версии) лишь обновляет возраст снапшота,
+    без новой версии и без вызова обработчиков, поэтому кэши, ключуемые
+    версией, не сбрасываются. Снапшоты неизменяемы, поэтому читатели
+    получают согласованный набор данных без блокировок.
+    Начальная версия задается, чтобы нумерация продолжалась после
+    перезапуска процесса, публикующего снапшоты для других процессов.
+    """
+
+    def __init__(self, version: int = 0):
+        self._latest: Dict[str, MarketSnapshot] = {}
+        self._version = version
+        self._listeners: List[Callable[[MarketSnapshot], None]] = []
+
+    def add_listener(self, callback: Callable[[MarketSnapshot], None]) -> None:
+        """Регистрирует обработчик, вызываемый при каждой публикации."""
+        self._listeners.append(callback)
+
+    @property
+    def version(self) -> int:
+        """Версия последнего опубликованного снапшота."""
+        return self._version
+
+    def publish(self, symbol: str, market_data: MarketData, version: Optional[int] = None,
+                fetched_at: Optional[float] = None) -> MarketSnapshot:
+        """
+        Публикует новый снапшот и возвращает его.
+
+        version и fetched_at задаются, когда снапшот получен от другого
+        процесса: тогда у всех процессов одна и та же версия. Если данные
+        не изменились, возвращается прежний снапшот с новым fetched_at.
+        """
+        fetched_at = time.monotonic() if fetched_at is None else fetched_at
+        latest = self._latest.get(symbol)
+        if latest is not None and (latest.version == version if version is not None
+                                   else same_market_data(latest.market_data, market_data)):
+            snapshot = replace(latest, fetched_at=fetched_at)
+            self._latest[symbol] = snapshot
+            return snapshot
+
+        self._version = self._version + 1 if version is None else version
+        snapshot = MarketSnapshot(
+            version=self._version,
+            symbol=symbol,
+            market_data=market_data,
+            fetched_at=fetched_at
+        )
+        self._latest[symbol] = snapshot
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                # Ошибка производного расчета не должна мешать публикации
+                logger.warning(f"Snapshot listener failed for {symbol} v{snapshot.version}: {e}")
+        return snapshot
+
+    def latest(self, symbol: str) -> Optional[MarketSnapshot]:
+        """Возвращает последний снапшот по символу."""
+        return self._latest.get(symbol)
+
+    def clear(self) -> None:
+        """Удаляет все снапшоты (версия не сбрасывается)."""
+        self._latest.clear()
+
+
+class MarketDataPoller:
+    """Фоновая задача, обновляющая снапшоты по расписанию."""
+
+    def __init__(self, refresh: Callable[[str], Awaitable[MarketSnapshot]],
+                 symbols: Iterable[str] = ("WHEAT",), interval: float = 1.0):
+        self._refresh = refresh
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.polls = 0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def poll_once(self) -> None:
+        """Обновляет все символы параллельно; ошибки только логируются."""
+        results = await asyncio.gather(
+            *[self._refresh(symbol) for symbol in self.symbols],
+            return_exceptions=True
+        )
+        self.polls += 1
+        for symbol, result in zip(self.symbols, results):
+            if isinstance(result, Exception):
+                self.failures += 1
+                logger.warning(f"Polling {symbol} failed: {result}")
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_tick = loop.time()
+        while True:
+            await self.poll_once()
+            # Фиксированный шаг расписания, без накопления задержки опроса
+            next_tick = max(next_tick + self.interval, loop.time())
+            await asyncio.sleep(next_tick - loop.time())
+
+    def start(self) -> None:
+        """Запускает опрос в текущем event loop."""
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Останавливает опрос."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
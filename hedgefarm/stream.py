@@ -0,0 +1,130 @@
+"""Рассылка пересчитанных котировок подписчикам (Server-Sent Events)."""
+
+import asyncio
+import logging
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from .models import QuoteOut
+from .snapshots import MarketSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Ключ группы подписчиков: (объем, срок)
+Key = Tuple[int, int]
+
+
+def format_event(version: int, quote: QuoteOut) -> bytes:
+    """Событие SSE с котировкой; id - версия снапшота."""
+    return f"id: {version}\nevent: quote\ndata: {quote.model_dump_json()}\n\n".encode("utf-8")
+
+
+class Subscription:
+    """
+    Очередь одного подписчика ограниченного размера.
+
+    Если подписчик не успевает читать, из полной очереди выбрасывается
+    самое старое событие: медленный клиент пропускает промежуточные тики,
+    но всегда получает последний.
+    """
+
+    def __init__(self, key: Key, maxsize: int = 2):
+        self.key = key
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize)
+
+    def offer(self, event: bytes) -> None:
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(event)
+
+    async def get(self) -> bytes:
+        return await self._queue.get()
+
+
+@dataclass
+class StreamStats:
+    """Счетчики рассылки."""
+    ticks: int = 0
+    computed: int = 0
+    delivered: int = 0
+    dropped: int = 0
+    errors: int = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return asdict(self)
+
+
+class QuoteBroadcaster:
+    """
+    Подписчики, сгруппированные по (объем, срок).
+
+    На каждой новой версии снапшота котировка считается и сериализуется
+    один раз на группу, а в очереди всех подписчиков группы кладется один
+    и тот же объект bytes. Стоимость тика пропорциональна числу групп, а
+    не числу подписчиков; новый подписчик существующей группы получает
+    готовое событие текущей версии.
+    """
+
+    def __init__(self, render: Callable[[MarketSnapshot, int, int], QuoteOut], queue_size: int = 2):
+        self._render = render
+        self.queue_size = queue_size
+        self.stats = StreamStats()
+        self._groups: Dict[Key, Set[Subscription]] = {}
+        self._events: Dict[Key, Tuple[int, bytes]] = {}
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(group) for group in self._groups.values())
+
+    @property
+    def groups(self) -> int:
+        return len(self._groups)
+
+    def subscribe(self, volume: int, term_months: int,
+                  snapshot: Optional[MarketSnapshot] = None) -> Subscription:
+        """Новый подписчик; если снапшот передан, в очереди сразу его котировка."""
+        key = (volume, term_months)
+        subscription = Subscription(key, self.queue_size)
+        self._groups.setdefault(key, set()).add(subscription)
+        if snapshot is not None:
+            event = self._event(snapshot, key)
+            if event is not None:
+                subscription.offer(event)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        group = self._groups.get(subscription.key)
+        if group is None or subscription not in group:
+            return
+        group.remove(subscription)
+        self.stats.dropped += subscription.dropped
+        if not group:
+            del self._groups[subscription.key]
+            self._events.pop(subscription.key, None)
+
+    def publish(self, snapshot: MarketSnapshot) -> None:
+        """Рассылает котировки новой версии снапшота всем группам."""
+        self.stats.ticks += 1
+        for key, group in list(self._groups.items()):
+            event = self._event(snapshot, key)
+            if event is None:
+                continue
+            for subscription in group:
+                subscription.offer(event)
+            self.stats.delivered += len(group)
+
+    def _event(self, snapshot: MarketSnapshot, key: Key) -> Optional[bytes]:
+        cached = self._events.get(key)
+        if cached is not None and cached[0] == snapshot.version:
+            return cached[1]
+        try:
+            event = format_event(snapshot.version, self._render(snapshot, *key))
+        except Exception as e:
+            self.stats.errors += 1
+            logger.warning(f"Quote stream for volume {key[0]}, term {key[1]} failed: {e}")
+            return None
+        self.stats.computed += 1
+        self._events[key] = (snapshot.version, event)
+        return event
@@ -19,7 +19,54 @@ def get_default_config() -> Dict[str, Any]:
         "go_pct": 0.10,
         "risk": {
             "capital_reserve": 50000000,
-            "alpha_capital": 0.1
+            "alpha_capital": 0.1,
+            "var_alpha": 0.99,
+            "var_window": 250,
+            "ewma_lambda": 0.94,
+            "horizon_days": 10
+        },
+        "market_data": {
+            "cache_ttl_s": 1.0,
+            "stale_ttl_s": 10.0,
+            "poll_interval_s": 1.0,
+            "max_snapshot_age_s": 30.0
+        },
+        "ledger": {
+            "path": "data/ledger.json",
+            "snapshot_interval_s": 30.0
+        },
+        "history": {
+            "path": "data/history",
+            "lookback_days": 1460
+        },
+        "volatility": {
+            "estimator": "yang_zhang",
+            "window": 60
+        },
+        "circuit_breaker": {
+            "failure_threshold": 3,
+            "reset_timeout_s": 5.0,
+            "min_timeout_s": 0.5,
+            "max_timeout_s": 10.0
+        },
+        "shared_snapshot": {
+            "path": "",
+            "capacity_bytes": 1048576
+        },
+        "batching": {
+            "enabled": False,
+            "max_batch": 64,
+            "max_wait_ms": 2.0
+        },
+        "response_cache": {
+            "max_entries": 4096,
+            "max_bytes": 16777216
+        },
+        "ladder": {
+            "optimize": True,
+            "max_weight": 0.4,
+            "max_legs": 5,
+            "premium_budget_pct": 0.05
         }
     }
 
@@ -47,6 +94,12 @@ def load_cfg() -> Dict[str, Any]:
         return get_default_config()
 
 
+def project_path(path: str) -> Path:
+    """Путь из настроек: относительный считается от корня проекта."""
+    path = Path(path)
+    return path if path.is_absolute() else Path(__file__).parent.parent / path
+
+
 def get_moex_token() -> str:
     """Получает токен MOEX из переменной окружения."""
     token = os.getenv("MOEX_TOKEN")
@@ -0,0 +1,185 @@
+"""Оценки реализованной волатильности по дневным OHLC-свечам."""
+
+import math
+from typing import Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+from scipy.signal import lfilter
+
+from .risk import TRADING_DAYS, ewma_variance, log_returns
+
+_LN2 = math.log(2.0)
+
+
+class _Estimator(NamedTuple):
+    """
+    Оценка как свертка поканальных слагаемых бара.
+
+    terms(open, high, low, close, prev_close) -> массив (n, k) слагаемых,
+    combine(sums, window) -> дневная дисперсия по суммам слагаемых окна.
+    """
+    terms: Callable
+    combine: Callable
+
+
+def _sample_variance(total, total_sq, n):
+    return (total_sq - total * total / n) / (n - 1)
+
+
+def _close_terms(o, h, l, c, prev):
+    r = np.log(c / prev)
+    return np.stack([r, r * r], axis=-1)
+
+
+def _parkinson_terms(o, h, l, c, prev):
+    return (np.log(h / l) ** 2 / (4.0 * _LN2))[..., None]
+
+
+def _garman_klass_terms(o, h, l, c, prev):
+    return (0.5 * np.log(h / l) ** 2 - (2.0 * _LN2 - 1.0) * np.log(c / o) ** 2)[..., None]
+
+
+def _yang_zhang_terms(o, h, l, c, prev):
+    overnight = np.log(o / prev)
+    intraday = np.log(c / o)
+    rogers_satchell = np.log(h / c) * np.log(h / o) + np.log(l / c) * np.log(l / o)
+    return np.stack([overnight, overnight ** 2, intraday, intraday ** 2, rogers_satchell], axis=-1)
+
+
+def _yang_zhang_combine(sums, n):
+    k = 0.34 / (1.34 + (n + 1.0) / (n - 1.0))
+    overnight = _sample_variance(sums[..., 0], sums[..., 1], n)
+    intraday = _sample_variance(sums[..., 2], sums[..., 3], n)
+    return overnight + k * intraday + (1.0 - k) * sums[..., 4] / n
+
+
+ESTIMATORS: Dict[str, _Estimator] = {
+    "close": _Estimator(_close_terms, lambda s, n: _sample_variance(s[..., 0], s[..., 1], n)),
+    "parkinson": _Estimator(_parkinson_terms, lambda s, n: s[..., 0] / n),
+    "garman_klass": _Estimator(_garman_klass_terms, lambda s, n: s[..., 0] / n),
+    "yang_zhang": _Estimator(_yang_zhang_terms, _yang_zhang_combine),
+}
+
+
+def _previous_close(close: np.ndarray) -> np.ndarray:
+    # Для первого бара предыдущего закрытия нет: берется его же цена
+    return np.concatenate([close[:1], close[:-1]])
+
+
+def rolling_volatility(open_, high, low, close, window: int, estimator: str = "yang_zhang",
+                       annualize: bool = True) -> np.ndarray:
+    """
+    Скользящая волатильность по окну из window баров.
+
+    Слагаемые всех баров считаются одним векторным проходом, суммы окон -
+    разностью кумулятивных сумм. Первое окно начинается со второго бара,
+    поскольку оценкам нужно закрытие предыдущего дня; результат имеет длину
+    len(close) - window, последний элемент - текущее окно.
+    """
+    if window < 2:
+        raise ValueError(f"window must be at least 2, got {window}")
+    est = ESTIMATORS[estimator]
+    o, h, l, c = (np.asarray(x, dtype=float) for x in (open_, high, low, close))
+    terms = est.terms(o, h, l, c, _previous_close(c))[1:]
+    cumulative = np.concatenate([np.zeros((1, terms.shape[1])), np.cumsum(terms, axis=0)])
+    variance = np.maximum(est.combine(cumulative[window:] - cumulative[:-window], window), 0.0)
+    return np.sqrt(variance * (TRADING_DAYS if annualize else 1.0))
+
+
+def ewma_volatility(close, lam: float = 0.94, annualize: bool = True) -> np.ndarray:
+    """EWMA-волатильность (RiskMetrics) по доходностям close-to-close."""
+    variance = ewma_variance(log_returns(close), lam)
+    return np.sqrt(variance * (TRADING_DAYS if annualize else 1.0))
+
+
+class RollingVolatility:
+    """
+    Инкрементальная оценка волатильности по последним window барам.
+
+    Слагаемые баров окна хранятся в кольцевом буфере, суммы обновляются
+    добавлением нового и вычитанием выбывшего слагаемого - O(1) на бар.
+    При каждом проходе буфера по кругу суммы пересчитываются заново, чтобы
+    не накапливать ошибку округления. Оценка "ewma" окна не использует.
+    """
+
+    def __init__(self, window: int = 60, estimator: str = "yang_zhang", lam: float = 0.94):
+        if estimator != "ewma" and estimator not in ESTIMATORS:
+            raise ValueError(f"Unknown volatility estimator: {estimator}")
+        if window < 2:
+            raise ValueError(f"window must be at least 2, got {window}")
+        self.window = window
+        self.estimator = estimator
+        self.lam = lam
+        width = 1 if estimator == "ewma" else ESTIMATORS[estimator].terms(*np.ones((5, 1))).shape[-1]
+        self._terms = np.zeros((window, width))
+        self._sums = np.zeros(width)
+        self._count = 0
+        self._prev_close: Optional[float] = None
+        self._ewma: Optional[float] = None
+
+    @classmethod
+    def from_history(cls, history, window: int = 60, estimator: str = "yang_zhang") -> "RollingVolatility":
+        """Оценка по хвосту из window + 1 свечей истории (CandleHistory)."""
+        tail = history.data[:, -(window + 1):]
+        volatility = cls(window, estimator)
+        volatility.update_many(tail[1], tail[2], tail[3], tail[4])
+        return volatility
+
+    def __len__(self) -> int:
+        """Число баров в окне."""
+        return min(self._count, self.window)
+
+    @property
+    def ready(self) -> bool:
+        if self.estimator == "ewma":
+            return self._ewma is not None
+        return self._count >= self.window
+
+    @property
+    def value(self) -> Optional[float]:
+        """Текущая годовая волатильность (None, пока окно не заполнено)."""
+        if not self.ready:
+            return None
+        if self.estimator == "ewma":
+            return math.sqrt(self._ewma * TRADING_DAYS)
+        variance = ESTIMATORS[self.estimator].combine(self._sums, self.window)
+        return math.sqrt(max(float(variance), 0.0) * TRADING_DAYS)
+
+    def update(self, open_: float, high: float, low: float, close: float) -> Optional[float]:
+        """Добавляет бар и возвращает текущую годовую волатильность."""
+        return self.update_many([open_], [high], [low], [close])
+
+    def update_many(self, open_, high, low, close) -> Optional[float]:
+        """Добавляет ряд баров; в окно попадают только последние window из них."""
+        o, h, l, c = (np.asarray(x, dtype=float).ravel() for x in (open_, high, low, close))
+        if not c.size:
+            return self.value
+        first = self._prev_close is None
+        prev = np.concatenate([[c[0] if first else self._prev_close], c[:-1]])
+        self._prev_close = float(c[-1])
+        # Первый бар без предыдущего закрытия только задает базу
+        start = 1 if first else 0
+
+        if self.estimator == "ewma":
+            r2 = np.log(c / prev)[start:] ** 2
+            if r2.size:
+                seed = r2[0] if self._ewma is None else self._ewma
+                variance, _ = lfilter([1.0 - self.lam], [1.0, -self.lam], r2, zi=[self.lam * seed])
+                self._ewma = float(variance[-1])
+            return self.value
+
+        terms = ESTIMATORS[self.estimator].terms(o, h, l, c, prev)[start:]
+        if len(terms) >= self.window:
+            # Окно целиком из новых баров: буфер заполняется с нулевой позиции
+            self._terms[:] = terms[-self.window:]
+            self._count = self.window * (self._count // self.window + 1)
+            self._sums = self._terms.sum(axis=0)
+            return self.value
+        for term in terms:
+            slot = self._count % self.window
+            self._sums += term - self._terms[slot]
+            self._terms[slot] = term
+            self._count += 1
+            if slot == self.window - 1:
+                self._sums = self._terms.sum(axis=0)
+        return self.value
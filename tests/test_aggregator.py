@@ -3,7 +3,7 @@
 import pytest
 import sys
 import os
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, patch
 
 # Добавляем путь к модулю hedgefarm
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -108,7 +108,7 @@ class TestAggregator:
         assert result.recommended in ["futures", "put", "forward"]
         
         # Убеждаемся, что функции вызывались с правильными параметрами
-        mock_futures_floor.assert_called_once_with(16500.0, term_months, volume)
+        mock_futures_floor.assert_called_once_with(16500.0, term_months, volume, params=ANY)
         mock_options_floor.assert_called_once()
     
     @patch('hedgefarm.pricing.futures.get_futures_metrics')
@@ -1,9 +1,13 @@
 """Тесты для FastAPI эндпоинтов."""
 
+import json
+from datetime import datetime
+import threading
+import time
 import pytest
 import sys
 import os
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 # Добавляем путь к модулю hedgefarm
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,6 +29,11 @@ except ImportError:
 class TestAPI:
     """Тесты для API эндпоинтов."""
     
+    def setup_method(self):
+        """Сбрасываем кэш снапшотов, чтобы моки не протекали между тестами."""
+        from hedgefarm.service import market_cache
+        market_cache.clear()
+    
     def test_root_endpoint(self):
         """Тест корневого эндпоинта."""
         response = client.get("/")
@@ -47,12 +56,28 @@ class TestAPI:
         assert "status" in data
         assert data["status"] in ["healthy", "unhealthy"]
     
+    def test_health_reports_snapshot_age(self):
+        """Здоровье определяется возрастом снапшота, без запроса к бирже."""
+        from hedgefarm.service import market_store
+        market_store.publish("WHEAT", Mock())
+        
+        with patch('hedgefarm.service.moex_client') as mock_moex_client:
+            response = client.get("/health")
+            mock_moex_client.get_last_price.assert_not_called()
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "healthy"
+        assert data["snapshot_version"] == market_store.version
+        assert data["snapshot_age_s"] >= 0
+    
     @patch('hedgefarm.service.moex_client')
     def test_price_endpoint_success(self, mock_moex_client):
         """Тест успешного расчета цены."""
         # Мокаем рыночные данные
         mock_market_data = Mock()
         mock_market_data.futures_quote.price = 16500.0
+        mock_market_data.futures_quote.updated_at = datetime(2024, 1, 15, 12, 0)
         
         # Создаем мок PUT опцион
         from hedgefarm.models import OptionQuote
@@ -67,8 +92,9 @@ class TestAPI:
         mock_market_data.put_options = [mock_put_option]
         mock_market_data.volatility = 0.25
         mock_market_data.usd_rate = 95.0
+        mock_market_data.futures_curve = []
         
-        mock_moex_client.get_market_data.return_value = mock_market_data
+        mock_moex_client.get_market_data = AsyncMock(return_value=mock_market_data)
         
         response = client.get("/price?culture=wheat&volume=1000&term_months=6")
         assert response.status_code == 200
@@ -113,6 +139,7 @@ class TestAPI:
         # Мокаем рыночные данные
         mock_market_data = Mock()
         mock_market_data.futures_quote.price = 16500.0
+        mock_market_data.futures_quote.updated_at = datetime(2024, 1, 15, 12, 0)
         
         # Создаем мок PUT опцион
         from hedgefarm.models import OptionQuote
@@ -127,8 +154,9 @@ class TestAPI:
         mock_market_data.put_options = [mock_put_option]
         mock_market_data.volatility = 0.25
         mock_market_data.usd_rate = 95.0
+        mock_market_data.futures_curve = []
         
-        mock_moex_client.get_market_data.return_value = mock_market_data
+        mock_moex_client.get_market_data = AsyncMock(return_value=mock_market_data)
         
         response = client.get("/price/detailed?culture=wheat&volume=1000&term_months=6")
         
@@ -165,8 +193,9 @@ class TestAPI:
             mock_market_data.put_options = [mock_put_option]
             mock_market_data.volatility = 0.25
             mock_market_data.usd_rate = 95.0
+            mock_market_data.futures_curve = []
             
-            mock_moex_client.get_market_data.return_value = mock_market_data
+            mock_moex_client.get_market_data = AsyncMock(return_value=mock_market_data)
             
             response = client.post("/price", json=request_data)
             
@@ -174,6 +203,142 @@ class TestAPI:
             assert response.status_code in [200, 500]  # 500 если есть проблемы с зависимостями
 
 
+def create_market_data(futures_price: float = 16500.0):
+    """Создает рыночные данные для пакетных тестов."""
+    from hedgefarm.models import FuturesQuote, MarketData, OptionQuote
+    return MarketData(
+        futures_quote=FuturesQuote(symbol="WHEAT", price=futures_price, volume=1000,
+                                   updated_at="2024-01-15T12:00:00Z"),
+        put_options=[
+            OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=futures_price * k, premium=300.0,
+                        option_type="P", expiry="2024-06-15", implied_vol=0.25)
+            for k in [0.95, 0.97, 1.0, 1.03, 1.05]
+        ],
+        usd_rate=95.0,
+        volatility=0.25
+    )
+
+
+def call_with_timeout(func, timeout: float = 10.0):
+    """Выполняет запрос в фоновом потоке, чтобы зависание провалило тест, а не повесило прогон."""
+    result = {}
+    
+    def target():
+        try:
+            result["value"] = func()
+        except BaseException as e:
+            result["error"] = e
+    
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        pytest.fail(f"Request did not complete within {timeout} s")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not available")
+class TestBatchAPI:
+    """Тесты для пакетного эндпоинта."""
+    
+    def setup_method(self):
+        from hedgefarm.service import market_cache
+        market_cache.clear()
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_batch_json_array(self, mock_moex_client):
+        """JSON-массив считается по одному снапшоту и отдается как NDJSON."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        rows = [{"culture": "wheat", "volume": v, "term_months": t} for v in (100, 500) for t in (3, 6, 12)]
+        
+        response = call_with_timeout(lambda: client.post("/price/batch", json=rows))
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        quotes = [json.loads(line) for line in response.text.splitlines()]
+        assert [(q["volume_t"], q["term_m"]) for q in quotes] == [(r["volume"], r["term_months"]) for r in rows]
+        mock_moex_client.get_market_data.assert_awaited_once()
+        
+        # Пакетный результат совпадает с одиночным расчетом
+        single = client.get("/price?culture=wheat&volume=500&term_months=6").json()
+        assert quotes[4]["floor_futures_rubkg"] == single["floor_futures_rubkg"]
+        assert quotes[4]["floor_put_rubkg"] == single["floor_put_rubkg"]
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_batch_uses_pricing_pipeline(self, mock_moex_client):
+        """Пакет считается через pricing_pipeline один раз на срок, с теми же лестницами, что и /price."""
+        from hedgefarm import service
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        rows = [{"culture": "wheat", "volume": v, "term_months": t} for v in (100, 500) for t in (3, 6, 12)]
+        
+        with patch.object(service.pricing_pipeline, "get", wraps=service.pricing_pipeline.get) as pipeline_get:
+            response = call_with_timeout(lambda: client.post("/price/batch", json=rows))
+        
+        assert response.status_code == 200
+        assert sorted(call.args[3] for call in pipeline_get.call_args_list) == [3, 6, 12]
+        snapshot = service.market_store.latest("WHEAT") or service.market_cache.peek("WHEAT")
+        quotes = [json.loads(line) for line in response.text.splitlines()]
+        expected = service.pricing_pipeline.get(snapshot.version, snapshot.market_data, 500, 6).to_quote()
+        assert quotes[4]["floor_put_rubkg"] == pytest.approx(expected.floor_put_rubkg)
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_batch_ndjson_with_invalid_row(self, mock_moex_client):
+        """Ошибочная строка NDJSON не прерывает поток."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        body = "\n".join([
+            json.dumps({"culture": "wheat", "volume": 100, "term_months": 3}),
+            json.dumps({"culture": "corn", "volume": 100}),
+            "",
+            json.dumps({"culture": "wheat", "volume": 200})
+        ])
+        
+        response = call_with_timeout(lambda: client.post(
+            "/price/batch", content=body, headers={"Content-Type": "application/x-ndjson"}
+        ))
+        
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 3
+        assert rows[0]["volume_t"] == 100
+        assert rows[1]["index"] == 1 and "error" in rows[1]
+        assert rows[2]["volume_t"] == 200 and rows[2]["term_m"] == 6
+    
+    @patch('hedgefarm.service.pricing_pipeline')
+    @patch('hedgefarm.service.moex_client')
+    def test_batch_pricing_error_reported_per_row(self, mock_moex_client, mock_pipeline):
+        """Ошибка расчета отдается строкой с ошибкой, а не обрывает поток."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        mock_pipeline.get.side_effect = RuntimeError("pricing failed")
+        rows = [{"culture": "wheat", "volume": 100}, {"culture": "wheat", "volume": 200}]
+        
+        response = call_with_timeout(lambda: client.post("/price/batch", json=rows))
+        
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["index"] for line in lines] == [0, 1]
+        assert all("pricing failed" in line["error"] for line in lines)
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_price_grid_endpoint(self, mock_moex_client):
+        """Сетка отдается целиком и совпадает с /price в узлах."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        
+        grid = client.get("/price/grid").json()
+        single = client.get("/price?culture=wheat&volume=1000&term_months=3").json()
+        
+        i, j = grid["terms"].index(3), grid["volumes"].index(1000)
+        assert grid["floor_futures_rubkg"][i][j] == pytest.approx(single["floor_futures_rubkg"])
+        assert grid["floor_put_rubkg"][i][j] == pytest.approx(single["floor_put_rubkg"])
+        assert grid["recommended"][i][j] == single["recommended"]
+    
+    def test_batch_rejects_non_array(self):
+        """Тело, не являющееся массивом, отклоняется до расчета."""
+        response = client.post("/price/batch", json={"culture": "wheat", "volume": 100})
+        assert response.status_code == 400
+
+
 class TestAPIWithoutFastAPI:
     """Тесты, которые работают без FastAPI."""
     
@@ -202,5 +367,233 @@ class TestAPIWithoutFastAPI:
             assert "pydantic" in str(e).lower()
 
 
+
+@pytest.mark.skipif(not FASTAPI_AVAILABLE, reason="FastAPI not available")
+class TestAnalyticsAPI:
+    """Тесты для аналитических эндпоинтов: греки и распределения."""
+    
+    def setup_method(self):
+        from hedgefarm.service import market_cache, market_store
+        market_cache.clear()
+        market_store.clear()
+    
+    def test_stale_snapshot_flagged(self):
+        """Пока биржа не обновляет данные, цена считается по последнему снапшоту с флагом stale."""
+        from hedgefarm.service import market_cache, market_store
+        market_store.publish("WHEAT", create_market_data())
+        
+        fresh = client.get("/price?culture=wheat&volume=100&term_months=6").json()
+        with patch.object(market_cache, "ttl", 0.0), patch.object(market_cache, "stale_ttl", 0.0):
+            stale = client.get("/price?culture=wheat&volume=100&term_months=6").json()
+        
+        assert fresh["stale"] is False
+        assert stale["stale"] is True
+        assert stale["floor_futures_rubkg"] == fresh["floor_futures_rubkg"]
+    
+    def test_stale_snapshot_flagged_in_batch(self):
+        """Строки /price/batch по устаревшему снапшоту тоже помечаются stale."""
+        from hedgefarm.service import market_cache, market_store
+        market_store.publish("WHEAT", create_market_data())
+        rows = [{"culture": "wheat", "volume": 100}, {"culture": "wheat", "volume": 200, "term_months": 3}]
+        
+        fresh = client.post("/price/batch", json=rows).text.splitlines()
+        with patch.object(market_cache, "ttl", 0.0), patch.object(market_cache, "stale_ttl", 0.0):
+            stale = client.post("/price/batch", json=rows).text.splitlines()
+        
+        assert [json.loads(line)["stale"] for line in fresh] == [False, False]
+        assert [json.loads(line)["stale"] for line in stale] == [True, True]
+    
+    def test_price_etag_not_modified(self):
+        """Повторный запрос с If-None-Match получает 304, тело отдается из кэша ответов."""
+        from hedgefarm.service import market_store, pricing_pipeline, response_cache
+        snapshot = market_store.publish("WHEAT", create_market_data())
+        url = "/price/detailed?culture=wheat&volume=137&term_months=6"
+        
+        first = client.get(url)
+        with patch.object(pricing_pipeline, "get", side_effect=AssertionError("recomputed")):
+            hits = response_cache.hits
+            second = client.get(url)
+            assert response_cache.hits == hits + 1
+            not_modified = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+        
+        assert first.status_code == second.status_code == 200
+        assert first.headers["etag"].startswith(f'"{snapshot.version}-')
+        assert second.content == first.content
+        assert not_modified.status_code == 304
+        assert not_modified.content == b""
+        
+        # Новая версия снапшота - новый ETag и полный ответ
+        market_store.publish("WHEAT", create_market_data(17000.0))
+        changed = client.get(url, headers={"If-None-Match": first.headers["etag"]})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != first.headers["etag"]
+    
+    def test_price_etag_tracks_stale_flag(self):
+        from hedgefarm.service import market_cache, market_store
+        market_store.publish("WHEAT", create_market_data())
+        url = "/price?culture=wheat&volume=100&term_months=6"
+        
+        fresh = client.get(url)
+        with patch.object(market_cache, "ttl", 0.0), patch.object(market_cache, "stale_ttl", 0.0):
+            stale = client.get(url, headers={"If-None-Match": fresh.headers["etag"]})
+        
+        assert fresh.json()["stale"] is False
+        assert stale.status_code == 200
+        assert stale.json()["stale"] is True
+        assert stale.headers["etag"].endswith('-stale"')
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_shared_memory_snapshot(self, mock_moex_client, tmp_path):
+        """С разделяемой памятью воркер считает по версии процесса загрузки и не ходит в ISS."""
+        from hedgefarm import service
+        from hedgefarm.shared import SnapshotSegment, segment_path
+        writer = SnapshotSegment.create(segment_path(tmp_path, "WHEAT"), 1 << 16)
+        
+        with patch.object(service, "shared_root", tmp_path), patch.dict(service._shared_segments, clear=True):
+            assert client.get("/price?culture=wheat&volume=100&term_months=6").status_code == 503
+            writer.publish(1000, create_market_data())
+            price = client.get("/price?culture=wheat&volume=100&term_months=6")
+            health = client.get("/health").json()
+        
+        assert price.status_code == 200
+        assert price.json()["stale"] is False
+        assert health["snapshot_version"] == 1000
+        mock_moex_client.get_market_data.assert_not_called()
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_shared_memory_same_version_refreshes_age(self, mock_moex_client, tmp_path):
+        """Повторная публикация той же версии процессом загрузки обновляет возраст снапшота воркера."""
+        from hedgefarm import service
+        from hedgefarm.shared import SnapshotSegment, segment_path
+        writer = SnapshotSegment.create(segment_path(tmp_path, "WHEAT"), 1 << 16)
+        
+        with patch.object(service, "shared_root", tmp_path), patch.dict(service._shared_segments, clear=True), \
+                patch.dict(service._shared_published, clear=True):
+            writer.publish(1000, create_market_data())
+            assert client.get("/price?culture=wheat&volume=100&term_months=6").status_code == 200
+            # Снапшот воркера состарился: опросов не было
+            old = service.market_store.latest("WHEAT")
+            service.market_store.publish("WHEAT", old.market_data, version=1000, fetched_at=time.monotonic() - 100.0)
+            stale = client.get("/price?culture=wheat&volume=100&term_months=6").json()
+            writer.publish(1000, create_market_data())
+            fresh = client.get("/price?culture=wheat&volume=100&term_months=6").json()
+        
+        assert stale["stale"] is True
+        assert fresh["stale"] is False
+        assert service.market_store.latest("WHEAT").market_data is old.market_data
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_no_snapshot_unavailable(self, mock_moex_client):
+        """Без единого успешного снапшота ответ 503, а не выдуманная цена."""
+        mock_moex_client.get_market_data = AsyncMock(side_effect=RuntimeError("ISS unavailable"))
+        
+        response = client.get("/price?culture=wheat&volume=100&term_months=6")
+        
+        assert response.status_code == 503
+    
+    @pytest.mark.parametrize("method,url,body", [
+        ("GET", "/price/grid?culture=wheat", None),
+        ("GET", "/price/distribution?culture=wheat&volume=100&term_months=6", None),
+        ("GET", "/price/greeks?culture=wheat&term_months=6", None),
+        ("GET", "/risk/greeks?culture=wheat", None),
+        ("POST", "/quotes", {"culture": "wheat", "volume": 100, "term_months": 6}),
+        ("POST", "/price/batch", [{"culture": "wheat", "volume": 100, "term_months": 6}]),
+    ])
+    @patch('hedgefarm.service.moex_client')
+    def test_no_snapshot_unavailable_everywhere(self, mock_moex_client, method, url, body):
+        """503 без снапшота не превращается в 500 в остальных эндпоинтах."""
+        mock_moex_client.get_market_data = AsyncMock(side_effect=RuntimeError("ISS unavailable"))
+        
+        response = client.request(method, url, json=body)
+        
+        assert response.status_code == 503
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_chain_greeks(self, mock_moex_client):
+        """Греки отдаются для каждого страйка и для лестницы."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        
+        response = client.get("/price/greeks?culture=wheat&term_months=6")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["chain"]["delta"]) == len(data["strikes"]) == 5
+        assert all(-1.0 <= d <= 0.0 for d in data["chain"]["delta"])
+        assert set(data["ladder"]) >= {"delta", "gamma", "vega", "theta", "rho"}
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_price_distribution(self, mock_moex_client):
+        """Распределение отдается по всем стратегиям и воспроизводимо по seed."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        url = "/price/distribution?culture=wheat&volume=1000&term_months=6&n_paths=20000&seed=7"
+        
+        response = client.get(url)
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert set(data["strategies"]) == {"futures", "put", "put_ladder", "forward", "unhedged"}
+        assert data["strategies"] == client.get(url).json()["strategies"]
+        quantiles = list(data["strategies"]["put"]["quantiles_rubkg"].values())
+        assert quantiles == sorted(quantiles)
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_quote_exceeding_capital_reserve(self, mock_moex_client):
+        """Котировка, капитал под которую превышает резерв, отклоняется."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        
+        ok = client.get("/price?culture=wheat&volume=1000&term_months=6")
+        too_large = client.get("/price?culture=wheat&volume=5000000&term_months=6")
+        batch = call_with_timeout(lambda: client.post("/price/batch", json=[
+            {"culture": "wheat", "volume": 1000, "term_months": 6},
+            {"culture": "wheat", "volume": 5000000, "term_months": 6}
+        ]))
+        
+        assert ok.status_code == 200
+        assert too_large.status_code == 422
+        lines = [json.loads(line) for line in batch.text.splitlines()]
+        assert "floor_put_rubkg" in lines[0]
+        assert lines[1]["index"] == 1 and "capital" in lines[1]["error"]
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_issue_and_release_quote(self, mock_moex_client):
+        """Выдача гарантии резервирует капитал, отмена его освобождает."""
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        
+        issued = client.post("/quotes", json={"culture": "wheat", "volume": 1000, "term_months": 6})
+        assert issued.status_code == 200
+        quote_id = issued.json()["quote_id"]
+        try:
+            assert issued.json()["marginal_capital"] > 0
+            book = client.get("/risk/book").json()
+            assert book["quotes"] == 1
+            assert book["net_exposure"] == pytest.approx(1000 * 16500.0)
+            assert client.get("/risk/greeks?culture=wheat").json()["positions"] == 1
+        finally:
+            assert client.delete(f"/quotes/{quote_id}").status_code == 200
+        
+        assert client.get("/risk/book").json()["quotes"] == 0
+        assert client.delete(f"/quotes/{quote_id}").status_code == 404
+        rejected = client.post("/quotes", json={"culture": "wheat", "volume": 5000000, "term_months": 6})
+        assert rejected.status_code == 422
+    
+    @patch('hedgefarm.service.moex_client')
+    def test_book_greeks(self, mock_moex_client):
+        """Греки книги суммируются по выданным гарантиям."""
+        from datetime import datetime, timedelta
+        from hedgefarm.pricing.greeks import BookPosition
+        from hedgefarm.service import quote_book
+        mock_moex_client.get_market_data = AsyncMock(return_value=create_market_data())
+        quote_book.add(BookPosition("test-1", 16000.0, datetime.utcnow() + timedelta(days=180), -500.0))
+        
+        try:
+            response = client.get("/risk/greeks?culture=wheat")
+        finally:
+            quote_book.remove("test-1")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["positions"] == 1
+        assert data["delta"] > 0
+
 if __name__ == "__main__":
     pytest.main([__file__])
\ No newline at end of file
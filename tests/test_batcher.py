@@ -0,0 +1,140 @@
+"""Тесты для микро-пакетирования запросов."""
+
+import asyncio
+import json
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.batcher import MicroBatcher
+from hedgefarm.config import PricingParams
+from hedgefarm.models import FuturesQuote, MarketData, OptionQuote
+
+
+def create_market_data(futures_price: float = 16500.0) -> MarketData:
+    return MarketData(
+        futures_quote=FuturesQuote(symbol="WHEAT", price=futures_price, volume=1000,
+                                   updated_at="2024-01-15T12:00:00Z"),
+        put_options=[
+            OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=futures_price * k, premium=300.0,
+                        option_type="P", expiry="2024-06-15", implied_vol=0.25)
+            for k in [0.95, 0.97, 1.0, 1.03, 1.05]
+        ],
+        usd_rate=95.0,
+        volatility=0.25
+    )
+
+
+class TestMicroBatcher:
+    """Тесты для MicroBatcher."""
+
+    def test_window_collects_concurrent_requests(self):
+        handler = Mock(side_effect=lambda items: [item * 10 for item in items])
+
+        async def scenario():
+            batcher = MicroBatcher(handler, max_batch=64, max_wait=0.01)
+            return batcher, await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        batcher, results = asyncio.run(scenario())
+        assert results == [0, 10, 20, 30, 40]
+        handler.assert_called_once_with([0, 1, 2, 3, 4])
+        assert batcher.stats.as_dict() == {"batches": 1, "items": 5, "largest": 5, "mean_size": 5.0}
+
+    def test_full_batch_flushed_without_waiting(self):
+        handler = Mock(side_effect=lambda items: list(items))
+
+        async def scenario():
+            batcher = MicroBatcher(handler, max_batch=4, max_wait=10.0)
+            start = time.monotonic()
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(8)))
+            return results, time.monotonic() - start
+
+        results, elapsed = asyncio.run(scenario())
+        assert results == list(range(8))
+        assert handler.call_count == 2
+        assert elapsed < 1.0
+
+    def test_item_error_only_fails_its_request(self):
+        def handler(items):
+            return [ValueError("bad") if item < 0 else item for item in items]
+
+        async def scenario():
+            batcher = MicroBatcher(handler, max_wait=0.001)
+            return await asyncio.gather(batcher.submit(1), batcher.submit(-1), return_exceptions=True)
+
+        good, bad = asyncio.run(scenario())
+        assert good == 1
+        assert isinstance(bad, ValueError)
+
+    def test_handler_error_fails_whole_batch(self):
+        async def scenario():
+            batcher = MicroBatcher(Mock(side_effect=RuntimeError("boom")), max_wait=0.001)
+            return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in asyncio.run(scenario()))
+
+    def test_cancelled_request_skipped(self):
+        handler = Mock(side_effect=lambda items: list(items))
+
+        async def scenario():
+            batcher = MicroBatcher(handler, max_wait=0.01)
+            cancelled = asyncio.create_task(batcher.submit(1))
+            kept = asyncio.create_task(batcher.submit(2))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            return await kept
+
+        assert asyncio.run(scenario()) == 2
+        handler.assert_called_once_with([2])
+
+
+class TestServiceBatching:
+    """Тесты для пакетного расчета /price в сервисе."""
+
+    def setup_method(self):
+        from hedgefarm.service import market_cache, market_store, pricing_pipeline
+        market_cache.clear()
+        market_store.clear()
+        pricing_pipeline.clear()
+
+    def test_quote_batch_matches_single_quotes(self):
+        """Пакет дает те же котировки, что и расчет по одному, считая раз на срок."""
+        from hedgefarm import service
+        snapshot = service.market_store.publish("WHEAT", create_market_data())
+        items = [(snapshot, 137, 6), (snapshot, 420, 6), (snapshot, 137, 3), (snapshot, 99, 6)]
+
+        with patch.object(service, "quote_for", wraps=service.quote_for) as quote_for:
+            batched = service.quote_batch(items)
+        assert quote_for.call_count == 2
+
+        for (_, volume, term), quote in zip(items, batched):
+            single = service.quote_for(snapshot, volume, term)
+            assert quote.volume_t == volume and quote.term_m == term
+            assert quote.model_dump(exclude={"calculated_at"}) == single.model_dump(exclude={"calculated_at"})
+
+    def test_concurrent_prices_batched(self):
+        from hedgefarm import service
+        params = PricingParams.from_dict({"batching": {"enabled": True}})
+        service.market_store.publish("WHEAT", create_market_data())
+        batches = service.price_batcher.stats.batches
+
+        async def scenario():
+            return await asyncio.gather(*(service.get_price(culture="wheat", volume=volume, term_months=6,
+                                                            if_none_match=None)
+                                          for volume in (137, 420, 999)))
+
+        with patch.object(service, "get_params", return_value=params):
+            responses = asyncio.run(scenario())
+
+        assert [json.loads(response.body)["volume_t"] for response in responses] == [137, 420, 999]
+        assert service.price_batcher.stats.batches == batches + 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
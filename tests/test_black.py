@@ -0,0 +1,89 @@
+"""Тесты для векторизованных моделей Блэка-Шоулза и Блэка-76."""
+
+import math
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.pricing.black import black_scholes, black76
+from hedgefarm.pricing.options import black_scholes_put
+
+
+def reference_put(S, K, T, r, sigma):
+    """Эталонная скалярная формула PUT."""
+    d1 = (math.log(S / K) + (r + 0.5 * sigma ** 2) * T) / (sigma * math.sqrt(T))
+    d2 = d1 - sigma * math.sqrt(T)
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    return K * math.exp(-r * T) * cdf(-d2) - S * cdf(-d1)
+
+
+class TestBlackModels:
+    """Тесты для векторизованного ядра ценообразования опционов."""
+
+    def test_matches_scalar_formula(self):
+        """Векторное ядро совпадает со скалярной формулой."""
+        strikes = np.array([15000.0, 16000.0, 16500.0, 17000.0])
+        values = black_scholes(16500.0, strikes, 0.5, 0.15, 0.25)
+
+        for strike, premium in zip(strikes, values.premium):
+            assert premium == pytest.approx(reference_put(16500.0, strike, 0.5, 0.15, 0.25), rel=1e-10)
+        assert black_scholes_put(16500.0, 16000.0, 0.5, 0.15, 0.25) == pytest.approx(values.premium[1])
+
+    def test_broadcast_strike_by_term(self):
+        """Сетка страйк x срок считается одним вызовом."""
+        strikes = np.linspace(14000, 19000, 11)
+        terms = np.arange(1, 13) / 12.0
+        values = black76(16500.0, strikes[:, None], terms[None, :], 0.15, 0.25)
+
+        assert values.premium.shape == (11, 12)
+        assert values.delta.shape == (11, 12)
+        # PUT дороже при большем страйке
+        assert np.all(np.diff(values.premium, axis=0) > 0)
+
+    def test_put_call_parity(self):
+        """Паритет put-call для Блэка-76: C - P = df * (F - K)."""
+        F, K, T, r, sigma = 16500.0, np.array([15000.0, 17000.0]), 0.75, 0.15, 0.3
+        call = black76(F, K, T, r, sigma, "C").premium
+        put = black76(F, K, T, r, sigma, "P").premium
+        np.testing.assert_allclose(call - put, math.exp(-r * T) * (F - K))
+
+    @pytest.mark.parametrize("model", [black_scholes, black76])
+    @pytest.mark.parametrize("option_type", ["P", "C"])
+    def test_greeks_match_finite_differences(self, model, option_type):
+        """Аналитические греки совпадают с конечными разностями."""
+        base = {"underlying": 16500.0, "T": 0.5, "r": 0.15, "sigma": 0.25}
+        h = 1e-4
+
+        def price(**bumps):
+            args = {key: value + bumps.get(key, 0.0) for key, value in base.items()}
+            return model(args["underlying"], 16000.0, args["T"], args["r"], args["sigma"], option_type).premium
+
+        def diff(key, step=h):
+            return (price(**{key: step}) - price(**{key: -step})) / (2 * step)
+
+        values = model(base["underlying"], 16000.0, base["T"], base["r"], base["sigma"], option_type)
+
+        assert values.delta == pytest.approx(diff("underlying"), rel=1e-4)
+        assert values.gamma == pytest.approx(price(underlying=1.0) - 2 * price() + price(underlying=-1.0), rel=1e-3)
+        assert values.vega == pytest.approx(diff("sigma"), rel=1e-4)
+        assert values.theta == pytest.approx(-diff("T"), rel=1e-4)
+        assert values.rho == pytest.approx(diff("r"), rel=1e-4)
+
+    def test_expired_option_is_intrinsic(self):
+        """При нулевом сроке остается внутренняя стоимость."""
+        values = black_scholes(15000.0, np.array([16000.0, 14000.0]), 0.0, 0.15, 0.25)
+        np.testing.assert_allclose(values.premium, [1000.0, 0.0])
+        assert np.all(np.isfinite(values.gamma))
+
+    def test_unknown_option_type(self):
+        """Неизвестный тип опциона отклоняется."""
+        with pytest.raises(ValueError, match="Unknown option type"):
+            black76(16500.0, 16000.0, 0.5, 0.15, 0.25, "X")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,97 @@
+"""Тесты для автомата отключения эндпоинтов ISS."""
+
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestCircuitBreaker:
+    """Тесты для CircuitBreaker."""
+
+    def create_breaker(self, **kwargs):
+        clock = FakeClock()
+        return CircuitBreaker(clock=clock, **kwargs), clock
+
+    def test_opens_after_threshold(self):
+        """После failure_threshold ошибок подряд запросы не пропускаются."""
+        breaker, _ = self.create_breaker(failure_threshold=3)
+        for _ in range(2):
+            assert breaker.allow()
+            breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+    def test_success_resets_failures(self):
+        """Успешный ответ обнуляет счетчик ошибок."""
+        breaker, _ = self.create_breaker(failure_threshold=2)
+        breaker.record_failure()
+        breaker.record_success(0.1)
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_single_probe(self):
+        """После reset_timeout пропускается один пробный запрос."""
+        breaker, clock = self.create_breaker(failure_threshold=1, reset_timeout=5.0)
+        breaker.record_failure()
+        clock.now = 4.9
+        assert not breaker.allow()
+        clock.now = 5.0
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        clock.now = 10.0
+        assert breaker.allow()
+        breaker.record_success(0.2)
+        assert breaker.state == CLOSED
+        assert breaker.allow()
+
+    def test_released_probe_can_retry(self):
+        """Отмененный пробный запрос не блокирует автомат в half_open."""
+        breaker, clock = self.create_breaker(failure_threshold=1, reset_timeout=1.0)
+        breaker.record_failure()
+        clock.now = 1.0
+        assert breaker.allow()
+        breaker.release()
+        assert breaker.allow()
+
+    def test_adaptive_timeout(self):
+        """Таймаут следует за задержкой, удваивается на таймаутах и ограничен сверху."""
+        breaker, _ = self.create_breaker(failure_threshold=100, min_timeout=0.5, max_timeout=10.0)
+        assert breaker.timeout == 10.0
+        for _ in range(50):
+            breaker.record_success(0.2)
+        assert breaker.timeout == pytest.approx(0.5)
+        for _ in range(50):
+            breaker.record_success(1.0)
+        assert 1.0 <= breaker.timeout < 1.5
+
+        base = breaker.timeout
+        breaker.record_failure(timed_out=True)
+        assert breaker.timeout == pytest.approx(2 * base)
+        for _ in range(10):
+            breaker.record_failure(timed_out=True)
+        assert breaker.timeout == 10.0
+        breaker.record_success(1.0)
+        assert breaker.timeout < 1.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
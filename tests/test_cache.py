@@ -0,0 +1,120 @@
+"""Тесты для кэша снапшотов рыночных данных."""
+
+import asyncio
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.cache import SnapshotCache
+
+
+class TestSnapshotCache:
+    """Тесты для TTL-кэша с объединением запросов."""
+
+    def create_cache(self, ttl: float = 60.0, stale_ttl: float = 60.0, delay: float = 0.0):
+        """Создает кэш со счетчиком обращений к источнику."""
+        calls = []
+
+        async def fetch(symbol: str):
+            calls.append(symbol)
+            await asyncio.sleep(delay)
+            return {"symbol": symbol, "call": len(calls)}
+
+        return SnapshotCache(fetch, ttl=ttl, stale_ttl=stale_ttl), calls
+
+    def test_hit_after_miss(self):
+        """Повторное обращение в пределах TTL не идет к бирже."""
+        cache, calls = self.create_cache()
+
+        async def run():
+            first = await cache.get("WHEAT")
+            second = await cache.get("WHEAT")
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first is second
+        assert first.version == 1
+        assert calls == ["WHEAT"]
+        assert cache.stats.misses == 1
+        assert cache.stats.hits == 1
+
+    def test_concurrent_misses_coalesced(self):
+        """Одновременные промахи объединяются в один запрос."""
+        cache, calls = self.create_cache(delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*[cache.get("WHEAT") for _ in range(50)])
+
+        snapshots = asyncio.run(run())
+        assert len(calls) == 1
+        assert all(s is snapshots[0] for s in snapshots)
+        assert cache.stats.misses == 1
+        assert cache.stats.coalesced == 49
+
+    def test_stale_while_revalidate(self):
+        """Устаревший снапшот отдается сразу, обновление идет в фоне."""
+        cache, calls = self.create_cache(ttl=0.0, stale_ttl=60.0)
+
+        async def run():
+            first = await cache.get("WHEAT")
+            stale = await cache.get("WHEAT")
+            await asyncio.sleep(0.01)
+            return first, stale, cache.peek("WHEAT")
+
+        first, stale, refreshed = asyncio.run(run())
+        assert stale is first
+        assert refreshed.version == 2
+        assert len(calls) == 2
+        assert cache.stats.stale_hits == 1
+
+    def test_expired_entry_refetched(self):
+        """Снапшот старше ttl + stale_ttl запрашивается заново."""
+        cache, calls = self.create_cache(ttl=0.0, stale_ttl=0.0)
+
+        async def run():
+            await cache.get("WHEAT")
+            return await cache.get("WHEAT")
+
+        snapshot = asyncio.run(run())
+        assert snapshot.version == 2
+        assert cache.stats.misses == 2
+
+    def test_fetch_error_returns_last_good(self):
+        """При ошибке обновления отдается последний успешный снапшот."""
+        fail = []
+
+        async def fetch(symbol: str):
+            if fail:
+                raise RuntimeError("ISS unavailable")
+            return {"symbol": symbol}
+
+        cache = SnapshotCache(fetch, ttl=0.0, stale_ttl=0.0)
+
+        async def run():
+            first = await cache.get("WHEAT")
+            fail.append(True)
+            return first, await cache.get("WHEAT")
+
+        first, second = asyncio.run(run())
+        assert second is first
+        assert cache.is_stale(second)
+        assert cache.stats.fallbacks == 1
+        assert cache.stats.errors == 1
+
+    def test_fetch_error_propagates(self):
+        """Ошибка источника передается всем ожидающим и учитывается."""
+        async def fetch(symbol: str):
+            raise RuntimeError("ISS unavailable")
+
+        cache = SnapshotCache(fetch)
+
+        with pytest.raises(RuntimeError, match="ISS unavailable"):
+            asyncio.run(cache.get("WHEAT"))
+        assert cache.stats.errors == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
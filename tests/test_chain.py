@@ -0,0 +1,107 @@
+"""Тесты для цепочки опционов на массивах."""
+
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.chain import OptionChain, as_chain, mid_premium
+from hedgefarm.models import FuturesQuote, MarketData, OptionQuote
+from hedgefarm.pricing.options import create_ladder_strikes, select_optimal_strike
+
+
+def create_quotes():
+    return [OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=k, premium=0.02 * k, option_type="P",
+                        expiry="2024-06-15", implied_vol=0.25 if k != 16000.0 else None)
+            for k in (17000.0, 15500.0, 16500.0, 16000.0, 18000.0, 15000.0)]
+
+
+class TestOptionChain:
+    """Тесты для OptionChain."""
+
+    def test_sorted_by_strike(self):
+        """Колонки упорядочены по страйку и доступны только для чтения."""
+        chain = as_chain(create_quotes())
+        assert chain.strike.tolist() == [15000.0, 15500.0, 16000.0, 16500.0, 17000.0, 18000.0]
+        assert chain.symbol[0] == "WHEAT_15000_P"
+        assert np.isnan(chain.implied_vol[2])
+        with pytest.raises(ValueError):
+            chain.strike[0] = 1.0
+
+    def test_round_trip_quotes(self):
+        """Опционы из цепочки совпадают с исходными OptionQuote."""
+        quotes = sorted(create_quotes(), key=lambda quote: quote.strike)
+        chain = as_chain(quotes)
+        assert list(chain) == quotes
+        assert chain[-1] == quotes[-1]
+        assert chain[1:3] == quotes[1:3]
+
+    @pytest.mark.parametrize("price", [14000.0, 15250.0, 15600.0, 16250.0, 17500.0, 19000.0])
+    def test_nearest_matches_linear_scan(self, price):
+        """Бинарный поиск дает тот же страйк, что и перебор (при равенстве - меньший)."""
+        quotes = create_quotes()
+        expected = min(sorted(quotes, key=lambda quote: quote.strike),
+                       key=lambda quote: abs(quote.strike - price))
+        assert select_optimal_strike(price, as_chain(quotes)) == expected
+
+    def test_ladder_same_for_list_and_chain(self):
+        """Лестница по цепочке совпадает с лестницей по списку."""
+        quotes = create_quotes()
+        assert create_ladder_strikes(16400.0, as_chain(quotes)) == create_ladder_strikes(16400.0, quotes)
+
+    def test_filters(self):
+        """Отбор PUT и экспирации сохраняет порядок по страйку."""
+        chain = OptionChain(
+            symbol=["a", "b", "c", "d"],
+            strike=[16000.0, 15000.0, 16500.0, 15500.0],
+            premium=[1.0, 2.0, 3.0, 4.0],
+            expiry=["2024-03-15", "2024-06-15", "2024-03-15", "2024-03-15"],
+            is_call=[False, False, True, False]
+        )
+        puts = chain.puts().for_expiry("2024-03-15")
+        assert puts.symbol.tolist() == ["d", "a"]
+        assert puts.needs_model().all()
+
+    def test_for_date_and_years_to_expiry(self):
+        """Серия под дату - ближайшая экспирация; срок - от даты оценки до экспирации серии."""
+        chain = OptionChain(
+            symbol=["a", "b", "c"],
+            strike=[16000.0, 16000.0, 16500.0],
+            premium=[1.0, 2.0, 3.0],
+            expiry=["2024-03-15", "2024-09-15", "2024-03-15"],
+            is_call=[False, False, False]
+        )
+        assert chain.for_date(date(2024, 4, 1)).symbol.tolist() == ["a", "c"]
+        assert chain.for_date(date(2024, 8, 1)).symbol.tolist() == ["b"]
+        np.testing.assert_allclose(chain.years_to_expiry(date(2024, 3, 1)), np.array([14, 198, 14]) / 365.0)
+        single = chain.for_expiry("2024-03-15")
+        assert single.for_date(date(2025, 1, 1)) is single
+
+    def test_mid_premium(self):
+        """Премия: LAST, иначе середина спреда, иначе расчетная цена, иначе 0."""
+        nan = np.nan
+        premium = mid_premium(np.array([nan, 10.0, nan, nan]), np.array([nan, 12.0, nan, nan]),
+                              np.array([5.0, nan, nan, nan]), np.array([7.0, 7.0, 8.0, nan]))
+        assert premium.tolist() == [5.0, 11.0, 8.0, 0.0]
+
+    def test_market_data_holds_chain(self):
+        """MarketData хранит цепочку и сериализует ее списком опционов."""
+        market_data = MarketData(
+            futures_quote=FuturesQuote(symbol="WHEAT", price=16500.0, volume=1000, updated_at=datetime(2024, 1, 10)),
+            put_options=create_quotes(),
+            usd_rate=95.0,
+            volatility=0.25
+        )
+        assert isinstance(market_data.put_options, OptionChain)
+        dumped = market_data.model_dump()["put_options"]
+        assert [option["strike"] for option in dumped] == market_data.put_options.strike.tolist()
+        assert MarketData.model_validate(market_data.model_dump()).put_options == market_data.put_options
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
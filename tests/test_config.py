@@ -0,0 +1,119 @@
+"""Тесты для загрузки параметров ценообразования."""
+
+import dataclasses
+import os
+import pytest
+import sys
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.config import ConfigLoader, PricingParams, get_params
+
+
+class TestConfigLoader:
+    """Тесты для загрузчика конфигурации с перезагрузкой по mtime."""
+
+    def write_config(self, path, basis: int, mtime: float):
+        path.write_text(f"basis_discount: {basis}\nfee_pct:\n  put: 0.02\n", encoding="utf-8")
+        os.utime(path, (mtime, mtime))
+
+    def test_defaults_merged(self, tmp_path):
+        """Отсутствующие в файле ключи берутся из значений по умолчанию."""
+        path = tmp_path / "settings.yaml"
+        self.write_config(path, 1500, 1000.0)
+
+        params = ConfigLoader(path, check_interval=0.0).get()
+
+        assert params.basis_discount == 1500.0
+        assert params.fee_pct.put == 0.02
+        assert params.fee_pct.futures == 0.008
+        assert params.risk.capital_reserve == 50000000
+
+    def test_reload_only_on_mtime_change(self, tmp_path):
+        """Файл перечитывается только после изменения mtime."""
+        path = tmp_path / "settings.yaml"
+        self.write_config(path, 1500, 1000.0)
+        loader = ConfigLoader(path, check_interval=0.0)
+
+        first = loader.get()
+        assert loader.get() is first
+
+        self.write_config(path, 1700, 2000.0)
+        second = loader.get()
+
+        assert second is not first
+        assert second.basis_discount == 1700.0
+        assert second.version == first.version + 1
+
+    def test_check_interval_skips_stat(self, tmp_path):
+        """В пределах check_interval изменения файла не проверяются."""
+        path = tmp_path / "settings.yaml"
+        self.write_config(path, 1500, 1000.0)
+        loader = ConfigLoader(path, check_interval=3600.0)
+
+        first = loader.get()
+        self.write_config(path, 1700, 2000.0)
+
+        assert loader.get() is first
+
+    def test_broken_file_keeps_previous(self, tmp_path):
+        """Поврежденный файл не подменяет последние корректные параметры."""
+        path = tmp_path / "settings.yaml"
+        self.write_config(path, 1500, 1000.0)
+        loader = ConfigLoader(path, check_interval=0.0)
+        first = loader.get()
+
+        path.write_text("basis_discount: [", encoding="utf-8")
+        os.utime(path, (2000.0, 2000.0))
+
+        assert loader.get() is first
+
+    @pytest.mark.parametrize("content", [
+        "go_pct: abc\n",
+        "fee_pct: 0.01\n",
+        "risk:\n  capital_reserve: [1, 2]\n",
+        "ladder:\n  optimize: maybe\n",
+        "volatility:\n  estimator: magic\n",
+        "circuit_breaker:\n  min_timeout_s: 20.0\n",
+        "shared_snapshot:\n  path: 1\n",
+        "batching:\n  max_batch: 0\n",
+        "response_cache:\n  max_bytes: -1\n",
+    ])
+    def test_invalid_values_keep_previous(self, tmp_path, content):
+        """Неверный тип значения или секции не ломает get() и не подменяет параметры."""
+        path = tmp_path / "settings.yaml"
+        self.write_config(path, 1500, 1000.0)
+        loader = ConfigLoader(path, check_interval=0.0)
+        first = loader.get()
+
+        path.write_text(content, encoding="utf-8")
+        os.utime(path, (2000.0, 2000.0))
+
+        assert loader.get() is first
+        assert loader.get() is first
+
+    def test_invalid_values_on_first_load_use_defaults(self, tmp_path):
+        """Некорректный файл при первой загрузке дает значения по умолчанию."""
+        path = tmp_path / "settings.yaml"
+        path.write_text("go_pct: abc\n", encoding="utf-8")
+
+        params = ConfigLoader(path, check_interval=0.0).get()
+
+        assert params.go_pct == 0.10
+
+    def test_missing_file_uses_defaults(self, tmp_path):
+        """Без файла используются значения по умолчанию."""
+        params = ConfigLoader(tmp_path / "missing.yaml").get()
+        assert params.basis_discount == 1600.0
+
+    def test_params_are_frozen(self):
+        """Параметры нельзя изменить на месте."""
+        params = get_params()
+        assert isinstance(params, PricingParams)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            params.go_pct = 0.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
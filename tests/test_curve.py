@@ -0,0 +1,127 @@
+"""Тесты для кривой фьючерсов."""
+
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.models import FuturesContract, FuturesQuote, MarketData, OptionQuote
+from hedgefarm.pricing.aggregator import calculate_all_prices
+from hedgefarm.pricing.curve import FuturesCurve, term_futures_price, term_options
+from hedgefarm.pricing.grid import build_grid
+from hedgefarm.pricing.pipeline import run_pipeline
+
+TODAY = date(2024, 1, 10)
+
+
+def create_two_expiry_market_data():
+    """Доска с ближней (60 дней) и дальней (240 дней) экспирацией разной стоимости."""
+    market_data = create_market_data()
+    options = [OptionQuote(symbol=f"WHEAT_{k:.0f}_P_{days}", strike=k, premium=premium, option_type="P",
+                           expiry=str(TODAY + timedelta(days=days)), implied_vol=0.25)
+               for days, premium in ((60, 150.0), (240, 450.0)) for k in (15500.0, 16000.0, 16500.0)]
+    return market_data.model_copy(update={"put_options": options})
+
+
+def create_market_data(curve=True):
+    contracts = [
+        FuturesContract(secid="WHH4", expiry=TODAY + timedelta(days=60), price=16500.0),
+        FuturesContract(secid="WHU4", expiry=TODAY + timedelta(days=240), price=17400.0),
+        FuturesContract(secid="WHM4", expiry=TODAY + timedelta(days=150), price=17000.0),
+    ]
+    options = [OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=k, premium=300.0, option_type="P",
+                           expiry="2024-06-15", implied_vol=0.25) for k in (15500.0, 16000.0, 16500.0)]
+    return MarketData(
+        futures_quote=FuturesQuote(symbol="WHEAT", price=16500.0, volume=1000,
+                                   updated_at=datetime.combine(TODAY, datetime.min.time())),
+        put_options=options,
+        usd_rate=95.0,
+        volatility=0.25,
+        futures_curve=contracts if curve else []
+    )
+
+
+class TestFuturesCurve:
+    """Тесты для поиска серии под срок."""
+
+    def test_listed_expiries_and_carry_interpolation(self):
+        """На экспирациях - цены серий, между ними - постоянная ставка carry."""
+        curve = FuturesCurve(np.array([60.0, 240.0, 150.0]), np.array([16500.0, 17400.0, 17000.0]))
+
+        assert curve.price(2) == pytest.approx(16500.0)
+        assert curve.price(5) == pytest.approx(17000.0)
+        # 105 дней - середина между 60 и 150: геометрическое среднее цен
+        assert curve.price(3.5) == pytest.approx(np.sqrt(16500.0 * 17000.0))
+
+    def test_flat_outside_listed_range(self):
+        curve = FuturesCurve(np.array([60.0, 150.0]), np.array([16500.0, 17000.0]))
+        assert curve.price(1) == pytest.approx(16500.0)
+        assert curve.price(12) == pytest.approx(17000.0)
+        assert FuturesCurve(np.array([60.0]), np.array([16500.0])).price(12) == 16500.0
+
+    def test_vectorized_matches_scalar(self):
+        curve = FuturesCurve.from_contracts(create_market_data().futures_curve, TODAY)
+        terms = np.arange(1, 13)
+
+        np.testing.assert_allclose(curve.price(terms), [curve.price(int(t)) for t in terms])
+
+    def test_without_curve_uses_quote(self):
+        market_data = create_market_data(curve=False)
+        assert term_futures_price(market_data, 12) == 16500.0
+        np.testing.assert_array_equal(term_futures_price(market_data, np.array([3, 6])), [16500.0, 16500.0])
+
+
+class TestCurvePricing:
+    """Тесты для использования кривой в расчете."""
+
+    def test_term_changes_futures_floor(self):
+        """3- и 12-месячный хедж считаются по разным сериям; опционы - по базовому активу."""
+        market_data = create_market_data()
+        short = run_pipeline(market_data, 1000, 3)
+        long = run_pipeline(market_data, 1000, 8)
+
+        assert short.contract_price < long.contract_price == pytest.approx(17400.0)
+        assert long.mgp_futures - short.mgp_futures > 0.5
+        assert short.futures_price == long.futures_price == 16500.0
+
+    def test_paths_agree(self):
+        """Конвейер, агрегатор и сетка дают одинаковые MGP при кривой."""
+        market_data = create_market_data()
+        grid = build_grid(market_data, terms=[3, 8], volumes=[1000], snapshot_version=1)
+
+        for i, term in enumerate([3, 8]):
+            quote = calculate_all_prices(market_data, 1000, term)
+            result = run_pipeline(market_data, 1000, term)
+            assert quote.floor_futures_rubkg == pytest.approx(result.mgp_futures)
+            assert quote.floor_forward_rubkg == pytest.approx(result.mgp_forward)
+            assert grid.floor_futures[i, 0] == pytest.approx(result.mgp_futures)
+            assert grid.floor_forward[i, 0] == pytest.approx(result.mgp_forward)
+
+
+    def test_term_options_pick_matching_expiry(self):
+        """Каждый срок берет опционы экспирации, ближайшей к дате окончания хеджа."""
+        market_data = create_two_expiry_market_data()
+        assert set(term_options(market_data, 2).premium) == {150.0}
+        assert set(term_options(market_data, 8).premium) == {450.0}
+
+    def test_paths_agree_per_expiry(self):
+        """Конвейер, агрегатор и сетка считают короткий и длинный срок по разным сериям."""
+        market_data = create_two_expiry_market_data()
+        grid = build_grid(market_data, terms=[2, 8], volumes=[1000], snapshot_version=1)
+
+        for i, term in enumerate([2, 8]):
+            quote = calculate_all_prices(market_data, 1000, term)
+            result = run_pipeline(market_data, 1000, term)
+            assert quote.floor_put_rubkg == pytest.approx(result.to_quote().floor_put_rubkg)
+            assert grid.floor_put[i, 0] == pytest.approx(result.mgp_put)
+            assert grid.floor_put_ladder[i, 0] == pytest.approx(result.mgp_put_ladder)
+        assert grid.floor_put[0, 0] > grid.floor_put[1, 0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,308 @@
+"""Тесты для клиентов Московской биржи."""
+
+import asyncio
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+import sys
+import os
+
+import httpx
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.breaker import CircuitOpenError
+from hedgefarm.chain import OptionChain
+from hedgefarm.datasources import AsyncMOEXClient
+
+
+def make_curve_response(today: date) -> dict:
+    """Формирует ответ ISS securities + marketdata с тремя сериями пшеницы и одной чужой."""
+    securities = {
+        "columns": ["SECID", "ASSETCODE", "LASTTRADEDATE", "PREVSETTLEPRICE"],
+        "data": [
+            ["WHZ0", "WHEAT", (today + timedelta(days=200)).isoformat(), 17600.0],
+            ["WHH0", "WHEAT", (today + timedelta(days=20)).isoformat(), 16900.0],
+            ["WHU9", "WHEAT", (today - timedelta(days=5)).isoformat(), 16000.0],
+            ["WHM0", "WHEAT", (today + timedelta(days=110)).isoformat(), 17200.0],
+            ["SiH0", "Si", (today + timedelta(days=20)).isoformat(), 95000.0],
+        ]
+    }
+    marketdata = {
+        "columns": ["SECID", "LAST", "SETTLEPRICE"],
+        "data": [["WHH0", 17000.0, 16950.0], ["WHM0", None, 17300.0], ["WHZ0", None, None]]
+    }
+    return {"securities": securities, "marketdata": marketdata}
+
+
+def make_board_response(today: date) -> dict:
+    """Формирует ответ ISS по опционной доске: две экспирации, PUT и CALL, одна истекшая серия."""
+    near, far = (today + timedelta(days=30)).isoformat(), (today + timedelta(days=120)).isoformat()
+    securities = {
+        "columns": ["SECID", "OPTIONTYPE", "STRIKE", "LASTTRADEDATE", "PREVSETTLEPRICE", "PREVOPENPOSITION"],
+        "data": [
+            ["WH17000BA", "P", 17000.0, near, 420.0, 5.0],
+            ["WH16500BA", "P", 16500.0, near, 250.0, 7.0],
+            ["WH16500BB", "C", 16500.0, near, 600.0, 3.0],
+            ["WH16000BC", "P", 16000.0, far, 300.0, 1.0],
+            ["WH15500AA", "P", 15500.0, (today - timedelta(days=1)).isoformat(), 10.0, 0.0],
+        ]
+    }
+    marketdata = {
+        "columns": ["SECID", "BID", "OFFER", "LAST", "OPENPOSITION", "SETTLEPRICE"],
+        "data": [["WH17000BA", 400.0, 440.0, None, 12.0, None], ["WH16500BA", None, None, 260.0, None, 255.0]]
+    }
+    return {"securities": securities, "marketdata": marketdata}
+
+
+def make_marketdata_response(last_price: float) -> dict:
+    """Формирует ответ ISS marketdata с ценой в колонке LAST."""
+    return {"marketdata": {"columns": ["SECID", "BOARDID", "LAST"], "data": [["WHEAT", "RFUD", last_price]]}}
+
+
+class TestAsyncMOEXClient:
+    """Тесты для асинхронного клиента MOEX ISS."""
+
+    def create_client(self, delay: float = 0.0, fail: bool = False, fail_curve: bool = False,
+                      fail_board: bool = False, empty_curve: bool = False):
+        """Создает клиента с подменным транспортом и журналом запросов."""
+        requested = []
+
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requested.append(request.url.path)
+            await asyncio.sleep(delay)
+            curve = request.url.path.endswith("forts/securities.json")
+            board = request.url.path.endswith("options/securities.json")
+            if fail or (fail_curve and curve) or (fail_board and board):
+                return httpx.Response(502)
+            if curve:
+                response = make_curve_response(date.today() - timedelta(days=1000 if empty_curve else 0))
+                return httpx.Response(200, json=response)
+            if board:
+                return httpx.Response(200, json=make_board_response(date.today()))
+            if "futures" in request.url.path:
+                return httpx.Response(200, json=make_marketdata_response(17000.0))
+            return httpx.Response(200, json=make_marketdata_response(92.5))
+
+        client = AsyncMOEXClient(transport=httpx.MockTransport(handler))
+        return client, requested
+
+    def test_get_last_price(self):
+        """Тест получения последней цены."""
+        client, _ = self.create_client()
+
+        async def run():
+            try:
+                return await client.get_last_price("WHEAT"), await client.get_last_price("USD000UTSTOM")
+            finally:
+                await client.aclose()
+
+        wheat, usd = asyncio.run(run())
+        assert wheat == 17000.0
+        assert usd == 92.5
+
+    def test_get_last_price_error_opens_breaker(self):
+        """Ошибка биржи не подменяется ценой; после серии ошибок запросы не отправляются."""
+        client, requested = self.create_client(fail=True)
+
+        async def run():
+            errors = []
+            try:
+                for _ in range(5):
+                    try:
+                        await client.get_last_price("WHEAT")
+                    except httpx.HTTPError as e:
+                        errors.append(e)
+            finally:
+                await client.aclose()
+            return errors
+
+        errors = asyncio.run(run())
+        assert [type(e) for e in errors[:3]] == [httpx.HTTPStatusError] * 3
+        assert all(isinstance(e, CircuitOpenError) for e in errors[3:])
+        assert len(requested) == 3
+        assert len(client.breakers) == 1
+        assert next(iter(client.breakers.values())).state == "open"
+
+    def test_market_data_fails_without_prices(self):
+        """Без цен снапшот не собирается: ошибка доходит до кэша снапшотов."""
+        client, _ = self.create_client(fail=True)
+
+        async def run():
+            try:
+                return await client.get_market_data("WHEAT")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(httpx.HTTPError):
+            asyncio.run(run())
+
+    def test_unknown_symbol(self):
+        """Тест неизвестного символа."""
+        client, _ = self.create_client()
+        with pytest.raises(ValueError, match="Unknown symbol"):
+            asyncio.run(client.get_last_price("CORN"))
+
+    def test_pool_recreated_per_event_loop(self):
+        """При смене event loop старый пул закрывается, а не утекает."""
+        client, _ = self.create_client()
+
+        async def run():
+            await client.get_last_price("WHEAT")
+            return client._client
+
+        first_pool = asyncio.run(run())
+        second_pool = asyncio.run(run())
+        asyncio.run(client.aclose())
+
+        assert first_pool is not second_pool
+        assert first_pool.is_closed
+        assert second_pool.is_closed
+
+    def test_market_data_concurrent(self):
+        """Снапшот собирается параллельно: кривая, опционная доска и курс, фьючерс один раз."""
+        delay = 0.2
+        client, requested = self.create_client(delay=delay)
+
+        async def run():
+            try:
+                started = time.perf_counter()
+                data = await client.get_market_data("WHEAT")
+                return data, time.perf_counter() - started
+            finally:
+                await client.aclose()
+
+        market_data, elapsed = asyncio.run(run())
+
+        assert market_data.futures_quote.price == 17000.0
+        assert market_data.usd_rate == 92.5
+        assert len(market_data.put_options) == 3
+        assert len(market_data.futures_curve) == 3
+        assert len(requested) == 3
+        # Последовательные запросы заняли бы не меньше 2 * delay
+        assert elapsed < 2 * delay
+
+    def test_futures_curve_parsed(self):
+        """Кривая: только живые серии актива, по экспирации, цена LAST -> SETTLE -> PREVSETTLE."""
+        client, requested = self.create_client()
+
+        async def run():
+            try:
+                return await client.get_futures_curve("WHEAT")
+            finally:
+                await client.aclose()
+
+        curve = asyncio.run(run())
+        assert [contract.secid for contract in curve] == ["WHH0", "WHM0", "WHZ0"]
+        assert [contract.price for contract in curve] == [17000.0, 17300.0, 17600.0]
+        assert len(requested) == 1
+
+    def test_option_board_parsed(self):
+        """Доска: все живые серии по страйку, премия LAST -> mid -> SETTLE -> PREVSETTLE."""
+        client, requested = self.create_client()
+
+        async def run():
+            try:
+                return await client.get_option_board("WHEAT")
+            finally:
+                await client.aclose()
+
+        board = asyncio.run(run())
+        assert board.strike.tolist() == [16000.0, 16500.0, 16500.0, 17000.0]
+        assert board.symbol.tolist() == ["WH16000BC", "WH16500BA", "WH16500BB", "WH17000BA"]
+        assert board.premium.tolist() == [300.0, 260.0, 600.0, 420.0]
+        assert board.open_interest.tolist() == [1.0, 7.0, 3.0, 12.0]
+        assert board.is_call.tolist() == [False, False, True, False]
+        assert requested == ["/iss/engines/futures/markets/options/securities.json"]
+
+    def test_market_data_term_puts(self):
+        """В снапшот попадают PUT всех живых экспираций доски с IV от цены фьючерса."""
+        client, _ = self.create_client()
+
+        async def run():
+            try:
+                return await client.get_market_data("WHEAT")
+            finally:
+                await client.aclose()
+
+        puts = asyncio.run(run()).put_options
+        assert [option.symbol for option in puts] == ["WH16000BC", "WH16500BA", "WH17000BA"]
+        assert len(np.unique(puts.expiry)) == 2
+        assert all(option.option_type == "P" for option in puts)
+        assert np.isfinite(puts.implied_vol).all()
+
+    def test_market_data_without_live_series(self):
+        """Без живых серий на кривой цена берется по одиночному контракту."""
+        client, _ = self.create_client(empty_curve=True)
+
+        async def run():
+            try:
+                return await client.get_market_data("WHEAT")
+            finally:
+                await client.aclose()
+
+        market_data = asyncio.run(run())
+        assert market_data.futures_curve == []
+        assert market_data.futures_quote.price == 17000.0
+
+    @pytest.mark.parametrize("failure", ["fail_curve", "fail_board"])
+    def test_market_data_fails_without_curve_or_board(self, failure):
+        """Ошибка кривой или доски не подменяется демо-цепочкой: снапшот не собирается."""
+        client, _ = self.create_client(**{failure: True})
+
+        async def run():
+            try:
+                return await client.get_market_data("WHEAT")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(httpx.HTTPError):
+            asyncio.run(run())
+
+    def test_market_data_fails_without_puts(self):
+        """Доска без живых PUT - ошибка, а не демо-цепочка."""
+        client, _ = self.create_client()
+
+        async def run():
+            try:
+                with patch("hedgefarm.datasources._parse_option_board", return_value=OptionChain([], [], [])):
+                    return await client.get_market_data("WHEAT")
+            finally:
+                await client.aclose()
+
+        with pytest.raises(ValueError, match="No live WHEAT P options"):
+            asyncio.run(run())
+
+    def test_get_candles_paginates(self):
+        """Свечи собираются со всех страниц ISS до пустой."""
+        columns = ["open", "close", "high", "low", "value", "volume", "begin", "end"]
+        rows = [[100.0 + i, 101.0 + i, 102.0 + i, 99.0 + i, 0.0, 10.0, f"2024-01-{i + 1:02d} 00:00:00",
+                 f"2024-01-{i + 1:02d} 23:59:59"] for i in range(7)]
+        starts = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            start = int(request.url.params["start"])
+            starts.append(start)
+            return httpx.Response(200, json={"candles": {"columns": columns, "data": rows[start:start + 3]}})
+
+        client = AsyncMOEXClient(transport=httpx.MockTransport(handler))
+
+        async def run():
+            try:
+                return await client.get_candles("WHEAT", date(2024, 1, 1))
+            finally:
+                await client.aclose()
+
+        candles = asyncio.run(run())
+        assert starts == [0, 3, 6, 7]
+        assert candles.shape == (6, 7)
+        assert candles[0, 0] == np.datetime64("2024-01-01", "D").astype(np.int64)
+        assert candles[4].tolist() == [101.0 + i for i in range(7)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
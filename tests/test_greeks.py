@@ -0,0 +1,136 @@
+"""Тесты для греков цепочки, лестницы и книги."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.models import OptionQuote
+from hedgefarm.pricing.black import black_scholes
+from hedgefarm.pricing.greeks import BookPosition, GREEKS, GreeksBook, chain_greeks, ladder_greeks
+from hedgefarm.pricing.iv import IVSurface
+from hedgefarm.pricing.options import create_ladder_strikes
+
+AS_OF = datetime(2024, 1, 15)
+
+
+def create_chain(implied_vol=0.3):
+    return [
+        OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=16500.0 * k, premium=300.0,
+                    option_type="P", expiry="2024-06-15", implied_vol=implied_vol)
+        for k in [0.95, 0.97, 1.0, 1.03, 1.05]
+    ]
+
+
+class TestChainGreeks:
+    """Тесты для греков по цепочке и лестнице."""
+
+    def test_matches_per_option_kernel(self):
+        """Векторный расчет совпадает с поштучным вызовом ядра."""
+        chain = create_chain()
+        values = chain_greeks(chain, 16500.0, 6)
+
+        for i, option in enumerate(chain):
+            expected = black_scholes(16500.0, option.strike, 0.5, 0.15, 0.3, "P")
+            for name in GREEKS:
+                assert getattr(values, name)[i] == pytest.approx(float(getattr(expected, name)))
+
+    def test_fallback_volatility_and_terms_axis(self):
+        """Без рыночной IV берется volatility; массив сроков добавляет ось."""
+        chain = create_chain(implied_vol=None)
+        values = chain_greeks(chain, 16500.0, np.array([3, 6, 12]), volatility=0.2)
+
+        assert values.delta.shape == (5, 3)
+        expected = black_scholes(16500.0, chain[2].strike, 1.0, 0.15, 0.2, "P")
+        assert values.vega[2, 2] == pytest.approx(float(expected.vega))
+
+    def test_ladder_is_weighted_sum(self):
+        """Греки лестницы - взвешенная сумма греков ее страйков."""
+        chain = create_chain()
+        ladder = create_ladder_strikes(16500.0, chain)
+        result = ladder_greeks(ladder, 16500.0, 6)
+
+        values = chain_greeks([option for option, _ in ladder], 16500.0, 6)
+        weights = np.array([weight for _, weight in ladder])
+        assert result["delta"] == pytest.approx(float(weights @ values.delta))
+        assert -1.0 < result["delta"] < 0.0
+
+
+class TestGreeksBook:
+    """Тесты для агрегирования греков по книге."""
+
+    def create_position(self, i: int, quantity: float = -100.0):
+        return BookPosition(position_id=f"q{i}", strike=15000.0 + 100 * i,
+                            maturity=AS_OF + timedelta(days=30 * (i % 12 + 1)), quantity_t=quantity)
+
+    def test_totals_match_loop(self):
+        """Сумма по книге совпадает с поштучным расчетом."""
+        book = GreeksBook(capacity=2)
+        positions = [self.create_position(i, quantity=-10.0 * (i + 1)) for i in range(20)]
+        for position in positions:
+            book.add(position)
+
+        totals = book.greeks(16500.0, 0.25, as_of=AS_OF)
+
+        expected = {name: 0.0 for name in GREEKS}
+        for position in positions:
+            T = (position.maturity - AS_OF).total_seconds() / (365.0 * 24 * 3600)
+            values = black_scholes(16500.0, position.strike, T, 0.15, 0.25, "P")
+            for name in GREEKS:
+                expected[name] += position.quantity_t * float(getattr(values, name))
+        assert totals["positions"] == 20
+        for name in GREEKS:
+            assert totals[name] == pytest.approx(expected[name])
+
+    def test_remove_and_replace(self):
+        """Удаление переносит последнюю позицию, повторный id заменяет позицию."""
+        book = GreeksBook()
+        for i in range(3):
+            book.add(self.create_position(i))
+
+        assert book.remove("q0")
+        assert not book.remove("q0")
+        book.add(self.create_position(1, quantity=-50.0))
+
+        assert len(book) == 2
+        only_q2 = GreeksBook()
+        only_q2.add(self.create_position(2))
+        only_q1 = GreeksBook()
+        only_q1.add(self.create_position(1, quantity=-50.0))
+        expected = only_q1.greeks(16500.0, as_of=AS_OF)["delta"] + only_q2.greeks(16500.0, as_of=AS_OF)["delta"]
+        assert book.greeks(16500.0, as_of=AS_OF)["delta"] == pytest.approx(expected)
+
+    def test_sold_floors_are_short_gamma(self):
+        """Выданные гарантии (проданные PUT) дают отрицательные гамму и вегу."""
+        book = GreeksBook()
+        book.add(self.create_position(15))
+        totals = book.greeks(16500.0, 0.25, as_of=AS_OF)
+
+        assert totals["delta"] > 0
+        assert totals["gamma"] < 0
+        assert totals["vega"] < 0
+
+    def test_surface_volatility(self):
+        """Плоская поверхность дает тот же результат, что и число."""
+        book = GreeksBook()
+        for i in range(5):
+            book.add(self.create_position(i))
+        surface = IVSurface(strikes=np.array([15000.0, 18000.0]), terms=np.array([0.1, 1.0]),
+                            vols=np.full((2, 2), 0.25))
+
+        flat = book.greeks(16500.0, 0.25, as_of=AS_OF)
+        by_surface = book.greeks(16500.0, surface, as_of=AS_OF)
+        for name in GREEKS:
+            assert by_surface[name] == pytest.approx(flat[name])
+
+    def test_empty_book(self):
+        assert GreeksBook().greeks(16500.0)["delta"] == 0.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+"""Тесты для предрасчитанной сетки MGP."""
+
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.models import FuturesQuote, MarketData, OptionQuote
+from hedgefarm.pricing.aggregator import calculate_all_prices
+from hedgefarm.pricing.grid import GRID_TERMS, GRID_VOLUMES, GridCache, build_grid
+
+
+def create_market_data(futures_price: float = 16500.0, implied_vol=0.25):
+    """Создает рыночные данные; implied_vol=None включает расчет премий по модели."""
+    return MarketData(
+        futures_quote=FuturesQuote(symbol="WHEAT", price=futures_price, volume=1000,
+                                   updated_at="2024-01-15T12:00:00Z"),
+        put_options=[
+            OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=futures_price * k,
+                        premium=abs(1 - k) * futures_price * 0.1 + 50,
+                        option_type="P", expiry="2024-06-15", implied_vol=implied_vol)
+            for k in [0.95, 0.97, 1.0, 1.03, 1.05]
+        ],
+        usd_rate=95.0,
+        volatility=0.25
+    )
+
+
+class TestPricingGrid:
+    """Тесты для сетки срок x объем."""
+
+    @pytest.mark.parametrize("implied_vol", [0.25, None])
+    def test_grid_matches_full_calculation(self, implied_vol):
+        """Каждая ячейка сетки совпадает с полным расчетом."""
+        market_data = create_market_data(implied_vol=implied_vol)
+        grid = build_grid(market_data, snapshot_version=1)
+
+        for term in GRID_TERMS:
+            for volume in (GRID_VOLUMES[0], GRID_VOLUMES[-1]):
+                quote = grid.lookup(volume, term)
+                expected = calculate_all_prices(market_data, volume, term)
+                assert quote.recommended == expected.recommended
+                assert quote.floor_futures_rubkg == pytest.approx(expected.floor_futures_rubkg)
+                assert quote.floor_put_rubkg == pytest.approx(expected.floor_put_rubkg)
+                assert quote.floor_forward_rubkg == pytest.approx(expected.floor_forward_rubkg)
+                assert quote.volume_t == volume and quote.term_m == term
+
+    def test_off_grid_lookup(self):
+        """Точка вне сетки не найдена."""
+        grid = build_grid(create_market_data(), snapshot_version=1)
+        assert grid.lookup(777, 6) is None
+        assert grid.lookup(1000, 13) is None
+
+    def test_to_dict_shape(self):
+        """Сериализованная сетка имеет форму срок x объем."""
+        data = build_grid(create_market_data(), snapshot_version=3).to_dict()
+        assert data["snapshot_version"] == 3
+        assert len(data["floor_futures_rubkg"]) == len(GRID_TERMS)
+        assert len(data["recommended"][0]) == len(GRID_VOLUMES)
+
+    def test_cache_rebuilds_on_new_version(self):
+        """Сетка перестраивается только при смене версии снапшота."""
+        cache = GridCache()
+        first = cache.get(create_market_data(), 1)
+        assert cache.get(create_market_data(), 1) is first
+
+        second = cache.get(create_market_data(17000.0), 2)
+        assert second is not first
+        assert second.snapshot_version == 2
+        assert cache.rebuilds == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
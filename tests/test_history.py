@@ -0,0 +1,85 @@
+"""Тесты для локального хранилища свечей."""
+
+import asyncio
+from datetime import date, timedelta
+from unittest.mock import AsyncMock
+
+import httpx
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.history import COLUMNS, HistoryStore, to_ordinals
+
+
+def create_candles(start: date, n: int, price: float = 16500.0):
+    day0 = (start - date(1970, 1, 1)).days
+    close = price + np.arange(n, dtype=float)
+    return np.vstack([day0 + np.arange(n, dtype=float), close, close + 50, close - 50, close, np.full(n, 10.0)])
+
+
+class TestHistoryStore:
+    """Тесты для записи, чтения и синхронизации истории."""
+
+    def test_write_and_mmap_load(self, tmp_path):
+        """История читается через memmap, колонки - представления без копии."""
+        store = HistoryStore(tmp_path)
+        store.write("WHEAT", create_candles(date(2024, 1, 1), 10))
+
+        history = HistoryStore(tmp_path).load("WHEAT")
+        assert len(history) == 10
+        assert isinstance(history.data, np.memmap)
+        assert np.shares_memory(history.close, history.data)
+        assert history.close.flags["C_CONTIGUOUS"]
+        assert history.last_date == date(2024, 1, 10)
+        assert to_ordinals(history.day)[0] == date(2024, 1, 1).toordinal()
+        assert str(history.dates[0]) == "2024-01-01"
+
+    def test_load_missing_and_corrupt(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        assert len(store.load("WHEAT")) == 0
+
+        store.path("WHEAT").write_bytes(b"not a numpy file")
+        assert len(store.load("WHEAT")) == 0
+        assert store.load("WHEAT").data.shape == (len(COLUMNS), 0)
+
+    def test_append_replaces_overlap(self, tmp_path):
+        """Последний сохраненный день (возможно неполный) заменяется новой свечой."""
+        store = HistoryStore(tmp_path)
+        store.write("WHEAT", create_candles(date(2024, 1, 1), 5))
+        history = store.append("WHEAT", create_candles(date(2024, 1, 5), 3, price=17000.0))
+
+        assert len(history) == 7
+        assert history.close[3] == 16503.0
+        assert history.close[4:].tolist() == [17000.0, 17001.0, 17002.0]
+
+    def test_sync_fetches_only_tail(self, tmp_path):
+        """Синхронизация запрашивает свечи с последнего сохраненного дня."""
+        store = HistoryStore(tmp_path)
+        client = AsyncMock()
+        client.get_candles.return_value = create_candles(date(2024, 1, 1), 30)
+
+        assert asyncio.run(store.sync(client, "WHEAT", 365, today=date(2024, 1, 31))) == 30
+        client.get_candles.assert_awaited_with("WHEAT", date(2023, 1, 31))
+
+        client.get_candles.return_value = create_candles(date(2024, 1, 30), 3)
+        assert asyncio.run(store.sync(client, "WHEAT", 365)) == 3
+        client.get_candles.assert_awaited_with("WHEAT", date(2024, 1, 30))
+        assert len(store.load("WHEAT")) == 32
+
+    def test_sync_failure_keeps_history(self, tmp_path):
+        store = HistoryStore(tmp_path)
+        store.write("WHEAT", create_candles(date(2024, 1, 1), 5))
+        client = AsyncMock()
+        client.get_candles.side_effect = httpx.ConnectError("offline")
+
+        assert asyncio.run(store.sync(client, "WHEAT", 365)) == 0
+        assert len(store.load("WHEAT")) == 5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,100 @@
+"""Тесты для разбора таблиц ISS."""
+
+import time
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm import iss
+
+
+def create_board(n: int, columns):
+    """Доска опционов из n строк с колонками в заданном порядке."""
+    values = {
+        "SECID": lambda i: f"WH{16000 + i}PA4",
+        "STRIKE": lambda i: 16000.0 + i,
+        "LAST": lambda i: None if i % 3 else 250.0 + i,
+        "OPTIONTYPE": lambda i: "P",
+    }
+    rows = [[values[name](i) for name in columns] for i in range(n)]
+    return {"marketdata": {"columns": list(columns), "data": rows}}
+
+
+class TestISSTable:
+    """Тесты для декодирования блоков ответа."""
+
+    def test_columns_by_name_survive_reordering(self):
+        """Колонки находятся по имени при любом порядке в ответе."""
+        a = iss.table(create_board(5, ["SECID", "STRIKE", "LAST", "OPTIONTYPE"]), "marketdata")
+        b = iss.table(create_board(5, ["LAST", "OPTIONTYPE", "SECID", "STRIKE"]), "marketdata")
+
+        np.testing.assert_array_equal(a.column("STRIKE"), b.column("STRIKE"))
+        np.testing.assert_array_equal(a.column("LAST"), b.column("LAST"))
+        assert a.column("STRIKE").dtype == np.float64
+        assert np.isnan(a.column("LAST")[1])
+        assert a.column("SECID").dtype == object
+        assert a.get("LAST") == 250.0 and a.get("LAST", row=1) is None
+        assert a.get("MISSING", default=0.0) == 0.0
+        with pytest.raises(KeyError):
+            a.column("MISSING")
+
+    def test_schema_is_cached(self):
+        columns = ["SECID", "STRIKE", "LAST", "OPTIONTYPE"]
+        first = iss.table(create_board(3, columns), "marketdata")
+        second = iss.table(create_board(3, columns), "marketdata")
+
+        assert first.schema is second.schema
+
+    def test_records_and_rows(self):
+        table = iss.table(create_board(4, ["SECID", "STRIKE", "LAST"]), "marketdata")
+        records = table.to_records()
+
+        assert records.dtype.names == ("SECID", "STRIKE", "LAST")
+        assert records["STRIKE"][3] == 16003.0
+        assert table.rows()[0] == {"SECID": "WH16000PA4", "STRIKE": 16000.0, "LAST": 250.0}
+
+    def test_extended_format(self):
+        """iss.json=extended: блоки - списки словарей-строк."""
+        data = [{"charsetinfo": {"name": "utf-8"}},
+                {"marketdata": [{"SECID": "WHEAT", "LAST": 17000.0}, {"SECID": "USD", "LAST": None}]}]
+        table = iss.table(data, "marketdata")
+
+        assert len(table) == 2
+        assert table.get("LAST") == 17000.0
+        assert list(table.column("SECID")) == ["WHEAT", "USD"]
+
+    def test_large_board_is_fast(self):
+        """Нужные колонки доски из 10k строк разбираются за миллисекунды."""
+        data = create_board(10_000, ["SECID", "STRIKE", "LAST", "OPTIONTYPE"])
+        started = time.perf_counter()
+        table = iss.table(data, "marketdata")
+        strikes, last = table.column("STRIKE"), table.column("LAST")
+
+        assert time.perf_counter() - started < 0.05
+        assert len(strikes) == len(last) == 10_000
+
+
+class TestPagination:
+    """Тесты для перехода по страницам."""
+
+    def test_cursor(self):
+        cursor = {"columns": ["INDEX", "TOTAL", "PAGESIZE"], "data": [[0, 250, 100]]}
+        data = {"history": {"columns": [], "data": [[]] * 100}, "history.cursor": cursor}
+
+        assert iss.next_start(data, "history", 0, 100) == 100
+        cursor["data"] = [[200, 250, 100]]
+        assert iss.next_start(data, "history", 200, 50) is None
+
+    def test_without_cursor_until_empty_page(self):
+        data = {"candles": {"columns": [], "data": []}}
+        assert iss.next_start(data, "candles", 500, 500) == 1000
+        assert iss.next_start(data, "candles", 1000, 0) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
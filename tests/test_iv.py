@@ -0,0 +1,139 @@
+"""Тесты для расчета подразумеваемой волатильности и поверхности IV."""
+
+from datetime import date
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.chain import OptionChain
+from hedgefarm.datasources import _build_option_chain
+from hedgefarm.pricing.black import black76, black_scholes
+from hedgefarm.pricing.iv import IVSurface, build_surface, implied_vol, surface_from_chain
+
+
+class TestImpliedVol:
+    """Тесты для векторизованного решателя."""
+
+    @pytest.mark.parametrize("model, pricer", [("black_scholes", black_scholes), ("black76", black76)])
+    @pytest.mark.parametrize("option_type", ["P", "C"])
+    def test_round_trip(self, model, pricer, option_type):
+        """Обращение премий восстанавливает исходную волатильность по всей сетке."""
+        strikes = np.linspace(12000.0, 21000.0, 40)
+        terms = np.array([0.05, 0.5, 2.0])[:, None]
+        sigma = 0.2 + 0.5 * (strikes / 16500.0 - 1.0) ** 2
+        premiums = pricer(16500.0, strikes, terms, 0.15, sigma, option_type).premium
+
+        result = implied_vol(premiums, 16500.0, strikes, terms, 0.15, option_type, model)
+
+        assert result.converged.all()
+        np.testing.assert_allclose(result.vol, np.broadcast_to(sigma, result.vol.shape), atol=1e-4)
+
+    def test_unsolvable_premiums_are_nan(self):
+        """Премии вне безарбитражных границ и истекшие опционы дают NaN."""
+        premiums = np.array([0.0, 20000.0, 500.0, 500.0])
+        terms = np.array([0.5, 0.5, 0.0, 0.5])
+
+        result = implied_vol(premiums, 16500.0, 16500.0, terms, 0.15)
+
+        assert np.isnan(result.vol[:3]).all()
+        assert not result.converged[:3].any()
+        assert result.converged[3]
+
+    def test_chain_vols_reprice_premiums(self):
+        """IV демо-цепочки воспроизводит рыночные премии."""
+        chain = _build_option_chain("WHEAT", 16500.0)
+        solved = [option for option in chain if option.implied_vol is not None]
+
+        assert solved
+        for option in solved:
+            premium = black_scholes(16500.0, option.strike, 90 / 365.0, 0.15, option.implied_vol).premium
+            assert float(premium) == pytest.approx(option.premium, rel=1e-6)
+
+
+class TestIVSurface:
+    """Тесты для поверхности страйк x срок."""
+
+    def create_surface(self):
+        return IVSurface(
+            strikes=np.array([15000.0, 16500.0, 18000.0]),
+            terms=np.array([0.25, 1.0]),
+            vols=np.array([[0.30, 0.26], [0.25, 0.22], [0.28, 0.24]])
+        )
+
+    def test_nodes_are_exact(self):
+        """В узлах сетки возвращаются исходные значения."""
+        surface = self.create_surface()
+        K, T = np.meshgrid(surface.strikes, surface.terms, indexing="ij")
+        np.testing.assert_allclose(surface.vol(K, T), surface.vols)
+
+    def test_term_interpolation_in_total_variance(self):
+        """Между сроками интерполируется полная дисперсия."""
+        surface = self.create_surface()
+        expected = np.sqrt((0.25 ** 2 * 0.25 + 0.22 ** 2 * 1.0) / 2 / 0.625)
+        assert surface.vol_at(16500.0, 0.625) == pytest.approx(expected)
+
+    def test_flat_extrapolation(self):
+        """За краями сетки значения продлеваются константой."""
+        surface = self.create_surface()
+        assert surface.vol_at(10000.0, 0.25) == pytest.approx(0.30)
+        assert surface.vol_at(16500.0, 5.0) == pytest.approx(0.22)
+        assert surface.vol_at(16500.0, 0.01) == pytest.approx(0.25)
+
+    def test_build_fills_missing_nodes(self):
+        """Узел без котировки заполняется интерполяцией по страйку."""
+        strikes = np.array([15000.0, 16500.0, 18000.0, 15000.0, 18000.0])
+        terms = np.array([0.25, 0.25, 0.25, 1.0, 1.0])
+        sigma = np.array([0.30, 0.25, 0.28, 0.26, 0.24])
+        premiums = black_scholes(16500.0, strikes, terms, 0.15, sigma).premium
+
+        surface = build_surface(strikes, terms, premiums, 16500.0)
+
+        assert surface.vols.shape == (3, 2)
+        assert surface.vols[1, 1] == pytest.approx(0.25, abs=1e-4)
+
+    def test_build_averages_duplicate_strikes(self):
+        """Повторы страйка в одном сроке усредняются в один узел."""
+        strikes = np.array([15000.0, 16500.0, 16500.0, 18000.0])
+        terms = np.full(4, 0.5)
+        sigma = np.array([0.30, 0.24, 0.26, 0.28])
+        premiums = black_scholes(16500.0, strikes, terms, 0.15, sigma).premium
+
+        surface = build_surface(strikes, terms, premiums, 16500.0)
+
+        assert surface.vols[:, 0] == pytest.approx([0.30, 0.25, 0.28], abs=1e-4)
+
+    def test_surface_terms_from_expiry(self):
+        """Сроки поверхности - от даты оценки до экспирации каждой серии."""
+        sigma = 0.25
+        expiry = ["2024-04-10", "2024-04-10", "2025-01-10", "2025-01-10"]
+        strikes = np.array([16000.0, 17000.0, 16000.0, 17000.0])
+        T = np.array([91, 91, 366, 366]) / 365.0
+        premiums = black_scholes(16500.0, strikes, T, 0.15, sigma).premium
+        chain = OptionChain(["a", "b", "c", "d"], strikes, premiums, expiry=expiry, is_call=[False] * 4)
+
+        surface = surface_from_chain(chain, 16500.0, as_of=date(2024, 1, 10))
+
+        np.testing.assert_allclose(surface.terms, [91 / 365.0, 366 / 365.0])
+        np.testing.assert_allclose(surface.vols, sigma, atol=1e-4)
+
+    def test_surface_from_demo_chain(self):
+        """Поверхность по демо-цепочке покрывает все страйки."""
+        chain = _build_option_chain("WHEAT", 16500.0)
+        surface = surface_from_chain(chain, 16500.0)
+
+        assert len(surface.strikes) == len(chain)
+        assert np.isfinite(surface.vols).all()
+
+    def test_no_solvable_quotes_raises(self):
+        """Без решаемых котировок поверхность не строится."""
+        with pytest.raises(ValueError):
+            build_surface([16500.0], [0.5], [0.0], 16500.0)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
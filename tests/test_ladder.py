@@ -0,0 +1,136 @@
+"""Тесты для оптимизатора лестницы PUT."""
+
+import dataclasses
+from itertools import combinations
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.config import get_params
+from hedgefarm.models import OptionQuote
+from hedgefarm.pricing.ladder import LadderCache, _solve, optimize_ladder
+from hedgefarm.pricing.options import create_ladder_strikes, ladder_floor_price, select_ladder
+from tests.test_grid import create_market_data
+
+
+def create_chain(n: int = 5, futures_price: float = 16500.0):
+    """Цепочка с премиями, растущими к страйкам в деньгах."""
+    return [
+        OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=futures_price * k,
+                    premium=150.0 + max(futures_price * (k - 1.0), 0.0) * 1.1 + 2000.0 * (k - 0.9) ** 2,
+                    option_type="P", expiry="2024-06-15", implied_vol=0.25)
+        for k in np.linspace(0.9, 1.1, n)
+    ]
+
+
+def with_ladder(**changes):
+    params = get_params()
+    return dataclasses.replace(params, ladder=dataclasses.replace(params.ladder, **changes))
+
+
+def ladder_floor(ladder, params):
+    return sum(w * (o.strike - o.premium - params.basis_discount - o.strike * params.fee_pct.put)
+               for o, w in ladder)
+
+
+class TestLadderOptimizer:
+    """Тесты для выбора страйков и весов."""
+
+    def test_respects_constraints(self):
+        """Веса в сумме 1, доля не выше лимита, премия в бюджете."""
+        params = with_ladder(max_weight=0.3, premium_budget_pct=0.02)
+        ladder = optimize_ladder(create_chain(), 16500.0, 6, params=params)
+
+        weights = np.array([w for _, w in ladder])
+        assert weights.sum() == pytest.approx(1.0)
+        assert weights.max() <= 0.3 + 1e-9
+        assert len(ladder) <= params.ladder.max_legs
+        assert sum(o.premium * w for o, w in ladder) <= 0.02 * 16500.0 + 1e-6
+        assert [o.strike for o, _ in ladder] == sorted(o.strike for o, _ in ladder)
+
+    def test_not_worse_than_fixed_buckets(self):
+        """Оптимальная лестница дает MGP не ниже фиксированной, если та укладывается в бюджет."""
+        params = with_ladder(max_weight=0.4, premium_budget_pct=1.0)
+        chain = create_chain()
+        optimized = optimize_ladder(chain, 16500.0, 6, params=params)
+        fixed = create_ladder_strikes(16500.0, chain)
+
+        assert ladder_floor(optimized, params) >= ladder_floor(fixed, params) - 1e-6
+
+    def test_subset_search_matches_brute_force(self):
+        """MILP по всем страйкам находит тот же оптимум, что и полный перебор подмножеств."""
+        params = with_ladder(max_weight=0.5, max_legs=3, premium_budget_pct=0.03)
+        chain = create_chain(n=9)
+        ladder = optimize_ladder(chain, 16500.0, 6, params=params)
+
+        floors = np.array([o.strike - o.premium - params.basis_discount - o.strike * params.fee_pct.put
+                           for o in chain])
+        premiums = np.array([o.premium for o in chain])
+        best = -np.inf
+        for subset in combinations(range(len(chain)), 3):
+            subset = list(subset)
+            weights = _solve(floors[subset], premiums[subset], 0.03 * 16500.0, 0.5)
+            if weights is not None:
+                best = max(best, float(weights @ floors[subset]))
+
+        assert len(ladder) <= 3
+        assert ladder_floor(ladder, params) == pytest.approx(best)
+
+    def test_large_chain_reaches_all_strikes(self):
+        """Длинная цепочка решается быстро, и лучшими могут оказаться любые страйки, а не первые по порядку."""
+        params = with_ladder(max_weight=0.3, max_legs=4, premium_budget_pct=1.0)
+        chain = create_chain(n=60)
+        floors = np.array([o.strike - o.premium - params.basis_discount - o.strike * params.fee_pct.put
+                           for o in chain])
+        # Без бюджета оптимум - лучшие страйки, заполненные до лимита доли
+        expected = np.sort(floors)[::-1][:4] @ np.array([0.3, 0.3, 0.3, 0.1])
+
+        ladder = optimize_ladder(chain, 16500.0, 6, params=params)
+
+        assert len(ladder) <= 4
+        assert ladder_floor(ladder, params) == pytest.approx(expected)
+        assert {o.strike for o, _ in ladder} == {chain[i].strike for i in np.argsort(-floors)[:4]}
+
+    def test_infeasible_falls_back_to_fixed(self):
+        """При несовместных ограничениях используются фиксированные веса."""
+        chain = create_chain()
+        tight = with_ladder(premium_budget_pct=0.0001)
+        narrow = with_ladder(max_weight=0.1)
+
+        assert optimize_ladder(chain, 16500.0, 6, params=tight) is None
+        assert optimize_ladder(chain, 16500.0, 6, params=narrow) is None
+        assert select_ladder(chain, 16500.0, 6, params=tight) == create_ladder_strikes(16500.0, chain)
+
+    def test_disabled_uses_fixed_weights(self):
+        """optimize: false возвращает прежние веса 25-25-20-20-10."""
+        chain = create_chain()
+        params = with_ladder(optimize=False)
+        fixed = create_ladder_strikes(16500.0, chain)
+
+        assert select_ladder(chain, 16500.0, 6, params=params) == fixed
+        assert ladder_floor_price(chain, 16500.0, 6, params=params) == pytest.approx(
+            ladder_floor(fixed, params) / 1000.0)
+
+
+class TestLadderCache:
+    """Тесты для кэша лестниц."""
+
+    def test_cached_per_snapshot_and_term(self):
+        cache = LadderCache()
+        market_data = create_market_data()
+
+        first = cache.get(1, market_data, 6)
+        assert cache.get(1, market_data, 6) is first
+        cache.get(1, market_data, 3)
+        cache.get(2, market_data, 6)
+
+        assert (cache.hits, cache.misses) == (1, 3)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
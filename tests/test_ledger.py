@@ -0,0 +1,109 @@
+"""Тесты для книги гарантий и резервирования капитала."""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.ledger import CapitalLedger, LedgerEntry
+
+NOW = datetime(2024, 1, 15, 12, 0)
+
+
+def create_entry(quote_id: str, volume: float = 1000.0, term_months: int = 6):
+    return LedgerEntry(quote_id=quote_id, volume_t=volume, price_per_ton=16500.0,
+                       term_months=term_months, strike=16500.0, created_at=NOW,
+                       expires_at=NOW + timedelta(days=30 * term_months))
+
+
+class TestCapitalLedger:
+    """Тесты для резервирования и агрегатов книги."""
+
+    def test_reserve_until_limit(self):
+        """Гарантии принимаются, пока капитал книги в пределах резерва."""
+        ledger = CapitalLedger()
+        # 1000 т * 16500 руб * 0.1 = 1.65 млн руб капитала на гарантию
+        results = [ledger.reserve(create_entry(f"q{i}"), 0.1, 5_000_000) for i in range(4)]
+
+        assert [r.accepted for r in results] == [True, True, True, False]
+        assert results[2].book_capital == pytest.approx(4_950_000)
+        assert results[3].book_capital == pytest.approx(4_950_000)
+        assert len(ledger) == 3
+
+    def test_marginal_capital_is_incremental(self):
+        """Предельный капитал учитывает текущую чистую экспозицию."""
+        ledger = CapitalLedger()
+        ledger.reserve(create_entry("long", volume=1000.0), 0.1, 1e12)
+
+        assert ledger.marginal_capital(16_500_000.0, 0.1) == pytest.approx(1_650_000)
+        assert ledger.marginal_capital(-16_500_000.0, 0.1) == pytest.approx(-1_650_000)
+        # Сокращающая риск гарантия принимается и при исчерпанном резерве
+        assert ledger.reserve(create_entry("short", volume=-500.0), 0.1, 0.0).accepted
+
+    def test_release_and_expire(self):
+        ledger = CapitalLedger()
+        ledger.reserve(create_entry("a", term_months=1), 0.1, 1e12)
+        ledger.reserve(create_entry("b", term_months=12), 0.1, 1e12)
+
+        assert ledger.release("a")
+        assert not ledger.release("a")
+        assert ledger.expire(NOW + timedelta(days=400)) == 1
+        assert len(ledger) == 0
+        assert ledger.net_exposure == 0.0
+
+    def test_duplicate_id_rejected(self):
+        ledger = CapitalLedger()
+        ledger.reserve(create_entry("a"), 0.1, 1e12)
+        with pytest.raises(ValueError):
+            ledger.reserve(create_entry("a"), 0.1, 1e12)
+
+    def test_concurrent_reservations_respect_reserve(self):
+        """Параллельные резервирования не превышают резерв в сумме."""
+        ledger = CapitalLedger()
+        accepted = []
+
+        def worker(thread: int):
+            for i in range(200):
+                if ledger.reserve(create_entry(f"t{thread}-{i}", volume=1.0), 1.0, 1_000_000).accepted:
+                    accepted.append(1)
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 16500 руб капитала на гарантию -> помещается ровно 60
+        assert len(accepted) == len(ledger) == 60
+        assert ledger.book_capital(1.0) <= 1_000_000
+
+    def test_snapshot_round_trip(self, tmp_path):
+        """Книга восстанавливается из снапшота; без изменений файл не перезаписывается."""
+        path = tmp_path / "ledger.json"
+        ledger = CapitalLedger()
+        for i in range(3):
+            ledger.reserve(create_entry(f"q{i}"), 0.1, 1e12)
+
+        assert ledger.save(path)
+        assert not ledger.save(path)
+
+        restored = CapitalLedger()
+        assert restored.load(path) == 3
+        assert restored.net_exposure == pytest.approx(ledger.net_exposure)
+        assert {e.quote_id for e in restored.entries()} == {"q0", "q1", "q2"}
+        assert restored.entries()[0].expires_at == create_entry("q0").expires_at
+
+    def test_load_missing_or_broken_file(self, tmp_path):
+        path = tmp_path / "ledger.json"
+        assert CapitalLedger().load(path) == 0
+        path.write_text("{broken", encoding="utf-8")
+        assert CapitalLedger().load(path) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,78 @@
+"""Тесты для Монте-Карло распределений реализованной цены."""
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.pricing.black import black_scholes
+from hedgefarm.pricing.montecarlo import OutcomeModel, simulate_distribution
+from hedgefarm.pricing.pipeline import run_pipeline
+from tests.test_grid import create_market_data
+
+
+@pytest.fixture(scope="module")
+def result():
+    return run_pipeline(create_market_data(), 1000, 6)
+
+
+class TestMonteCarlo:
+    """Тесты для распределений по стратегиям."""
+
+    def test_floors_bound_distributions(self, result):
+        """Нижние квантили PUT и лестницы равны MGP, фьючерс и форвард детерминированы."""
+        report = simulate_distribution(result, 200_000, seed=1)
+
+        assert report["put"]["quantiles_rubkg"]["0.01"] == pytest.approx(result.mgp_put)
+        assert report["put_ladder"]["quantiles_rubkg"]["0.01"] == pytest.approx(result.mgp_put_ladder)
+        assert list(report["futures"]["quantiles_rubkg"].values()) == pytest.approx([result.mgp_futures] * 7)
+        assert report["forward"]["mean_rubkg"] == pytest.approx(result.mgp_forward)
+
+    def test_mean_matches_closed_form(self, result):
+        """Среднее PUT-стратегии совпадает с формулой через недисконтированную цену опциона."""
+        report = simulate_distribution(result, 400_000, seed=2)
+        model = OutcomeModel.from_result(result)
+
+        # E[max(F_T, K)] = F + E[(K - F_T)+]; при r = 0 Блэк-Шоулз дает недисконтированную премию
+        put_value = float(black_scholes(model.futures_price, model.put_strike, model.T, 0.0,
+                                        model.volatility, "P").premium)
+        expected = (model.futures_price + put_value - model.put_cost - model.basis_discount) / 1000.0
+        stats = report["put"]
+        assert abs(stats["mean_rubkg"] - expected) < 4 * stats["std_error_rubkg"] + 1e-6
+
+    def test_control_variate_makes_unhedged_exact(self, result):
+        """Контрольная переменная F_T делает среднее продажи без хеджа точным."""
+        with_cv = simulate_distribution(result, 50_000, seed=3)
+        without_cv = simulate_distribution(result, 50_000, seed=3, control_variate=False, antithetic=False)
+        expected = (result.futures_price - 1600.0) / 1000.0
+
+        assert with_cv["unhedged"]["mean_rubkg"] == pytest.approx(expected, abs=1e-9)
+        assert without_cv["unhedged"]["mean_rubkg"] != pytest.approx(expected, abs=1e-9)
+
+    def test_chunking_does_not_change_result(self, result):
+        """Размер блока влияет только на память, не на поток случайных чисел."""
+        small = simulate_distribution(result, 30_000, seed=4, chunk_size=30_000, antithetic=False)
+        large = simulate_distribution(result, 30_000, seed=4, chunk_size=7_000, antithetic=False)
+
+        assert small["put"]["mean_rubkg"] == pytest.approx(large["put"]["mean_rubkg"])
+
+    def test_unhedged_quantiles_match_lognormal(self, result):
+        """Медиана продажи без хеджа совпадает с медианой логнормального F_T."""
+        report = simulate_distribution(result, 400_000, seed=5)
+        model = OutcomeModel.from_result(result)
+        median = model.futures_price * np.exp(-0.5 * model.volatility ** 2 * model.T)
+
+        assert report["unhedged"]["quantiles_rubkg"]["0.5"] == pytest.approx(
+            (median - model.basis_discount) / 1000.0, rel=2e-3)
+
+    def test_process_pool(self, result):
+        """Расчет в пуле процессов дает согласованный результат."""
+        report = simulate_distribution(result, 40_000, seed=6, workers=2)
+        assert report["put"]["quantiles_rubkg"]["0.01"] == pytest.approx(result.mgp_put)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
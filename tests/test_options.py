@@ -3,7 +3,7 @@
 import pytest
 import sys
 import os
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 # Добавляем путь к модулю hedgefarm
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -12,9 +12,12 @@ from hedgefarm.pricing.options import (
     black_scholes_put, 
     select_optimal_strike, 
     floor_price, 
-    get_put_metrics
+    get_put_metrics,
+    ladder_floor_price,
+    select_ladder
 )
 from hedgefarm.models import OptionQuote
+from hedgefarm.pricing.ladder import optimize_ladder
 
 
 class TestOptionsHedging:
@@ -104,6 +107,23 @@ class TestOptionsHedging:
         assert metrics["delta_hedge_cost"] >= 0
         assert metrics["instrument"] == "put_option"
     
+    def test_put_metrics_use_one_ladder(self):
+        """MGP и страйки лестницы в метриках - от одной лестницы, оптимизатор вызывается один раз."""
+        futures_price = 16500.0
+        put_options = self.create_mock_put_options(futures_price)
+        
+        with patch("hedgefarm.pricing.options.optimize_ladder", wraps=optimize_ladder) as optimize:
+            metrics = get_put_metrics(put_options, futures_price, 6, 0.25, 1000)
+        assert optimize.call_count == 1
+        assert metrics["mgp_ladder_rub_kg"] == pytest.approx(ladder_floor_price(put_options, futures_price, 6, 0.25))
+        
+        ladder = select_ladder(put_options, futures_price, 6, 0.25)
+        with patch("hedgefarm.pricing.options.optimize_ladder") as optimize:
+            passed = get_put_metrics(put_options, futures_price, 6, 0.25, 1000, ladder=ladder)
+        optimize.assert_not_called()
+        assert passed["ladder_strikes"] == [(option.strike, weight) for option, weight in ladder]
+        assert passed["mgp_ladder_rub_kg"] == pytest.approx(metrics["mgp_ladder_rub_kg"])
+    
     def test_black_scholes_edge_cases(self):
         """Тест граничных случаев для Блэка-Шоулза."""
         # ITM опцион
@@ -0,0 +1,77 @@
+"""Тесты для единого конвейера расчета."""
+
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.pricing.aggregator import calculate_all_prices, get_detailed_comparison
+from hedgefarm.pricing.pipeline import PricingPipeline, run_pipeline
+from tests.test_grid import create_market_data
+
+
+class TestPricingPipeline:
+    """Тесты для однопроходного расчета и его мемоизации."""
+
+    @pytest.mark.parametrize("implied_vol", [0.25, None])
+    @pytest.mark.parametrize("term_months", [1, 6, 12])
+    def test_quote_matches_aggregator(self, implied_vol, term_months):
+        """Котировка совпадает с calculate_all_prices."""
+        market_data = create_market_data(implied_vol=implied_vol)
+        quote = run_pipeline(market_data, 1000, term_months).to_quote()
+        expected = calculate_all_prices(market_data, 1000, term_months)
+
+        assert quote.recommended == expected.recommended
+        assert quote.floor_futures_rubkg == pytest.approx(expected.floor_futures_rubkg)
+        assert quote.floor_put_rubkg == pytest.approx(expected.floor_put_rubkg)
+        assert quote.floor_forward_rubkg == pytest.approx(expected.floor_forward_rubkg)
+
+    @pytest.mark.parametrize("implied_vol", [0.25, None])
+    def test_detailed_matches_aggregator(self, implied_vol):
+        """Детальный анализ совпадает с get_detailed_comparison."""
+        market_data = create_market_data(implied_vol=implied_vol)
+        detailed = run_pipeline(market_data, 1000, 6).to_detailed()
+        expected = get_detailed_comparison(market_data, 1000, 6)
+
+        for section, metrics in expected.items():
+            for key, value in metrics.items():
+                if key == "ladder_strikes":
+                    assert [tuple(pair) for pair in detailed[section][key]] == pytest.approx(value)
+                elif isinstance(value, float):
+                    assert detailed[section][key] == pytest.approx(value), (section, key)
+                else:
+                    assert detailed[section][key] == value, (section, key)
+
+    def test_single_option_disables_ladder(self):
+        """С одним опционом лестница не участвует в выборе стратегии."""
+        market_data = create_market_data()
+        market_data = market_data.model_copy(update={"put_options": market_data.put_options[2:3]})
+        result = run_pipeline(market_data, 1000, 6)
+
+        assert result.ladder_eligible is False
+        assert result.recommended != "put_ladder"
+
+    def test_results_are_memoized(self):
+        """Повторный запрос той же точки берется из кэша."""
+        pipeline = PricingPipeline()
+        market_data = create_market_data()
+
+        first = pipeline.get(1, market_data, 1000, 6)
+        assert pipeline.get(1, market_data, 1000, 6) is first
+        assert pipeline.get(2, market_data, 1000, 6) is not first
+        assert (pipeline.hits, pipeline.misses) == (1, 2)
+
+    def test_lru_eviction(self):
+        """Кэш ограничен по числу записей."""
+        pipeline = PricingPipeline(max_entries=2)
+        market_data = create_market_data()
+        for term in (1, 2, 3):
+            pipeline.get(1, market_data, 1000, term)
+        pipeline.get(1, market_data, 1000, 1)
+        assert pipeline.misses == 4
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,76 @@
+"""Тесты для кэша ответов и ETag."""
+
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.responses import ResponseCache, etag_matches, make_etag
+
+
+class TestETag:
+    """Тесты для ETag."""
+
+    def test_make_etag(self):
+        assert make_etag(12, 3) == '"12-3"'
+        assert make_etag(12, 3, stale=True) == '"12-3-stale"'
+
+    @pytest.mark.parametrize("header,expected", [
+        ('"12-3"', True),
+        ('W/"12-3"', True),
+        ('"11-3", "12-3"', True),
+        ("*", True),
+        ('"12-4"', False),
+        ('"12-3-stale"', False),
+        (None, False),
+        ("", False),
+    ])
+    def test_etag_matches(self, header, expected):
+        assert etag_matches(header, '"12-3"') is expected
+
+
+class TestResponseCache:
+    """Тесты для LRU готовых ответов."""
+
+    def test_hit_and_miss(self):
+        cache = ResponseCache()
+        assert cache.get("a") is None
+        cache.put("a", b"{}")
+        assert cache.get("a") == b"{}"
+        assert cache.as_dict() == {"entries": 1, "size_bytes": 2, "hits": 1, "misses": 1, "evictions": 0}
+
+    def test_evicts_least_recently_used_by_count(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", b"1")
+        cache.put("b", b"2")
+        cache.get("a")
+        cache.put("c", b"3")
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1" and cache.get("c") == b"3"
+        assert cache.evictions == 1
+
+    def test_evicts_by_size(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", b"x" * 6)
+        cache.put("b", b"y" * 6)
+        assert len(cache) == 1 and cache.size_bytes == 6
+        assert cache.get("a") is None
+        cache.put("huge", b"z" * 11)
+        assert cache.get("huge") is None and cache.get("b") == b"y" * 6
+
+    def test_replace_keeps_size(self):
+        cache = ResponseCache()
+        cache.put("a", b"1234")
+        cache.put("a", b"12")
+        assert cache.size_bytes == 2 and len(cache) == 1
+
+    def test_disabled(self):
+        cache = ResponseCache(max_entries=0)
+        cache.put("a", b"1")
+        assert len(cache) == 0 and cache.size_bytes == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,120 @@
+"""Тесты для VaR-движка и проверки резерва капитала."""
+
+import dataclasses
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.config import get_params
+from hedgefarm.risk import (RiskEngine, ewma_variance, filtered_var, rolling_expected_shortfall,
+                            rolling_var, var_report)
+
+
+def create_prices(n: int = 600, daily_vol: float = 0.02, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return 16500.0 * np.exp(np.cumsum(rng.normal(0.0, daily_vol, n)))
+
+
+class TestVaRFunctions:
+    """Тесты для векторизованных риск-метрик."""
+
+    def test_rolling_var_matches_loop(self):
+        """Скользящий VaR совпадает с поокенным расчетом."""
+        returns = np.diff(np.log(create_prices(300)))
+        result = rolling_var(returns, 100, 0.99)
+
+        expected = [-np.quantile(returns[i:i + 100], 0.01) for i in range(len(returns) - 99)]
+        np.testing.assert_allclose(result, expected)
+
+    def test_expected_shortfall_exceeds_var(self):
+        """ES не меньше VaR и равен средней из худших потерь окна."""
+        returns = np.diff(np.log(create_prices(300)))
+        es = rolling_expected_shortfall(returns, 100, 0.97)
+
+        assert np.all(es >= rolling_var(returns, 100, 0.97) - 1e-12)
+        assert es[-1] == pytest.approx(-np.sort(returns[-100:])[:3].mean())
+
+    def test_ewma_matches_recursion(self):
+        """Фильтр совпадает с явной рекурсией RiskMetrics."""
+        returns = np.diff(np.log(create_prices(200)))
+        variance = ewma_variance(returns, 0.94)
+
+        v = returns[:30].var() + returns[:30].mean() ** 2
+        for t, r in enumerate(returns):
+            v = 0.94 * v + 0.06 * r * r
+            assert variance[t] == pytest.approx(v)
+
+    def test_filtered_var_scales_with_volatility(self):
+        """После скачка волатильности FHS-VaR реагирует быстрее исторического."""
+        rng = np.random.default_rng(1)
+        returns = np.concatenate([rng.normal(0, 0.01, 400), rng.normal(0, 0.04, 20)])
+
+        fhs = filtered_var(returns, 250, 0.99)[-1]
+        historical = rolling_var(returns, 250, 0.99)[-1]
+
+        assert fhs > historical
+
+    def test_parametric_fallback_without_history(self):
+        """При короткой истории используется нормальный VaR по волатильности."""
+        report = var_report(create_prices(20), 250, 0.99, fallback_volatility=0.25)
+
+        assert report.method == "parametric"
+        assert report.var_pct == pytest.approx(0.25 / np.sqrt(252) * 2.3263, rel=1e-4)
+        with pytest.raises(ValueError):
+            var_report(create_prices(20), 250)
+
+
+class TestRiskEngine:
+    """Тесты для дневной истории и проверки котировок."""
+
+    def create_engine(self, daily_vol: float = 0.02):
+        engine = RiskEngine()
+        prices = create_prices(400, daily_vol)
+        start = date(2023, 1, 1)
+        engine.load_history([start + timedelta(days=i) for i in range(len(prices))], prices)
+        return engine
+
+    def test_report_is_cached(self):
+        """Отчет пересчитывается только после изменения истории."""
+        engine = self.create_engine()
+        first = engine.report()
+
+        assert first.method == "historical"
+        assert engine.report() is first
+        engine.record(17000.0, date(2024, 6, 1))
+        assert engine.report() is not first
+
+    def test_record_replaces_same_day(self):
+        """Повторная цена за день заменяет предыдущую, старые даты игнорируются."""
+        engine = RiskEngine()
+        engine.record(16000.0, date(2024, 1, 1))
+        engine.record(16100.0, date(2024, 1, 1))
+        engine.record(15000.0, date(2023, 12, 31))
+        engine.record(16200.0, date(2024, 1, 2))
+
+        assert engine._prices == [16100.0, 16200.0]
+
+    def test_assess_against_reserve(self):
+        """Капитал растет с объемом и сравнивается с risk.capital_reserve."""
+        engine = self.create_engine()
+        params = get_params()
+
+        small, small_ok = engine.assess(1000, 16500.0, params)
+        large, large_ok = engine.assess(2_000_000, 16500.0, params)
+
+        assert small_ok and not large_ok
+        assert large.capital_required == pytest.approx(small.capital_required * 2000)
+        assert small.capital_required >= small.var_99 > 0
+
+        generous = dataclasses.replace(params, risk=dataclasses.replace(params.risk, capital_reserve=1e15))
+        assert engine.assess(2_000_000, 16500.0, generous)[1]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,179 @@
+"""Тесты для снапшота в разделяемой памяти и процесса загрузки."""
+
+import asyncio
+import multiprocessing
+from datetime import date, datetime, timedelta
+
+import httpx
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm import ingest
+from hedgefarm.chain import OptionChain
+from hedgefarm.config import PricingParams
+from hedgefarm.datasources import AsyncMOEXClient
+from hedgefarm.models import FuturesContract, FuturesQuote, MarketData
+from hedgefarm.shared import SnapshotSegment, decode_market_data, encode_market_data, segment_path
+
+
+def create_market_data(price: float = 16500.0, n: int = 5) -> MarketData:
+    strikes = price * np.linspace(0.9, 1.1, n)
+    return MarketData(
+        futures_quote=FuturesQuote(symbol="WHEAT", price=price, volume=1000, updated_at=datetime(2024, 1, 10)),
+        put_options=OptionChain(
+            symbol=[f"WH{k:.0f}P" for k in strikes],
+            strike=strikes,
+            premium=np.full(n, price / 50.0),
+            bid=np.full(n, np.nan),
+            open_interest=np.arange(n, dtype=float),
+            expiry=np.full(n, "2024-06-15"),
+            implied_vol=np.where(np.arange(n) % 2, 0.25, np.nan)
+        ),
+        usd_rate=92.5,
+        volatility=0.3,
+        futures_curve=[FuturesContract(secid="WHH4", expiry=date(2024, 3, 15), price=price)]
+    )
+
+
+def _write_versions(path: str, count: int) -> None:
+    segment = SnapshotSegment.create(path, 1 << 16)
+    for version in range(1, count + 1):
+        segment.publish(version, create_market_data(float(version), n=50))
+    segment.close()
+
+
+class TestEncoding:
+    """Тесты для сериализации снапшота."""
+
+    def test_round_trip(self):
+        """Данные восстанавливаются полностью, колонки - представления буфера без копии."""
+        market_data = create_market_data()
+        data = encode_market_data(market_data)
+        restored = decode_market_data(data)
+
+        assert restored.futures_quote == market_data.futures_quote
+        assert restored.futures_curve == market_data.futures_curve
+        assert restored.usd_rate == 92.5 and restored.volatility == 0.3
+        assert restored.put_options == market_data.put_options
+        chain = restored.put_options
+        assert np.isnan(chain.bid).all()
+        assert chain.open_interest.tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+        assert chain.expiry.dtype == np.dtype("datetime64[D]")
+        assert chain.strike.base is not None and not chain.strike.flags.writeable
+
+
+class TestSnapshotSegment:
+    """Тесты для сегмента под seqlock."""
+
+    def test_publish_and_read(self, tmp_path):
+        path = tmp_path / "WHEAT.snapshot"
+        writer = SnapshotSegment.create(path, 1 << 16)
+        reader = SnapshotSegment.open(path)
+        assert reader.version() == 0
+        assert reader.read() is None
+
+        writer.publish(7, create_market_data(17000.0))
+        version, published_at, market_data = reader.read()
+        assert version == reader.version() == 7
+        assert published_at > 0
+        assert market_data.futures_quote.price == 17000.0
+
+    def test_version_survives_restart(self, tmp_path):
+        """Повторно созданный писатель видит последнюю версию сегмента."""
+        path = tmp_path / "WHEAT.snapshot"
+        SnapshotSegment.create(path, 1 << 16).publish(12, create_market_data())
+        assert SnapshotSegment.create(path, 1 << 16).version() == 12
+
+    def test_capacity_exceeded(self, tmp_path):
+        writer = SnapshotSegment.create(tmp_path / "WHEAT.snapshot", 256)
+        with pytest.raises(ValueError, match="exceeds segment capacity"):
+            writer.publish(1, create_market_data(n=50))
+
+    def test_reader_never_sees_torn_snapshot(self, tmp_path):
+        """Читатель в другом процессе получает только целые снапшоты одной версии."""
+        path = tmp_path / "WHEAT.snapshot"
+        SnapshotSegment.create(path, 1 << 16).close()
+        reader = SnapshotSegment.open(path)
+        writer = multiprocessing.get_context("fork").Process(target=_write_versions, args=(str(path), 300))
+        writer.start()
+        seen = set()
+        try:
+            while writer.is_alive() or reader.version() not in seen:
+                result = reader.read(retries=10_000)
+                if result is None:
+                    continue
+                version, _, market_data = result
+                assert market_data.futures_quote.price == version
+                assert (market_data.put_options.premium == version / 50.0).all()
+                seen.add(version)
+        finally:
+            writer.join()
+        assert 300 in seen
+
+
+class TestIngest:
+    """Тесты для процесса загрузки."""
+
+    def test_publishes_to_segments(self, tmp_path, monkeypatch):
+        """Процесс загрузки опрашивает ISS и публикует снапшот в сегмент символа."""
+        def handler(request: httpx.Request) -> httpx.Response:
+            path = request.url.path
+            if path.endswith("candles.json"):
+                return httpx.Response(200, json={"candles": {"columns": ["begin"], "data": []}})
+            if path.endswith("WHEAT.json"):
+                return httpx.Response(200, json={"marketdata": {"columns": ["LAST"], "data": [[17000.0]]}})
+            if path.endswith("USD000UTSTOM.json"):
+                return httpx.Response(200, json={"marketdata": {"columns": ["LAST"], "data": [[92.5]]}})
+            if path.endswith("forts/securities.json"):
+                return httpx.Response(200, json={
+                    "securities": {"columns": ["SECID", "ASSETCODE", "LASTTRADEDATE", "PREVSETTLEPRICE"], "data": []},
+                    "marketdata": {"columns": ["SECID", "LAST", "SETTLEPRICE"], "data": []}
+                })
+            if path.endswith("options/securities.json"):
+                expiry = (date.today() + timedelta(days=60)).isoformat()
+                return httpx.Response(200, json={"securities": {
+                    "columns": ["SECID", "OPTIONTYPE", "STRIKE", "LASTTRADEDATE", "PREVSETTLEPRICE"],
+                    "data": [["WH16500BA", "P", 16500.0, expiry, 300.0], ["WH17000BA", "P", 17000.0, expiry, 500.0]]
+                }, "marketdata": {"columns": ["SECID", "BID", "OFFER", "LAST", "OPENPOSITION", "SETTLEPRICE"],
+                                  "data": []}})
+            return httpx.Response(502)
+
+        original = AsyncMOEXClient.from_params
+        monkeypatch.setattr(AsyncMOEXClient, "from_params", classmethod(
+            lambda cls, params: original.__func__(cls, params, transport=httpx.MockTransport(handler))))
+        params = PricingParams.from_dict({
+            "shared_snapshot": {"path": str(tmp_path / "shm")},
+            "history": {"path": str(tmp_path / "history"), "lookback_days": 10},
+            "market_data": {"poll_interval_s": 0.01},
+        })
+        reader_path = segment_path(tmp_path / "shm", "WHEAT")
+
+        async def scenario():
+            stop = asyncio.Event()
+            task = asyncio.create_task(ingest.run(params=params, stop=stop))
+            for _ in range(500):
+                await asyncio.sleep(0.01)
+                if reader_path.exists():
+                    published.add(SnapshotSegment.open(reader_path).published_at())
+                    if len(published - {0.0}) >= 2:
+                        break
+            stop.set()
+            await task
+
+        published = set()
+        asyncio.run(scenario())
+        version, _, market_data = SnapshotSegment.open(reader_path).read()
+        # Повторные опросы с теми же данными переписывают сегмент без новой версии
+        assert len(published - {0.0}) >= 2
+        assert version == 1
+        assert market_data.futures_quote.price == 17000.0
+        assert market_data.usd_rate == 92.5
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,126 @@
+"""Тесты для потокового t-digest и его подключения к риск-движку."""
+
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.risk import RiskEngine
+from hedgefarm.sketch import TDigest
+
+QUANTILES = [0.001, 0.01, 0.05, 0.95, 0.99, 0.999]
+
+
+def create_returns(n: int = 200_000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return 0.02 * rng.standard_t(4, n)
+
+
+class TestTDigest:
+    """Тесты для точности, слияния и сериализации дайджеста."""
+
+    def test_tail_quantiles_match_exact(self):
+        """Хвостовые квантили совпадают с точными с относительной ошибкой < 2%."""
+        returns = create_returns()
+        digest = TDigest()
+        digest.update_many(returns)
+
+        np.testing.assert_allclose(digest.quantile(QUANTILES), np.quantile(returns, QUANTILES), rtol=0.02)
+        assert digest.quantile(0.0) == returns.min()
+        assert digest.quantile(1.0) == returns.max()
+        assert digest.cdf(np.quantile(returns, 0.01)) == pytest.approx(0.01, abs=1e-3)
+
+    def test_memory_is_bounded(self):
+        """Число центроидов не растет с числом наблюдений."""
+        digest = TDigest(compression=100)
+        sizes = []
+        for chunk in np.array_split(create_returns(400_000), 8):
+            digest.update_many(chunk)
+            sizes.append(digest.centroids)
+
+        assert max(sizes) < 100
+        assert len(digest) == 400_000
+
+    def test_single_updates_match_bulk(self):
+        """Поэлементная запись дает те же квантили, что и пакетная."""
+        returns = create_returns(20_000)
+        single, bulk = TDigest(), TDigest()
+        for value in returns:
+            single.update(value)
+        bulk.update_many(returns)
+
+        np.testing.assert_allclose(single.quantile(QUANTILES[1:-1]), bulk.quantile(QUANTILES[1:-1]), rtol=0.02)
+
+    def test_merge_across_workers(self):
+        """Слияние сериализованных дайджестов частей эквивалентно дайджесту целого."""
+        returns = create_returns()
+        merged = TDigest()
+        for part in np.array_split(returns, 4):
+            worker = TDigest()
+            worker.update_many(part)
+            merged.merge(TDigest.from_dict(worker.to_dict()))
+
+        assert len(merged) == len(returns)
+        np.testing.assert_allclose(merged.quantile(QUANTILES), np.quantile(returns, QUANTILES), rtol=0.02)
+
+    def test_empty_digest(self):
+        """Пустой дайджест не дает квантилей и сериализуется."""
+        digest = TDigest()
+        with pytest.raises(ValueError):
+            digest.quantile(0.5)
+        assert TDigest.from_dict(digest.to_dict()).count == 0
+
+
+class TestRiskEngineSketch:
+    """Тесты для долгосрочного VaR риск-движка."""
+
+    def create_prices(self, n: int):
+        return 16500.0 * np.exp(np.cumsum(create_returns(n, seed=1)))
+
+    def test_load_history_feeds_digest(self):
+        """Вся загруженная история попадает в дайджест, даже сверх max_days."""
+        prices = self.create_prices(2000)
+        engine = RiskEngine(max_days=300)
+        engine.load_history(range(len(prices)), prices)
+        report = engine.report()
+
+        returns = np.diff(np.log(prices))
+        assert len(engine._prices) == 300
+        assert report.sketch_var == pytest.approx(-np.quantile(returns, 0.01), rel=0.03)
+        assert report.var_pct >= report.sketch_var
+
+    def test_record_digests_closed_days(self):
+        """Доходность дня попадает в дайджест только после смены дня."""
+        engine = RiskEngine()
+        start = date(2024, 1, 1)
+        engine.record(100.0, start)
+        engine.record(110.0, start + timedelta(days=1))
+        engine.record(120.0, start + timedelta(days=1))
+        assert len(engine._digest) == 0
+
+        engine.record(118.0, start + timedelta(days=2))
+        engine.record(119.0, start + timedelta(days=2))
+        assert len(engine._digest) == 1
+        assert engine._digest.quantile(0.5) == pytest.approx(np.log(1.2))
+
+    def test_merge_digest(self):
+        """Дайджест другого воркера вливается и сбрасывает кэш отчета."""
+        prices = self.create_prices(600)
+        engine, other = RiskEngine(), RiskEngine()
+        engine.load_history(range(300), prices[:300])
+        other.load_history(range(300, 600), prices[300:])
+        before = engine.report()
+
+        engine.merge_digest(other.digest_state())
+
+        assert len(engine._digest) == 598
+        assert engine.report() is not before
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
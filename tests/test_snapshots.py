@@ -0,0 +1,102 @@
+"""Тесты для хранилища снапшотов и фонового опроса биржи."""
+
+import asyncio
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.cache import SnapshotCache
+from hedgefarm.models import FuturesQuote, MarketData, OptionQuote
+from hedgefarm.snapshots import MarketDataPoller, SnapshotStore
+
+
+def create_market_data(premium: float = 300.0, updated_at: str = "2024-01-15T12:00:00Z") -> MarketData:
+    return MarketData(
+        futures_quote=FuturesQuote(symbol="WHEAT", price=16500.0, volume=1000, updated_at=updated_at),
+        put_options=[OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=k, premium=premium, option_type="P",
+                                 expiry="2024-06-15") for k in (16000.0, 16500.0)],
+        usd_rate=95.0,
+        volatility=0.25
+    )
+
+
+class TestSnapshotStore:
+    """Тесты для хранилища снапшотов."""
+
+    def test_publish_increments_version(self):
+        """Каждая публикация получает новую версию."""
+        store = SnapshotStore()
+        first = store.publish("WHEAT", {"price": 1})
+        second = store.publish("WHEAT", {"price": 2})
+
+        assert second.version == first.version + 1
+        assert store.latest("WHEAT") is second
+        assert store.version == second.version
+        assert store.latest("CORN") is None
+
+    def test_unchanged_data_keeps_version(self):
+        """Те же рыночные данные (кроме времени котировки) не дают новой версии и не вызывают обработчики."""
+        store = SnapshotStore()
+        published = []
+        store.add_listener(published.append)
+        first = store.publish("WHEAT", create_market_data())
+        same = store.publish("WHEAT", create_market_data(updated_at="2024-01-15T12:00:05Z"))
+        changed = store.publish("WHEAT", create_market_data(premium=310.0))
+
+        assert same.version == first.version and same.market_data is first.market_data
+        assert same.fetched_at >= first.fetched_at
+        assert store.latest("WHEAT").version == changed.version == first.version + 1
+        assert [snapshot.version for snapshot in published] == [first.version, changed.version]
+
+    def test_snapshot_is_immutable(self):
+        """Снапшот нельзя изменить после публикации."""
+        snapshot = SnapshotStore().publish("WHEAT", {"price": 1})
+        with pytest.raises(AttributeError):
+            snapshot.version = 100
+        assert snapshot.age >= 0
+
+
+class TestMarketDataPoller:
+    """Тесты для фонового опроса биржи."""
+
+    def test_poller_publishes_snapshots(self):
+        """Опрос публикует снапшоты в хранилище кэша."""
+        calls = []
+
+        async def fetch(symbol: str):
+            calls.append(symbol)
+            return {"symbol": symbol}
+
+        store = SnapshotStore()
+        cache = SnapshotCache(fetch, store=store)
+        poller = MarketDataPoller(cache.refresh, symbols=["WHEAT"], interval=0.01)
+
+        async def run():
+            poller.start()
+            await asyncio.sleep(0.05)
+            running = poller.running
+            await poller.stop()
+            return running
+
+        assert asyncio.run(run()) is True
+        assert poller.running is False
+        assert poller.polls >= 2
+        assert store.latest("WHEAT").version == len(calls)
+
+    def test_poll_errors_are_counted(self):
+        """Ошибка биржи не останавливает опрос."""
+        async def refresh(symbol: str):
+            raise RuntimeError("ISS unavailable")
+
+        poller = MarketDataPoller(refresh, symbols=["WHEAT"])
+        asyncio.run(poller.poll_once())
+
+        assert poller.polls == 1
+        assert poller.failures == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
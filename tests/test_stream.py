@@ -0,0 +1,226 @@
+"""Тесты для рассылки котировок подписчикам."""
+
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.models import FuturesQuote, MarketData, OptionQuote, QuoteOut
+from hedgefarm.snapshots import MarketSnapshot
+from hedgefarm.stream import QuoteBroadcaster, Subscription, format_event
+
+
+def create_quote(volume: int, term_months: int, price: float = 15.0) -> QuoteOut:
+    return QuoteOut(
+        culture="wheat", volume_t=volume, term_m=term_months, floor_futures_rubkg=price,
+        floor_put_rubkg=price, floor_forward_rubkg=price, recommended="futures"
+    )
+
+
+def create_market_data(futures_price: float = 16500.0) -> MarketData:
+    return MarketData(
+        futures_quote=FuturesQuote(symbol="WHEAT", price=futures_price, volume=1000,
+                                   updated_at="2024-01-15T12:00:00Z"),
+        put_options=[
+            OptionQuote(symbol=f"WHEAT_{k:.0f}_P", strike=futures_price * k, premium=300.0,
+                        option_type="P", expiry="2024-06-15", implied_vol=0.25)
+            for k in [0.95, 0.97, 1.0, 1.03, 1.05]
+        ],
+        usd_rate=95.0,
+        volatility=0.25
+    )
+
+
+def create_snapshot(version: int) -> MarketSnapshot:
+    return MarketSnapshot(version=version, symbol="WHEAT", market_data=Mock(), fetched_at=time.monotonic())
+
+
+def parse_event(event: bytes) -> dict:
+    lines = dict(line.split(": ", 1) for line in event.decode("utf-8").strip().split("\n"))
+    return {"id": int(lines["id"]), "event": lines["event"], "data": json.loads(lines["data"])}
+
+
+class TestSubscription:
+    """Тесты для очереди подписчика."""
+
+    def test_drops_oldest_when_full(self):
+        async def scenario():
+            subscription = Subscription((100, 6), maxsize=2)
+            for event in (b"1", b"2", b"3"):
+                subscription.offer(event)
+            return subscription.dropped, [await subscription.get(), await subscription.get()]
+
+        assert asyncio.run(scenario()) == (1, [b"2", b"3"])
+
+
+class TestQuoteBroadcaster:
+    """Тесты для рассылки по группам."""
+
+    def test_computes_once_per_group(self):
+        """На тик котировка считается раз на группу, а не на подписчика."""
+        render = Mock(side_effect=lambda snapshot, volume, term: create_quote(volume, term))
+
+        async def scenario():
+            broadcaster = QuoteBroadcaster(render)
+            subscriptions = [broadcaster.subscribe(100, 6) for _ in range(1000)]
+            subscriptions.append(broadcaster.subscribe(500, 3))
+            broadcaster.publish(create_snapshot(1))
+            events = [await subscription.get() for subscription in subscriptions]
+            return broadcaster, events
+
+        broadcaster, events = asyncio.run(scenario())
+        assert render.call_count == 2
+        assert broadcaster.subscribers == 1001 and broadcaster.groups == 2
+        # Подписчики группы получают один и тот же объект
+        assert all(event is events[0] for event in events[:1000])
+        first = parse_event(events[0])
+        assert (first["id"], first["event"], first["data"]["volume_t"], first["data"]["term_m"]) == (1, "quote", 100, 6)
+        assert parse_event(events[-1])["data"]["term_m"] == 3
+        assert broadcaster.stats.as_dict() == {"ticks": 1, "computed": 2, "delivered": 1001, "dropped": 0, "errors": 0}
+
+    def test_new_subscriber_reuses_current_event(self):
+        render = Mock(side_effect=lambda snapshot, volume, term: create_quote(volume, term))
+
+        async def scenario():
+            broadcaster = QuoteBroadcaster(render)
+            snapshot = create_snapshot(5)
+            first = broadcaster.subscribe(100, 6, snapshot)
+            second = broadcaster.subscribe(100, 6, snapshot)
+            return await first.get(), await second.get()
+
+        first, second = asyncio.run(scenario())
+        assert first is second
+        assert render.call_count == 1
+
+    def test_slow_subscriber_gets_latest(self):
+        """Медленный клиент пропускает промежуточные версии, но видит последнюю."""
+        render = Mock(side_effect=lambda snapshot, volume, term: create_quote(volume, term, float(snapshot.version)))
+
+        async def scenario():
+            broadcaster = QuoteBroadcaster(render, queue_size=1)
+            subscription = broadcaster.subscribe(100, 6)
+            for version in range(1, 11):
+                broadcaster.publish(create_snapshot(version))
+            event = await subscription.get()
+            broadcaster.unsubscribe(subscription)
+            return broadcaster, event
+
+        broadcaster, event = asyncio.run(scenario())
+        assert parse_event(event)["id"] == 10
+        assert broadcaster.subscribers == 0 and broadcaster.groups == 0
+        assert broadcaster.stats.dropped == 9
+        broadcaster.publish(create_snapshot(11))
+        assert render.call_count == 10
+
+    def test_render_error_skips_group(self):
+        def render(snapshot, volume, term):
+            if term == 12:
+                raise ValueError("no ladder")
+            return create_quote(volume, term)
+
+        async def scenario():
+            broadcaster = QuoteBroadcaster(render)
+            good = broadcaster.subscribe(100, 6)
+            bad = broadcaster.subscribe(100, 12)
+            broadcaster.publish(create_snapshot(1))
+            return broadcaster, await good.get(), bad
+
+        broadcaster, event, bad = asyncio.run(scenario())
+        assert parse_event(event)["id"] == 1
+        assert bad._queue.empty()
+        assert broadcaster.stats.errors == 1
+
+    def test_format_event(self):
+        event = format_event(3, create_quote(100, 6))
+        assert event.startswith(b"id: 3\nevent: quote\ndata: {")
+        assert event.endswith(b"}\n\n")
+
+
+class TestServiceStream:
+    """Тесты для потока котировок сервиса."""
+
+    def setup_method(self):
+        from hedgefarm.service import market_cache, market_store
+        market_cache.clear()
+        market_store.clear()
+
+    def test_stream_follows_snapshots(self):
+        """Первое событие - текущий снапшот, затем событие на каждую новую версию."""
+        from hedgefarm import service
+
+        async def scenario():
+            service.market_store.publish("WHEAT", create_market_data(16500.0))
+            subscription = service.quote_stream.subscribe(100, 6, service.market_store.latest("WHEAT"))
+            events = service._quote_events(subscription)
+            first = await events.__anext__()
+            service.market_store.publish("WHEAT", create_market_data(18000.0))
+            second = await events.__anext__()
+            subscribers = service.quote_stream.subscribers
+            await events.aclose()
+            return first, second, subscribers
+
+        first, second, subscribers = asyncio.run(scenario())
+        first, second = parse_event(first), parse_event(second)
+        assert second["id"] == first["id"] + 1
+        assert second["data"]["floor_futures_rubkg"] > first["data"]["floor_futures_rubkg"]
+        assert subscribers == 1
+        assert service.quote_stream.subscribers == 0
+
+    def test_grid_built_outside_event_loop(self):
+        """Сетка нового снапшота строится в пуле потоков; до этого котировки считает конвейер."""
+        from hedgefarm import service
+        threads = []
+        build = service.pricing_grid.get
+
+        def recording_get(*args, **kwargs):
+            threads.append(threading.get_ident())
+            return build(*args, **kwargs)
+
+        async def scenario():
+            snapshot = service.market_store.publish("WHEAT", create_market_data(16500.0))
+            quote = service.quote_for(snapshot, 100, 6)
+            for _ in range(200):
+                if service.pricing_grid.peek(snapshot.version) is not None:
+                    break
+                await asyncio.sleep(0.01)
+            return snapshot, quote
+
+        with patch.object(service.pricing_grid, "get", side_effect=recording_get):
+            snapshot, quote = asyncio.run(scenario())
+        grid = service.pricing_grid.peek(snapshot.version)
+        assert grid is not None
+        assert threads and threading.get_ident() not in threads
+        assert quote.floor_put_rubkg == pytest.approx(grid.lookup(100, 6).floor_put_rubkg)
+
+    def test_keepalive(self):
+        from hedgefarm import service
+
+        async def scenario():
+            subscription = service.quote_stream.subscribe(100, 6)
+            events = service._quote_events(subscription)
+            with patch.object(service, "STREAM_KEEPALIVE_S", 0.01):
+                event = await events.__anext__()
+            await events.aclose()
+            return event
+
+        assert asyncio.run(scenario()) == b": keepalive\n\n"
+
+    def test_stream_endpoint_validation(self):
+        from fastapi.testclient import TestClient
+        from hedgefarm.service import app
+        client = TestClient(app)
+
+        assert client.get("/price/stream?culture=corn&volume=100&term_months=6").status_code == 400
+        assert client.get("/price/stream?culture=wheat&volume=0&term_months=6").status_code == 422
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,105 @@
+"""Тесты для оценок реализованной волатильности."""
+
+import numpy as np
+import pytest
+import sys
+import os
+
+# Добавляем путь к модулю hedgefarm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from hedgefarm.datasources import AsyncMOEXClient
+from hedgefarm.volatility import ESTIMATORS, RollingVolatility, ewma_volatility, rolling_volatility
+
+
+def create_bars(n: int = 1000, daily_vol: float = 0.02, seed: int = 0, steps: int = 500):
+    """
+    OHLC-бары броуновского движения по внутридневному пути из steps шагов.
+
+    Оценки по диапазону на дискретном пути занижены, поэтому шаг мелкий.
+    """
+    rng = np.random.default_rng(seed)
+    increments = rng.normal(0.0, daily_vol / np.sqrt(steps), (n, steps))
+    path = 16500.0 * np.exp(np.cumsum(increments.ravel())).reshape(n, steps)
+    open_ = np.concatenate([[16500.0], path[:-1, -1]])
+    high = np.maximum(path.max(axis=1), open_)
+    low = np.minimum(path.min(axis=1), open_)
+    return open_, high, low, path[:, -1]
+
+
+class TestVolatilityEstimators:
+    """Тесты для векторных оценок по окну."""
+
+    @pytest.mark.parametrize("estimator", list(ESTIMATORS))
+    def test_estimators_recover_true_volatility(self, estimator):
+        """Все оценки близки к истинной волатильности 2% в день."""
+        bars = create_bars()
+        vol = rolling_volatility(*bars, window=999, estimator=estimator)
+
+        assert vol[-1] == pytest.approx(0.02 * np.sqrt(252), rel=0.1)
+
+    def test_close_matches_sample_std(self):
+        """Оценка close-to-close - выборочное стандартное отклонение доходностей окна."""
+        bars = create_bars(300)
+        vol = rolling_volatility(*bars, window=60, estimator="close", annualize=False)
+
+        returns = np.diff(np.log(bars[3]))
+        assert len(vol) == 240
+        assert vol[-1] == pytest.approx(returns[-60:].std(ddof=1))
+        assert vol[0] == pytest.approx(returns[:60].std(ddof=1))
+
+    def test_ewma_volatility(self):
+        bars = create_bars()
+        assert ewma_volatility(bars[3])[-1] == pytest.approx(0.02 * np.sqrt(252), rel=0.3)
+
+
+class TestRollingVolatility:
+    """Тесты для инкрементальной оценки."""
+
+    @pytest.mark.parametrize("estimator", list(ESTIMATORS))
+    def test_incremental_matches_vectorized(self, estimator):
+        """Обновление по одному бару совпадает со скользящим векторным расчетом."""
+        bars = create_bars(400)
+        rolling = RollingVolatility(60, estimator)
+        values = [rolling.update(*bar) for bar in zip(*bars)]
+
+        assert values[59] is None
+        np.testing.assert_allclose(values[60:], rolling_volatility(*bars, window=60, estimator=estimator))
+
+    def test_update_many_matches_single_updates(self):
+        """Пакетная загрузка хвоста и поштучные обновления дают одно состояние."""
+        bars = create_bars(400)
+        single, batch = RollingVolatility(60), RollingVolatility(60)
+        for bar in zip(*bars):
+            single.update(*bar)
+        batch.update_many(*(x[:250] for x in bars))
+        batch.update_many(*(x[250:290] for x in bars))
+        batch.update_many(*(x[290:] for x in bars))
+
+        assert batch.value == pytest.approx(single.value)
+        batch.update(*(x[-1] * 1.01 for x in bars))
+        single.update(*(x[-1] * 1.01 for x in bars))
+        assert batch.value == pytest.approx(single.value)
+
+    def test_ewma_ignores_window(self):
+        rolling = RollingVolatility(60, "ewma")
+        assert rolling.update(100.0, 101.0, 99.0, 100.0) is None
+        assert rolling.update(100.0, 103.0, 99.0, 102.0) == pytest.approx(np.log(1.02) * np.sqrt(252))
+
+    def test_unknown_estimator(self):
+        with pytest.raises(ValueError):
+            RollingVolatility(60, "magic")
+
+    def test_client_uses_estimator(self):
+        """Клиент MOEX отдает оценку по свечам вместо демо-волатильности."""
+        client = AsyncMOEXClient()
+        demo = client.get_historical_volatility("WHEAT")
+        rolling = RollingVolatility(60)
+        rolling.update_many(*create_bars(100))
+        client.volatility["WHEAT"] = rolling
+
+        assert client.get_historical_volatility("WHEAT") == rolling.value != demo
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])